@@ -0,0 +1,99 @@
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any
+
+from cache import ProgramCache
+from lox import Lox
+from output import CapturedOutput
+
+
+@dataclass(slots=True)
+class ScriptResult:
+    path: str
+    status: int
+    output: str
+    seconds: float
+
+
+# set once per worker process by start_worker: the arguments for every Lox
+# it creates and for running each script, and the cache they share
+lox_options: dict[str, Any] = {}
+run_options: dict[str, Any] = {}
+program_cache: ProgramCache | None = None
+
+
+def start_worker(options: dict[str, Any], script_options: dict[str, Any], cache: ProgramCache | None):
+    # everything a worker needs is imported and set up here, once, so that
+    # each script only pays for creating a Lox and running it
+    global program_cache
+    lox_options.update(options)
+    run_options.update(script_options)
+    program_cache = cache
+
+
+def run_script(path: str) -> ScriptResult:
+    # a fresh Lox, and so a fresh interpreter and globals, for every script
+    start = time.perf_counter()
+    output = CapturedOutput()
+    lox = Lox(cache=program_cache, output=output, **lox_options)
+    try:
+        status = lox.run_script(path, **run_options)
+    except Exception as e:
+        # a script that crashes the interpreter itself shouldn't take the
+        # rest of the batch down with it
+        output.write_line(f"{type(e).__name__}: {e}")
+        status = 70
+    return ScriptResult(path, status, output.getvalue(), time.perf_counter() - start)
+
+
+def find_scripts(directory: str) -> list[str]:
+    return sorted(glob.glob(os.path.join(directory, "**", "*.lox"), recursive=True))
+
+
+def run_batch(
+    directory: str,
+    jobs: int,
+    options: dict[str, Any],
+    script_options: dict[str, Any],
+    cache: ProgramCache | None = None,
+    output_directory: str | None = None,
+    chunk_size: int = 4,
+) -> int:
+    # Runs every .lox file under directory in a pool of jobs worker
+    # processes. Each script's output goes to its own .out file under
+    # output_directory, or else to stdout under a "==> path <==" header,
+    # in the order of the file names either way. Each script's status and
+    # time, and the totals, are reported on stderr. Returns the highest
+    # status of any script.
+    scripts = find_scripts(directory)
+    worst = 0
+    failed = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(
+        jobs, initializer=start_worker, initargs=(options, script_options, cache)
+    ) as executor:
+        for result in executor.map(run_script, scripts, chunksize=chunk_size):
+            if output_directory is not None:
+                name = os.path.relpath(result.path, directory) + ".out"
+                path = os.path.join(output_directory, name)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "w") as f:
+                    f.write(result.output)
+            else:
+                sys.stdout.write(f"==> {result.path} <==\n{result.output}")
+            print(f"{result.status:>3} {result.seconds * 1e3:10.2f} ms  {result.path}", file=sys.stderr)
+            worst = max(worst, result.status)
+            failed += result.status != 0
+    elapsed = time.perf_counter() - start
+
+    rate = len(scripts) / elapsed if elapsed else 0.0
+    print(
+        f"{len(scripts)} scripts, {failed} failed, in {elapsed:.2f} s "
+        f"with {jobs} workers: {rate:.1f} scripts/s",
+        file=sys.stderr,
+    )
+    return worst
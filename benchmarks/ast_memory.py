@@ -0,0 +1,41 @@
+import argparse
+import gc
+import tracemalloc
+
+from benchmarks.programs import count_nodes, variable_heavy
+from parser import Parser
+from scanner import FastScanner
+
+
+def traced(fn):
+    # returns fn's result and the bytes it allocated that are still alive
+    gc.collect()
+    tracemalloc.start()
+    result = fn()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(prog="python -m benchmarks.ast_memory")
+    arg_parser.add_argument(
+        "statements",
+        nargs="?",
+        type=int,
+        default=100000,
+        metavar="N",
+        help="statements in the generated program (default: 100000)",
+    )
+    args = arg_parser.parse_args()
+    statements = args.statements
+    source = variable_heavy(statements)
+
+    tokens, token_bytes = traced(lambda: FastScanner(source, None).scan_tokens())
+    tree, tree_bytes = traced(lambda: Parser(tokens).parse())
+    nodes = sum(count_nodes(statement) for statement in tree)
+
+    print(f"{len(source) / 1e6:.1f} MB source, {statements} statements")
+    print(f"  tokens:     {len(tokens):9d}  {token_bytes / 1e6:8.1f} MB  {token_bytes / len(tokens):6.1f} bytes/token")
+    print(f"  parse tree: {nodes:9d}  {tree_bytes / 1e6:8.1f} MB  {tree_bytes / nodes:6.1f} bytes/node")
@@ -0,0 +1,107 @@
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks.programs import variable_heavy
+from lox import Lox
+
+# a heartbeat task asks to wake every millisecond while the scripts run; how
+# late it wakes is the latency anything else on the loop would see
+
+
+async def heartbeat(lateness: list[float], stop: asyncio.Event, interval: float = 0.001):
+    while not stop.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        lateness.append(time.perf_counter() - expected)
+
+
+async def blocking(program):
+    # what calling the synchronous API from a coroutine amounts to
+    return program.run()
+
+
+async def measure(scripts: int, job) -> tuple[float, list[float], list[float]]:
+    lateness: list[float] = []
+    finished: list[float] = []
+    stop = asyncio.Event()
+    beat = asyncio.create_task(heartbeat(lateness, stop))
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+
+    async def one():
+        result = await job()
+        assert result.status == 0
+        finished.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one() for _ in range(scripts)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await beat
+    return elapsed, lateness, finished
+
+
+async def cancellation(program, scripts: int, after: float) -> tuple[int, float]:
+    # cancels every script partway through; returns how many had finished
+    # and how long the rest took to stop
+    tasks = [asyncio.create_task(program.run_async(slice_size=10)) for _ in range(scripts)]
+    await asyncio.sleep(after)
+    start = time.perf_counter()
+    for task in tasks:
+        task.cancel()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    stopped = time.perf_counter() - start
+    done = sum(not isinstance(result, asyncio.CancelledError) for result in results)
+    return done, stopped
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def main(scripts: int, statements: int):
+    program = Lox().prepare(variable_heavy(statements))
+    print(f"{scripts} scripts of {statements + 51} statements each, on one event loop")
+    print(f"  {'':<22} {'total':>8} {'loop latency p50':>17} {'p99':>9} {'max':>9}"
+          f" {'first / last done':>20}")
+    cases = [("blocking run()", lambda: blocking(program))]
+    for slice_size in (1, 10, 100):
+        cases.append(
+            (f"run_async, slice {slice_size}", lambda n=slice_size: program.run_async(slice_size=n))
+        )
+    for name, job in cases:
+        elapsed, lateness, finished = await measure(scripts, job)
+        print(
+            f"  {name:<22} {elapsed * 1e3:6.0f} ms"
+            f" {statistics.median(lateness) * 1e3:14.2f} ms {percentile(lateness, 0.99) * 1e3:6.2f} ms"
+            f" {max(lateness) * 1e3:6.1f} ms"
+            f" {min(finished) * 1e3:8.0f} / {max(finished) * 1e3:.0f} ms"
+        )
+    done, stopped = await cancellation(program, scripts, 0.05)
+    print(f"  cancelled after 50 ms: {done} had finished, the rest stopped in {stopped * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(prog="python -m benchmarks.async_latency")
+    arg_parser.add_argument(
+        "scripts",
+        nargs="?",
+        type=int,
+        default=1000,
+        metavar="N",
+        help="scripts run at once (default: 1000)",
+    )
+    arg_parser.add_argument(
+        "statements",
+        nargs="?",
+        type=int,
+        default=500,
+        metavar="M",
+        help="statements in each script (default: 500)",
+    )
+    args = arg_parser.parse_args()
+    scripts = args.scripts
+    statements = args.statements
+    asyncio.run(main(scripts, statements))
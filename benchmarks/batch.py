@@ -0,0 +1,62 @@
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.programs import deep_arithmetic
+
+
+def write_scripts(directory: str, count: int):
+    # small scripts of the kind a job runs thousands of, some of them failing
+    for i in range(count):
+        with open(os.path.join(directory, f"script{i:05}.lox"), "w") as f:
+            f.write(f"var n = {i};\nprint n * 2;\n")
+            f.write(deep_arithmetic(3, seed=i))
+            if i % 50 == 0:
+                f.write('print -"not a number";\n')
+
+
+def one_at_a_time(directory: str) -> float:
+    start = time.perf_counter()
+    for name in sorted(os.listdir(directory)):
+        subprocess.run(
+            [sys.executable, "lox.py", "--no-cache", os.path.join(directory, name)],
+            stdout=subprocess.DEVNULL,
+        )
+    return time.perf_counter() - start
+
+
+def batch(directory: str, jobs: int) -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "lox.py", "--no-cache", "--batch", directory, "-j", str(jobs)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(prog="python -m benchmarks.batch")
+    arg_parser.add_argument(
+        "count",
+        nargs="?",
+        type=int,
+        default=500,
+        metavar="N",
+        help="small scripts to run (default: 500)",
+    )
+    args = arg_parser.parse_args()
+    count = args.count
+    cpus = os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as tmp:
+        write_scripts(tmp, count)
+        print(f"{count} scripts, {cpus} CPUs")
+
+        elapsed = one_at_a_time(tmp)
+        print(f"  lox.py per script:  {elapsed:7.2f} s  {count / elapsed:8.1f} scripts/s")
+        for jobs in sorted({1, cpus}):
+            elapsed = batch(tmp, jobs)
+            print(f"  --batch -j {jobs:<3}      {elapsed:7.2f} s  {count / elapsed:8.1f} scripts/s")
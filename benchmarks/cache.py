@@ -0,0 +1,47 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.programs import variable_heavy
+
+
+def run(script: str, *flags: str) -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "lox.py", *flags, script],
+        stdout=subprocess.DEVNULL,
+        check=True,
+    )
+    return time.perf_counter() - start
+
+
+def best_of(fn, repeat: int = 3) -> float:
+    return min(fn() for _ in range(repeat))
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        script = os.path.join(tmp, "generated.lox")
+        with open(script, "w") as f:
+            f.write(variable_heavy(20000))
+        print(f"generated script: {os.path.getsize(script) / 1e3:.0f} kB")
+
+        cache_dir = os.path.join(tmp, "cache")
+        for backend in ["", "--vm", "--closure", "--python"]:
+            flags = (backend,) if backend else ()
+
+            def cold() -> float:
+                # an empty cache: the run parses and also pays for the store
+                subprocess.run(["rm", "-rf", cache_dir], check=True)
+                return run(script, "--cache-dir", cache_dir, *flags)
+
+            uncached = best_of(lambda: run(script, "--no-cache", *flags))
+            cold_time = best_of(cold)
+            warm = best_of(lambda: run(script, "--cache-dir", cache_dir, *flags))
+
+            print(backend or "interpreter")
+            print(f"  no cache: {uncached * 1e3:8.0f} ms")
+            print(f"  cold:     {cold_time * 1e3:8.0f} ms")
+            print(f"  warm:     {warm * 1e3:8.0f} ms  {uncached / warm:5.2f}x")
@@ -0,0 +1,47 @@
+import contextlib
+import io
+import time
+
+from benchmarks.programs import deep_arithmetic, variable_heavy
+from closure_compiler import ClosureInterpreter
+from interpreter import Interpreter
+from parser import Parser
+from resolver import Resolver
+from scanner import FastScanner
+
+
+def best_of(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_compiled(interpreter, thunks):
+    for thunk in thunks:
+        thunk(interpreter)
+
+
+def bench(name: str, source: str):
+    statements = Parser(FastScanner(source, None).scan_tokens()).parse()
+    Resolver().resolve(statements)
+
+    tree = best_of(lambda: Interpreter().interpret(statements))
+    closures = best_of(lambda: ClosureInterpreter().interpret(statements))
+
+    interpreter = ClosureInterpreter()
+    thunks = interpreter.compile(statements)
+    run_time = best_of(lambda: run_compiled(interpreter, thunks))
+
+    print(name)
+    print(f"  tree-walking interpreter: {tree * 1e3:8.2f} ms")
+    print(f"  closures, compile + run:  {closures * 1e3:8.2f} ms  {tree / closures:5.2f}x")
+    print(f"  closures, run only:       {run_time * 1e3:8.2f} ms  {tree / run_time:5.2f}x")
+
+
+if __name__ == "__main__":
+    bench("arithmetic heavy", "".join(deep_arithmetic(12, seed) for seed in range(8)))
+    bench("variable heavy", variable_heavy(20000))
@@ -0,0 +1,83 @@
+import argparse
+import time
+
+from benchmarks.programs import count_nodes, deep_arithmetic
+from expr import Assign, Binary, Grouping, Literal, Unary, Variable
+from interpreter import Interpreter
+from parser import Parser
+from scanner import Scanner
+from stmt import Expression, Print, Var
+
+
+class IsinstanceChainInterpreter(Interpreter):
+    # the dispatch generate_ast.py used to emit: evaluate -> visit -> a linear
+    # chain of isinstance checks -> visit_*
+    def evaluate(self, expr):
+        return self.visit(expr)
+
+    def execute(self, stmt):
+        return self.visit(stmt)
+
+    def visit(self, val):
+        if isinstance(val, Binary):
+            return self.visit_binary_expr(val)
+        if isinstance(val, Grouping):
+            return self.visit_grouping_expr(val)
+        if isinstance(val, Literal):
+            return self.visit_literal_expr(val)
+        if isinstance(val, Unary):
+            return self.visit_unary_expr(val)
+        if isinstance(val, Variable):
+            return self.visit_variable_expr(val)
+        if isinstance(val, Assign):
+            return self.visit_assign_expr(val)
+        if isinstance(val, Expression):
+            return self.visit_expression_stmt(val)
+        if isinstance(val, Print):
+            return self.visit_print_stmt(val)
+        if isinstance(val, Var):
+            return self.visit_var_stmt(val)
+
+
+def bench(interpreter: Interpreter, expr, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        interpreter.evaluate(expr)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(prog="python -m benchmarks.dispatch")
+    arg_parser.add_argument(
+        "depth",
+        nargs="?",
+        type=int,
+        default=14,
+        metavar="N",
+        help="depth of the generated expressions (default: 14)",
+    )
+    arg_parser.add_argument(
+        "repeat",
+        nargs="?",
+        type=int,
+        default=5,
+        metavar="M",
+        help="runs to take the best of (default: 5)",
+    )
+    args = arg_parser.parse_args()
+    depth = args.depth
+    repeat = args.repeat
+
+    statements = Parser(Scanner(deep_arithmetic(depth), None).scan_tokens()).parse()
+    expr = statements[0].expression
+    nodes = count_nodes(expr)
+
+    before = bench(IsinstanceChainInterpreter(), expr, repeat)
+    after = bench(Interpreter(), expr, repeat)
+
+    print(f"deep arithmetic expression: depth {depth}, {nodes} nodes")
+    print(f"isinstance chain: {before * 1e3:8.2f} ms  {before / nodes * 1e9:7.1f} ns/node")
+    print(f"direct accept:    {after * 1e3:8.2f} ms  {after / nodes * 1e9:7.1f} ns/node")
+    print(f"speedup:          {before / after:8.2f}x")
@@ -0,0 +1,112 @@
+import argparse
+import gc
+import time
+import timeit
+import tracemalloc
+
+from benchmarks.programs import identifier_heavy
+from environment import Environment
+from interpreter import Interpreter
+from output import CapturedOutput
+from parser import BufferParser, PrattParser
+from scanner import BufferScanner, FastScanner
+from token_type import TokenType
+from tokens import Token
+
+
+class Uninterned(dict):
+    # an intern table that hands every string back as it came, which is how
+    # the scanners worked before they had one
+    def setdefault(self, key, default=None):
+        return default
+
+
+def traced(fn):
+    # returns fn's result and the bytes it allocated that are still alive
+    gc.collect()
+    tracemalloc.start()
+    result = fn()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def buffer_tree(source: str, strings: dict):
+    return BufferParser(BufferScanner(source, None, strings).scan_buffer(), CapturedOutput()).parse()
+
+
+def token_tree(source: str, strings: dict):
+    return PrattParser(FastScanner(source, None, strings).scan_tokens(), CapturedOutput()).parse()
+
+
+def prompt_trees(source: str, strings: dict):
+    # one line at a time through one table, as a session at the prompt goes
+    return [buffer_tree(line, strings) for line in source.splitlines()]
+
+
+def best_of(statements, repeat: int = 5) -> float:
+    # unresolved, like everything run at the prompt: every read and write of
+    # a variable looks its name up in the Environment's dict
+    best = float("inf")
+    for _ in range(repeat):
+        interpreter = Interpreter(CapturedOutput())
+        start = time.perf_counter()
+        interpreter.interpret(statements)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def per_get(number: int = 1000000) -> tuple[float, float]:
+    # one Environment.get with the very string the variable was defined
+    # under, and with an equal copy of it, its hash already cached
+    environment = Environment()
+    for i in range(200):
+        environment.define(f"monthlyPayment{i}", float(i))
+    defined = next(name for name in environment.values if name == "monthlyPayment7")
+    copy = "".join(["monthlyPayment", "7"])
+    hash(copy)
+    interned = Token(TokenType.IDENTIFIER, defined, None, 1)
+    uninterned = Token(TokenType.IDENTIFIER, copy, None, 1)
+    return (
+        timeit.timeit(lambda: environment.get(uninterned), number=number) / number,
+        timeit.timeit(lambda: environment.get(interned), number=number) / number,
+    )
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(prog="python -m benchmarks.interning")
+    arg_parser.add_argument(
+        "statements",
+        nargs="?",
+        type=int,
+        default=50000,
+        metavar="N",
+        help="assignments in the generated program (default: 50000)",
+    )
+    args = arg_parser.parse_args()
+    statements = args.statements
+    source = identifier_heavy(statements)
+    # every assignment reads three names and writes one
+    lookups = statements * 4
+    print(f"{len(source) / 1e6:.1f} MB source, {statements} statements")
+
+    print("parse tree kept alive")
+    for name, fn in [
+        ("token buffer", buffer_tree),
+        ("token list", token_tree),
+        ("line by line", prompt_trees),
+    ]:
+        _, plain = traced(lambda: fn(source, Uninterned()))
+        tree, interned = traced(lambda: fn(source, {}))
+        print(f"  {name:<14} uninterned {plain / 1e6:7.1f} MB   interned {interned / 1e6:7.1f} MB"
+              f"   {1 - interned / plain:5.1%} smaller")
+
+    print("lookups by name")
+    plain = best_of(buffer_tree(source, Uninterned()))
+    interned = best_of(buffer_tree(source, {}))
+    print(f"  uninterned {plain * 1e3:8.1f} ms  {lookups / plain / 1e6:5.2f} M lookups/s")
+    print(f"  interned   {interned * 1e3:8.1f} ms  {lookups / interned / 1e6:5.2f} M lookups/s"
+          f"  {plain / interned:5.2f}x")
+    plain, interned = per_get()
+    print(f"  Environment.get  uninterned {plain * 1e9:5.1f} ns   interned {interned * 1e9:5.1f} ns")
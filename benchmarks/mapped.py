@@ -0,0 +1,66 @@
+import argparse
+import mmap
+import os
+import tempfile
+
+from benchmarks.programs import comment_heavy
+from benchmarks.token_buffer import best_of, traced
+from parser import BufferParser, MappedBufferParser
+from scanner import BufferScanner, MappedScanner
+
+
+def records(count: int) -> str:
+    # data as code: a table of non-ASCII string records, with a comment each
+    return "".join(
+        f'var r{i % 1000} = "Zürich café №{i}: naïve data, {i * 7 % 1000} €"; // row {i}\n'
+        for i in range(count)
+    )
+
+
+def parse_text(path: str):
+    with open(path) as f:
+        source = f.read()
+    return BufferParser(BufferScanner(source, None).scan_buffer()).parse()
+
+
+def parse_mapped(path: str):
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as source:
+            return MappedBufferParser(MappedScanner(source, None).scan_buffer()).parse()
+
+
+def bench(name: str, source: str):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "script.lox")
+        with open(path, "w") as f:
+            f.write(source)
+        size = os.path.getsize(path)
+
+        # peaks are Python allocations only: the mapped pages are the page
+        # cache's, shared and reclaimable, and never show up here
+        text_statements, _, text_peak = traced(lambda: parse_text(path))
+        mapped_statements, _, mapped_peak = traced(lambda: parse_mapped(path))
+        assert text_statements == mapped_statements
+        text_time = best_of(lambda: parse_text(path))
+        mapped_time = best_of(lambda: parse_mapped(path))
+
+    print(f"{name}: {size / 1e6:.1f} MB file, {len(text_statements)} statements")
+    print(f"  read + scan + parse peak:  read {text_peak / 1e6:8.1f} MB   mmap {mapped_peak / 1e6:8.1f} MB")
+    print(f"  read + scan + parse time:  read {text_time * 1e3:8.1f} ms   mmap {mapped_time * 1e3:8.1f} ms"
+          f"  {text_time / mapped_time:5.2f}x")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(prog="python -m benchmarks.mapped")
+    arg_parser.add_argument(
+        "scale",
+        nargs="?",
+        type=int,
+        default=1,
+        metavar="N",
+        help="multiplies the size of the generated sources (default: 1)",
+    )
+    args = arg_parser.parse_args()
+    scale = args.scale
+    bench("heavy comments", comment_heavy(100000 * scale))
+    bench("non-ASCII records", records(100000 * scale))
@@ -0,0 +1,49 @@
+import contextlib
+import io
+import time
+
+from benchmarks.programs import constant_heavy, deep_arithmetic, variable_heavy
+from interpreter import Interpreter
+from optimizer import Optimizer
+from parser import Parser
+from resolver import Resolver
+from scanner import FastScanner
+
+
+def prepare(source: str):
+    statements = Parser(FastScanner(source, None).scan_tokens()).parse()
+    Resolver().resolve(statements)
+    return statements
+
+
+def best_of(statements, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            Interpreter().interpret(statements)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench(name: str, source: str):
+    plain = prepare(source)
+    optimized = prepare(source)
+    optimizer = Optimizer()
+    start = time.perf_counter()
+    optimized = optimizer.optimize(optimized)
+    optimize_time = time.perf_counter() - start
+
+    before = best_of(plain)
+    after = best_of(optimized)
+
+    print(f"{name}: {optimizer.report()}")
+    print(f"  unoptimized run: {before * 1e3:8.2f} ms")
+    print(f"  optimize:        {optimize_time * 1e3:8.2f} ms")
+    print(f"  optimized run:   {after * 1e3:8.2f} ms")
+
+
+if __name__ == "__main__":
+    bench("deep arithmetic", "".join(deep_arithmetic(10, seed) for seed in range(8)))
+    bench("constant heavy", constant_heavy(5000))
+    bench("variable heavy", variable_heavy(5000))
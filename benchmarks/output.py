@@ -0,0 +1,47 @@
+import argparse
+import os
+import time
+
+from benchmarks.programs import print_heavy
+from interpreter import Interpreter
+from output import BufferedOutput, Output
+from parser import Parser
+from scanner import FastScanner
+from vm import VM
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(prog="python -m benchmarks.output")
+    arg_parser.add_argument(
+        "lines",
+        nargs="?",
+        type=int,
+        default=1_000_000,
+        metavar="N",
+        help="print statements to run (default: 1000000)",
+    )
+    args = arg_parser.parse_args()
+    lines = args.lines
+    statements = Parser(FastScanner(print_heavy(lines), None).scan_tokens()).parse()
+    chunk = VM().compile(statements)
+    print(f"{lines} print statements")
+
+    # a terminal is line buffered, so there every print flushes; a file or a
+    # pipe is block buffered by the stream itself
+    for name, line_buffering in [("line-buffered stream", True), ("block-buffered stream", False)]:
+        print(name)
+        with open(os.devnull, "w", buffering=1 if line_buffering else -1) as stream:
+            for backend, run in [
+                ("interpreter", lambda output: Interpreter(output).interpret(statements)),
+                ("vm", lambda output: VM(output).interpret_compiled(chunk)),
+            ]:
+                plain = timed(lambda: run(Output(stream)))
+                buffered = timed(lambda: run(BufferedOutput(stream)))
+                print(f"  {backend:<12} print per line {plain * 1e3:8.0f} ms"
+                      f"   buffered {buffered * 1e3:8.0f} ms  {plain / buffered:5.2f}x")
@@ -0,0 +1,51 @@
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.programs import comment_heavy, string_concatenation, variable_heavy
+from benchmarks.scanner import Errors
+from scanner import BufferScanner, ParallelScanner, split_points
+
+
+def columns(buffer):
+    return buffer.types, buffer.starts, buffer.ends, buffer.lines
+
+
+def best_of(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench(name: str, source: str, workers: list[int]):
+    expected = BufferScanner(source, Errors()).scan_buffer()
+    sequential = best_of(lambda: BufferScanner(source, Errors()).scan_buffer())
+    print(f"{name}: {len(source) / 1e6:.1f} MB source, {len(expected)} tokens")
+    print(f"  sequential:  {sequential * 1e3:8.1f} ms")
+
+    for count in workers:
+        split = best_of(lambda: split_points(source, count))
+        # the pool is started and torn down inside the timing, as Lox does
+        def scan():
+            with ProcessPoolExecutor(count) as executor:
+                return ParallelScanner(source, Errors(), executor, count).scan_buffer()
+
+        if columns(scan()) != columns(expected):
+            print(f"  {count} workers: MISMATCH")
+            sys.exit(1)
+        parallel = best_of(scan)
+        print(f"  {count} workers:   {parallel * 1e3:8.1f} ms  {sequential / parallel:5.2f}x"
+              f"  (finding boundaries {split * 1e3:.1f} ms)")
+
+
+if __name__ == "__main__":
+    cpus = os.cpu_count() or 1
+    workers = sorted({2, 4, cpus} - {1})
+    print(f"{cpus} CPUs")
+    bench("many vars", variable_heavy(120000), workers)
+    bench("string concatenation", string_concatenation(8000), workers)
+    bench("heavy comments", comment_heavy(80000), workers)
@@ -0,0 +1,139 @@
+import random
+import sys
+import time
+
+from benchmarks.programs import deep_arithmetic, string_concatenation, variable_heavy
+from output import CapturedOutput
+from parser import BufferParser, MappedBufferParser, Parser, PrattParser, TokenStream
+from scanner import BufferScanner, FastScanner, MappedScanner
+
+edge_cases = [
+    "",
+    "print 1;",
+    "print 1 + 2 * 3 - 4 / 5;",
+    "print 1 - 2 - 3; print 8 / 4 / 2;",
+    "print 1 < 2 == 3 >= 4 != 5 <= 6 > 7;",
+    "print !!-!-1; print -(-1);",
+    "print -a * b; print !a == b;",
+    "a = b = c = 1;",
+    "a + b = c;",
+    "-a = 1;",
+    "(a) = 1;",
+    "print (1;",
+    "print 1 +;",
+    "print * 2;",
+    "print 1",
+    "var = 1;",
+    "var a = ;",
+    "print ((((1))));",
+    "print 1 + (2 * (3 - (4 / 5)));",
+    "print )1(;",
+    "print 1 + 2 = 3 * 4;",
+    "print a = 1 + b = 2;",
+    "print nil == false; print true != nil;",
+    '"a" + "b" + c;',
+    "1 2 3;",
+    "print 1; print 2 +; print 3;",
+    'var café = "naïve"; print café + "€" + π;',
+    "print é +;",
+    'print "a\r\nb";\r\nprint 1;\r\nvar = 2;\r\n',
+    "var a = 1;\rprint (a;\rprint b;",
+]
+
+fuzz_tokens = "1 2.5 a b \"s\" true false nil + - * / ! != == < <= > >= = ( ) ; print var".split()
+
+
+def parse(parser_class, source: str):
+    # the statements, or None after an error, and everything reported
+    output = CapturedOutput()
+    statements = parser_class(FastScanner(source, None).scan_tokens(), output).parse()
+    return statements, output.lines
+
+
+def parse_stream(parser_class, source: str):
+    output = CapturedOutput()
+    tokens = TokenStream(iter(FastScanner(source, None).scan_tokens()))
+    parser = parser_class(tokens, output)
+    statements = list(parser.parse_iter())
+    return (None if parser.had_error else statements), output.lines
+
+
+def parse_buffer(source: str):
+    output = CapturedOutput()
+    buffer = BufferScanner(source, None).scan_buffer()
+    return BufferParser(buffer, output).parse(), output.lines
+
+
+def parse_mapped(source: str):
+    output = CapturedOutput()
+    buffer = MappedScanner(source.encode(), None).scan_buffer()
+    return MappedBufferParser(buffer, output).parse(), output.lines
+
+
+def text_mode(source: str) -> str:
+    # the source as reading it from a file in text mode gives it, which is
+    # what a mapped file's bytes have to scan like
+    return source.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def corpus(fuzz_cases: int = 5000, seed: int = 0):
+    yield from edge_cases
+    with open("test.lox") as f:
+        yield f.read()
+    yield deep_arithmetic(8)
+    yield variable_heavy(500)
+    yield string_concatenation(50)
+
+    rng = random.Random(seed)
+    for _ in range(fuzz_cases):
+        yield " ".join(rng.choices(fuzz_tokens, k=rng.randint(1, 20)))
+
+
+def differential() -> int:
+    cases = 0
+    mismatches = 0
+    for source in corpus():
+        cases += 1
+        expected = parse(Parser, source)
+        if expected != parse(PrattParser, source):
+            mismatches += 1
+            print(f"PrattParser mismatch on {source!r}")
+        if expected != parse_stream(PrattParser, source):
+            mismatches += 1
+            print(f"PrattParser on a TokenStream mismatch on {source!r}")
+        if expected != parse_buffer(source):
+            mismatches += 1
+            print(f"BufferParser mismatch on {source!r}")
+        if parse(Parser, text_mode(source)) != parse_mapped(source):
+            mismatches += 1
+            print(f"MappedBufferParser mismatch on {source!r}")
+    print(f"differential: {cases} sources, {mismatches} mismatches")
+    return mismatches
+
+
+def best_of(parser_class, tokens, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parser_class(tokens).parse()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench(name: str, source: str):
+    tokens = FastScanner(source, None).scan_tokens()
+    reference = best_of(Parser, tokens)
+    pratt = best_of(PrattParser, tokens)
+    print(f"{name}: {len(tokens)} tokens")
+    print(f"  Parser:      {reference * 1e3:8.2f} ms  {len(tokens) / reference:12,.0f} tokens/s")
+    print(f"  PrattParser: {pratt * 1e3:8.2f} ms  {len(tokens) / pratt:12,.0f} tokens/s"
+          f"  {reference / pratt:5.2f}x")
+
+
+if __name__ == "__main__":
+    if differential():
+        sys.exit(1)
+
+    bench("long expressions", "".join(deep_arithmetic(12, seed) for seed in range(4)))
+    bench("string concatenation", string_concatenation(2000, pieces=100))
+    bench("many vars", variable_heavy(20000))
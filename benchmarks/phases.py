@@ -0,0 +1,266 @@
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+from benchmarks.programs import (
+    comment_heavy,
+    count_nodes,
+    deep_arithmetic,
+    string_concatenation,
+    variable_heavy,
+)
+from cache import paused_gc
+from interpreter import Interpreter
+from optimizer import Optimizer
+from parser import BufferParser, Parser, PrattParser
+from resolver import Resolver
+from scanner import BufferScanner, FastScanner, Scanner
+
+here = os.path.dirname(os.path.abspath(__file__))
+default_baseline = os.path.join(here, "baseline.json")
+
+# the phases Lox.run goes through, in order
+phases = ["scan", "parse", "resolve", "optimize", "interpret"]
+
+
+def corpus() -> dict[str, str]:
+    programs = {
+        "deep expressions": "".join(deep_arithmetic(12, seed) for seed in range(4)),
+        "many vars": variable_heavy(20000),
+        "string concatenation": string_concatenation(2000),
+        "heavy comments": comment_heavy(20000),
+    }
+    directory = os.path.join(here, "corpus")
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".lox"):
+            with open(os.path.join(directory, name)) as f:
+                programs[name] = f.read()
+    return programs
+
+
+def scan(source: str, scanner_class):
+    if scanner_class is BufferScanner:
+        return BufferScanner(source, None).scan_buffer()
+    return scanner_class(source, None).scan_tokens()
+
+
+def run_phases(source: str, scanner_class, parser_class) -> tuple[dict[str, float], dict[str, int]]:
+    # one pass through every phase; returns the time each took and the amount
+    # of work done, which the throughput figures are based on
+    times = {}
+
+    # as in Lox.parse, the collector is paused for the front end
+    with paused_gc():
+        start = time.perf_counter()
+        tokens = scan(source, scanner_class)
+        times["scan"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        statements = parser_class(tokens).parse()
+        times["parse"] = time.perf_counter() - start
+    nodes = sum(count_nodes(statement) for statement in statements)
+
+    start = time.perf_counter()
+    Resolver().resolve(statements)
+    times["resolve"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    statements = Optimizer().optimize(statements)
+    times["optimize"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        Interpreter().interpret(statements)
+    times["interpret"] = time.perf_counter() - start
+
+    counts = {
+        "bytes": len(source),
+        "tokens": len(tokens),
+        "nodes": nodes,
+        "statements": len(statements),
+    }
+    return times, counts
+
+
+def peak_memory(source: str, scanner_class, parser_class) -> dict[str, int]:
+    # tracemalloc slows everything down, so peaks come from a separate pass;
+    # each is the most memory in use at once during the phase, counting what
+    # earlier phases left behind
+    peaks = {}
+    tracemalloc.start()
+
+    def measure(phase: str, fn):
+        tracemalloc.reset_peak()
+        result = fn()
+        peaks[phase] = tracemalloc.get_traced_memory()[1]
+        return result
+
+    tokens = measure("scan", lambda: scan(source, scanner_class))
+    statements = measure("parse", lambda: parser_class(tokens).parse())
+    measure("resolve", lambda: Resolver().resolve(statements))
+    statements = measure("optimize", lambda: Optimizer().optimize(statements))
+    with contextlib.redirect_stdout(io.StringIO()):
+        measure("interpret", lambda: Interpreter().interpret(statements))
+
+    tracemalloc.stop()
+    return peaks
+
+
+def bench(source: str, scanner_class, parser_class, repeat: int) -> dict:
+    best = dict.fromkeys(phases, float("inf"))
+    for _ in range(repeat):
+        gc.collect()
+        times, counts = run_phases(source, scanner_class, parser_class)
+        for phase in phases:
+            best[phase] = min(best[phase], times[phase])
+
+    # what each phase's throughput is measured in
+    units = {
+        "scan": counts["tokens"],
+        "parse": counts["nodes"],
+        "resolve": counts["nodes"],
+        "optimize": counts["nodes"],
+        "interpret": counts["statements"],
+    }
+    peaks = peak_memory(source, scanner_class, parser_class)
+    return {
+        "counts": counts,
+        "phases": {
+            phase: {
+                "seconds": best[phase],
+                "per_second": units[phase] / best[phase] if best[phase] else None,
+                "peak_bytes": peaks[phase],
+            }
+            for phase in phases
+        },
+    }
+
+
+# what decides which front end was timed; results are only comparable with a
+# baseline that has the same
+front_end = ["scanner", "parser"]
+
+
+def front_end_mismatch(results: dict, baseline: dict) -> list[str]:
+    return [
+        f"{key} {baseline.get(key)} in the baseline, {results[key]} now"
+        for key in front_end
+        if baseline.get(key) != results[key]
+    ]
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    # a phase regressed if it got slower than its baseline time by more than
+    # the threshold. Phases that took under a millisecond are mostly timer
+    # noise, and programs or phases missing from either side are skipped.
+    regressions = []
+    for name, result in results["programs"].items():
+        old = baseline["programs"].get(name)
+        if old is None:
+            continue
+        for phase, timing in result["phases"].items():
+            if phase not in old["phases"]:
+                continue
+            before = old["phases"][phase]["seconds"]
+            after = timing["seconds"]
+            if before >= 1e-3 and after > before * (1 + threshold):
+                regressions.append(
+                    f"{name}: {phase} {before * 1e3:.2f} ms -> {after * 1e3:.2f} ms"
+                    f" ({after / before:.2f}x)"
+                )
+    return regressions
+
+
+def report(results: dict):
+    units = {"scan": "tokens", "parse": "nodes", "resolve": "nodes",
+             "optimize": "nodes", "interpret": "stmts"}
+    for name, result in results["programs"].items():
+        counts = result["counts"]
+        print(f"{name}: {counts['bytes'] / 1e3:.0f} kB, {counts['tokens']} tokens,"
+              f" {counts['nodes']} nodes, {counts['statements']} statements")
+        for phase, timing in result["phases"].items():
+            rate = timing["per_second"]
+            rate = f"{rate / 1e3:10.0f} k{units[phase]}/s" if rate else " " * 18
+            print(f"  {phase:<9} {timing['seconds'] * 1e3:9.2f} ms  {rate}"
+                  f"  peak {timing['peak_bytes'] / 1e6:8.1f} MB")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(prog="python -m benchmarks.phases")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument(
+        "--reference-scanner",
+        action="store_true",
+        help="time the character-at-a-time Scanner instead of FastScanner",
+    )
+    arg_parser.add_argument(
+        "--reference-parser",
+        action="store_true",
+        help="time the recursive-descent Parser instead of PrattParser",
+    )
+    arg_parser.add_argument("--output", help="write the results to this JSON file")
+    arg_parser.add_argument(
+        "--baseline",
+        default=default_baseline,
+        help="results to compare against (default: benchmarks/baseline.json)",
+    )
+    arg_parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="store these results as the new baseline instead of comparing",
+    )
+    arg_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="slowdown that counts as a regression (default: 0.1, i.e. 10%%)",
+    )
+    args = arg_parser.parse_args()
+
+    # the same choice Lox makes: the buffer pair unless a reference is asked for
+    if args.reference_scanner or args.reference_parser:
+        scanner_class = Scanner if args.reference_scanner else FastScanner
+        parser_class = Parser if args.reference_parser else PrattParser
+    else:
+        scanner_class, parser_class = BufferScanner, BufferParser
+    results = {
+        "python": sys.version.split()[0],
+        "machine": platform.machine(),
+        "scanner": scanner_class.__name__,
+        "parser": parser_class.__name__,
+        "programs": {
+            name: bench(source, scanner_class, parser_class, args.repeat)
+            for name, source in corpus().items()
+        },
+    }
+    report(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        mismatch = front_end_mismatch(results, baseline)
+        if mismatch:
+            print(f"\nnot comparing with {args.baseline}, which timed another front end:")
+            for difference in mismatch:
+                print(f"  {difference}")
+            sys.exit(1)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nslower than {args.baseline}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"\nno phase more than {args.threshold:.0%} slower than {args.baseline}")
@@ -0,0 +1,136 @@
+import argparse
+import threading
+import time
+
+from environment import Environment
+from lox import Lox
+from output import CapturedOutput
+
+# a quote for one customer: the inputs are bound as globals for every run
+script = """
+var monthlyRate = rate / 12;
+var months = years * 12;
+var growth = 1 + monthlyRate;
+var factor = growth * growth * growth * growth * growth * growth;
+factor = factor * factor * factor * factor;
+var payment = principal * monthlyRate * factor / (factor - 1);
+var fees = 250 + principal * 0.01;
+var total = payment * months + fees;
+print "quote for " + customer;
+print "monthly payment";
+print payment;
+print "total cost";
+print total;
+print total > budget;
+quotes = quotes + 1;
+"""
+
+
+def inputs(i: int) -> dict:
+    return {
+        "principal": 100000 + i,
+        "rate": 0.05,
+        "years": 1,
+        "customer": f"customer {i}",
+        "budget": 110000,
+        "quotes": 0,
+    }
+
+
+def check_environments() -> int:
+    # every backend leaves the script's variables, and the globals it
+    # assigned, in the run's environment, for the next run to see
+    expected = {"quotes": 1.0, "customer": "customer 1"}
+    failures = 0
+    for backend in ("interpreter", "closure", "vm"):
+        program = Lox(backend=backend).prepare(script)
+        environment = Environment()
+        program.run(inputs(0), environment=environment)
+        result = program.run(inputs(1), environment=environment)
+        values = environment.values
+        names = ["monthlyRate", "months", "growth", "factor", "payment", "fees", "total"]
+        if any(name not in values for name in names) or any(
+            values[name] != value for name, value in expected.items()
+        ):
+            failures += 1
+            print(f"{backend}: environment {values}")
+        if Lox(backend=backend).prepare("var q = 1;").run().environment.values != {"q": 1.0}:
+            failures += 1
+            print(f"{backend}: a declared variable isn't in the run's environment")
+        if result.status:
+            failures += 1
+    print(f"environments: {failures} failures")
+    return failures
+
+
+def per_call(runs: int, **options) -> float:
+    # what an embedder had to do before: a Lox per call, which scans and
+    # parses the script every time
+    start = time.perf_counter()
+    for i in range(runs):
+        lox = Lox(output=CapturedOutput(), **options)
+        environment = lox.interpreter.globals if options.get("backend") == "vm" else lox.interpreter.environment
+        for name, value in inputs(i).items():
+            environment.define(name, float(value) if type(value) is int else value)
+        lox.run(script)
+    return time.perf_counter() - start
+
+
+def prepared(runs: int, **options) -> float:
+    program = Lox(**options).prepare(script)
+    start = time.perf_counter()
+    for i in range(runs):
+        program.run(inputs(i))
+    return time.perf_counter() - start
+
+
+def threaded(runs: int, threads: int, **options) -> float:
+    # one program shared by all the threads, each checking its own results
+    program = Lox(**options).prepare(script)
+    failures = []
+
+    def work(first: int):
+        for i in range(first, first + runs // threads):
+            result = program.run(inputs(i))
+            if result.status or not result.output.startswith(f"quote for customer {i}\n"):
+                failures.append(i)
+
+    workers = [threading.Thread(target=work, args=(n * runs,)) for n in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    assert not failures, failures[:10]
+    return elapsed
+
+
+if __name__ == "__main__":
+    if check_environments():
+        raise SystemExit(1)
+    arg_parser = argparse.ArgumentParser(prog="python -m benchmarks.prepared")
+    arg_parser.add_argument(
+        "runs",
+        nargs="?",
+        type=int,
+        default=5000,
+        metavar="N",
+        help="runs of the script on each backend (default: 5000)",
+    )
+    args = arg_parser.parse_args()
+    runs = args.runs
+    print(f"{runs} runs of a {len(script.splitlines())}-line script with 6 bound globals")
+    for name, options in [
+        ("interpreter", {}),
+        ("quickened", {"quicken": True}),
+        ("closure", {"backend": "closure"}),
+        ("vm", {"backend": "vm"}),
+    ]:
+        lox_run = per_call(runs, **options)
+        program_run = prepared(runs, **options)
+        print(f"  {name:<12} Lox.run per call {runs / lox_run:8.0f} runs/s"
+              f"   prepared {runs / program_run:8.0f} runs/s  {lox_run / program_run:5.1f}x")
+    for threads in (1, 4):
+        elapsed = threaded(runs, threads)
+        print(f"  interpreter, prepared, {threads} thread(s) sharing it: {runs / elapsed:8.0f} runs/s")
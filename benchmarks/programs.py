@@ -0,0 +1,122 @@
+import random
+from dataclasses import fields
+
+from expr import Expr
+from stmt import Stmt
+
+
+def deep_arithmetic(depth: int, seed: int = 0, variables: bool = False) -> str:
+    # a balanced tree of +, - and * over small numbers, 2**depth leaves. With
+    # variables, each number n is read from a global nN instead, so nothing
+    # downstream can fold the tree to a constant; the declarations are left
+    # to the caller: see digit_variables
+    rng = random.Random(seed)
+
+    def build(d: int) -> str:
+        if d == 0:
+            digit = rng.randint(1, 9)
+            return f"n{digit}" if variables else str(digit)
+        op = rng.choice("+-*")
+        return f"({build(d - 1)} {op} {build(d - 1)})"
+
+    return f"print {build(depth)};\n"
+
+
+def digit_variables() -> str:
+    # the globals deep_arithmetic(..., variables=True) reads
+    return "".join(f"var n{i} = {i};\n" for i in range(1, 10))
+
+
+def variable_heavy(statements: int, variables: int = 50, seed: int = 0) -> str:
+    # declarations followed by a long run of reads and assignments
+    rng = random.Random(seed)
+    lines = [f"var v{i} = {i}.5;" for i in range(variables)]
+    for _ in range(statements):
+        target, a, b, c = (rng.randrange(variables) for _ in range(4))
+        lines.append(f"v{target} = v{a} + v{b} * 0.5 - v{c} / 3;")
+    lines.append("print v0;")
+    return "\n".join(lines) + "\n"
+
+
+def accumulated_string(pieces: int) -> str:
+    # one string built up a piece at a time, then printed once
+    lines = ['var s = "";']
+    lines.extend(f's = s + "piece {i}, ";' for i in range(pieces))
+    lines.append("print s;")
+    return "\n".join(lines) + "\n"
+
+
+def identifier_heavy(statements: int, variables: int = 200, seed: int = 0) -> str:
+    # like variable_heavy, with the long descriptive names of real scripts
+    rng = random.Random(seed)
+    names = [f"monthlyPayment{i}" for i in range(variables)]
+    lines = [f"var {name} = {i}.5;" for i, name in enumerate(names)]
+    for _ in range(statements):
+        target, a, b, c = (rng.choice(names) for _ in range(4))
+        lines.append(f"{target} = {a} + {b} * 0.5 - {c} / 3;")
+    lines.append(f"print {names[0]};")
+    return "\n".join(lines) + "\n"
+
+
+def constant_heavy(statements: int, variables: int = 50, seed: int = 0) -> str:
+    # like variable_heavy, with constant subexpressions and identities mixed in
+    rng = random.Random(seed)
+    lines = [f"var v{i} = {i}.5;" for i in range(variables)]
+    for _ in range(statements):
+        target, a, b = (rng.randrange(variables) for _ in range(3))
+        lines.append(
+            f"v{target} = (v{a} + 1) * (60 * 60 * 24) / 1"
+            f" + (1 / 2) * v{b} - (2 + 3 * 4) - 0;"
+        )
+    lines.append("print v0;")
+    return "\n".join(lines) + "\n"
+
+
+def string_concatenation(statements: int, pieces: int = 20, seed: int = 0) -> str:
+    # long left-leaning chains of + over string literals and string variables;
+    # the results go to variables that are never read, so strings stay short
+    rng = random.Random(seed)
+    words = ["alpha", "beta", "gamma", "delta", "epsilon", "zeta", "eta", "theta"]
+    lines = [f'var {word} = "{word} ";' for word in words]
+    for i in range(statements):
+        chain = " + ".join(
+            rng.choice(words) if rng.random() < 0.5 else f'"{rng.choice(words)}-{i} "'
+            for _ in range(pieces)
+        )
+        lines.append(f"var s{i % 50} = {chain};")
+    lines.append("print s0;")
+    return "\n".join(lines) + "\n"
+
+
+def comment_heavy(statements: int, seed: int = 0) -> str:
+    # short declarations buried in line and block comments, as in a heavily
+    # documented or commented-out file
+    rng = random.Random(seed)
+    lines = []
+    for i in range(statements):
+        lines.append(f"// step {i}: " + " ".join(rng.choice("abcdefgh") * 6 for _ in range(10)))
+        lines.append(f"/* disabled: var x = {i}; */")
+        lines.append(f"var c{i % 100} = {i} + 1; // {i} plus one")
+    lines.append("print c0;")
+    return "\n".join(lines) + "\n"
+
+
+def print_heavy(lines: int) -> str:
+    # one print per line, alternating strings and numbers
+    return "".join(
+        f"print {i};\n" if i % 2 else f'print "line {i}";\n' for i in range(lines)
+    )
+
+
+def count_nodes(node) -> int:
+    # every Expr and Stmt in a tree, found through the dataclass fields
+    count = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        count += 1
+        for field in fields(node):
+            child = getattr(node, field.name)
+            if isinstance(child, (Expr, Stmt)):
+                stack.append(child)
+    return count
@@ -0,0 +1,147 @@
+import random
+import time
+
+from benchmarks.parser import corpus
+from benchmarks.programs import deep_arithmetic, string_concatenation, variable_heavy
+from expr import Binary, Expr, Unary
+from interpreter import Interpreter
+from output import CapturedOutput
+from parser import PrattParser
+from quickening import QuickeningInterpreter
+from resolver import Resolver
+from scanner import FastScanner
+from stmt import Stmt
+
+
+def parse(source: str):
+    statements = PrattParser(FastScanner(source, None).scan_tokens(), CapturedOutput()).parse()
+    if statements is not None:
+        Resolver().resolve(statements)
+    return statements
+
+
+def run(interpreter_class, statements, **globals) -> tuple[list[str], QuickeningInterpreter]:
+    interpreter = interpreter_class(CapturedOutput())
+    for name, value in globals.items():
+        interpreter.environment.define(name, value)
+    interpreter.interpret(statements)
+    return interpreter.output.lines, interpreter
+
+
+operands = ["1", "2.5", '"a"', '"b"', "true", "false", "nil", "x", "y", "z"]
+binary_operators = ["+", "-", "*", "/", "<", "<=", ">", ">=", "==", "!="]
+
+
+def expression(rng: random.Random, depth: int) -> str:
+    if depth == 0 or rng.random() < 0.3:
+        return rng.choice(operands)
+    if rng.random() < 0.2:
+        return f"{rng.choice('-!')}{expression(rng, depth - 1)}"
+    left = expression(rng, depth - 1)
+    right = expression(rng, depth - 1)
+    return f"({left} {rng.choice(binary_operators)} {right})"
+
+
+def programs(count: int = 2000, seed: int = 0):
+    # mostly well-typed arithmetic over variables of changing types, so
+    # nodes specialize, and some of it fails at runtime partway through
+    rng = random.Random(seed)
+    for _ in range(count):
+        lines = [f"var {name} = {rng.choice(operands[:7])};" for name in "xyz"]
+        for _ in range(rng.randint(1, 6)):
+            if rng.random() < 0.3:
+                lines.append(f"{rng.choice('xyz')} = {expression(rng, 3)};")
+            else:
+                lines.append(f"print {expression(rng, 3)};")
+        yield "\n".join(lines)
+
+
+def differential() -> int:
+    # every program twice on the same tree: once as it specializes, once
+    # specialized; both must print what the plain interpreter prints
+    cases = 0
+    mismatches = 0
+    for source in [*corpus(), *programs()]:
+        statements = parse(source)
+        if statements is None:
+            continue
+        cases += 1
+        expected, _ = run(Interpreter, statements)
+        for attempt in ("specializing", "specialized"):
+            if run(QuickeningInterpreter, statements)[0] != expected:
+                mismatches += 1
+                print(f"{attempt} mismatch on {source!r}")
+    print(f"differential: {cases} programs, {mismatches} mismatches")
+    return mismatches
+
+
+def best_of(fn, repeat: int = 5, setup=None) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def despecialize(node: Expr | Stmt):
+    # puts a tree's specialized nodes back to plain Binary and Unary
+    if isinstance(node, Binary):
+        node.__class__ = Binary
+        despecialize(node.left)
+        despecialize(node.right)
+    elif isinstance(node, Unary):
+        node.__class__ = Unary
+        despecialize(node.right)
+    else:
+        for name in getattr(type(node), "__slots__", ()):
+            child = getattr(node, name)
+            if isinstance(child, (Expr, Stmt)):
+                despecialize(child)
+
+
+def despecialize_all(statements):
+    # untimed: the walk costs more than the run it resets
+    for statement in statements:
+        despecialize(statement)
+
+
+def bench(name: str, source: str):
+    statements = parse(source)
+    plain = best_of(lambda: run(Interpreter, statements))
+    first = best_of(
+        lambda: run(QuickeningInterpreter, statements),
+        setup=lambda: despecialize_all(statements),
+    )
+    again = best_of(lambda: run(QuickeningInterpreter, statements))
+    _, interpreter = run(QuickeningInterpreter, statements)
+
+    print(name)
+    print(f"  Interpreter:                  {plain * 1e3:8.2f} ms")
+    print(f"  quickening, first run:        {first * 1e3:8.2f} ms  {plain / first:5.2f}x")
+    print(f"  quickening, specialized tree: {again * 1e3:8.2f} ms  {plain / again:5.2f}x")
+    despecialize_all(statements)
+
+
+def polymorphic(statements: int):
+    # the same tree run with float globals and then string ones: every node
+    # specialized on the first run fails its guard on the second
+    statements = parse("print x + y;\n" * statements)
+    _, interpreter = run(QuickeningInterpreter, statements, x=1.0, y=2.0)
+    print("polymorphic globals")
+    print(f"  floats:  specialized {dict(interpreter.specialized)}")
+    _, interpreter = run(QuickeningInterpreter, statements, x="a", y="b")
+    print(f"  strings: guard failures {dict(interpreter.guard_failures)}")
+    lines, _ = run(QuickeningInterpreter, statements, x="a", y="b")
+    assert lines == ["ab"] * len(statements)
+
+
+if __name__ == "__main__":
+    if differential():
+        raise SystemExit(1)
+    bench("arithmetic heavy", "".join(deep_arithmetic(12, seed) for seed in range(8)))
+    bench("variable heavy", variable_heavy(20000))
+    bench("string concatenation", string_concatenation(2000))
+    polymorphic(1000)
@@ -0,0 +1,66 @@
+import contextlib
+import io
+import time
+import timeit
+
+from benchmarks.programs import variable_heavy
+from expr import Variable
+from interpreter import Interpreter
+from parser import Parser
+from resolver import Resolver
+from scanner import FastScanner
+from token_type import TokenType
+from tokens import Token
+
+
+def best_of(statements, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        interpreter = Interpreter()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            interpreter.interpret(statements)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def per_access(number: int = 1000000) -> tuple[float, float]:
+    interpreter = Interpreter()
+    for i in range(50):
+        interpreter.environment.define(f"v{i}", float(i))
+        interpreter.slots.define_at(i, float(i))
+
+    name = Token(TokenType.IDENTIFIER, "v7", None, 1)
+    by_name = Variable(name)
+    by_slot = Variable(name, 0, 7)
+    return (
+        timeit.timeit(lambda: interpreter.evaluate(by_name), number=number) / number,
+        timeit.timeit(lambda: interpreter.evaluate(by_slot), number=number) / number,
+    )
+
+
+if __name__ == "__main__":
+    source = variable_heavy(20000)
+    tokens = FastScanner(source, None).scan_tokens()
+    accesses = sum(token.type == TokenType.IDENTIFIER for token in tokens)
+
+    by_name = Parser(tokens).parse()
+    by_slot = Parser(FastScanner(source, None).scan_tokens()).parse()
+
+    start = time.perf_counter()
+    Resolver().resolve(by_slot)
+    resolve_time = time.perf_counter() - start
+
+    named = best_of(by_name)
+    slotted = best_of(by_slot)
+
+    print(f"variable heavy: {accesses} variable declarations, reads and writes")
+    print(f"  dict Environment:  {named * 1e3:8.2f} ms")
+    print(f"  resolve:           {resolve_time * 1e3:8.2f} ms")
+    print(f"  SlotEnvironment:   {slotted * 1e3:8.2f} ms")
+    print(f"  speedup:           {named / slotted:8.2f}x")
+
+    named, slotted = per_access()
+    print("single variable read, including the call into evaluate")
+    print(f"  dict Environment:  {named * 1e9:8.1f} ns")
+    print(f"  SlotEnvironment:   {slotted * 1e9:8.1f} ns")
@@ -0,0 +1,94 @@
+import time
+
+import runtime
+from benchmarks.programs import accumulated_string
+from interpreter import Interpreter
+from lox import Lox
+from output import CapturedOutput
+from parser import PrattParser
+from resolver import Resolver
+from scanner import FastScanner
+from vm import VM
+
+
+def parse(source: str):
+    statements = PrattParser(FastScanner(source, None).scan_tokens(), CapturedOutput()).parse()
+    Resolver().resolve(statements)
+    return statements
+
+
+def timed(fn) -> tuple[float, list[str]]:
+    output = CapturedOutput()
+    start = time.perf_counter()
+    fn(output)
+    return time.perf_counter() - start, output.lines
+
+
+def flat(fn):
+    # the same run with ropes turned off, so every + copies
+    def run(output):
+        saved = runtime.min_rope_length
+        runtime.min_rope_length = float("inf")
+        try:
+            fn(output)
+        finally:
+            runtime.min_rope_length = saved
+
+    return run
+
+
+long = "x" * 200
+# sources that make ropes at runtime, and ones the optimizer folds into a
+# single long literal
+rope_sources = [
+    f'var a = "{long}" + "{long}";\nprint a;\nprint a == "{long}{long}";',
+    f'print "{long}" + ("{long}" + "{long}") == "{long}" + "{long}" + "{long}";',
+    accumulated_string(100),
+    accumulated_string(100) + f'print s + "{long}" == s + "{long}";\nprint s + 1;',
+    f'var a = "{long}";\nvar b = a + a;\nprint b + a;\nprint -b;',
+]
+
+
+def differential() -> int:
+    # every backend, optimized and not, must print what the interpreter
+    # prints with the optimizer off
+    mismatches = 0
+    for source in rope_sources:
+        runs = {}
+        for backend in ("interpreter", "closure", "vm", "python"):
+            for optimize in (False, True):
+                output = CapturedOutput()
+                try:
+                    Lox(backend=backend, optimize=optimize, output=output).run(source)
+                except Exception as e:
+                    output.write_line(f"{type(e).__name__}: {e}")
+                runs[backend, optimize] = output.lines
+        expected = runs["interpreter", False]
+        for key, lines in runs.items():
+            if lines != expected:
+                mismatches += 1
+                print(f"{key} mismatch on {source[:60]!r}...")
+    print(f"differential: {len(rope_sources)} sources, {mismatches} mismatches")
+    return mismatches
+
+
+if __name__ == "__main__":
+    if differential():
+        raise SystemExit(1)
+    # time per piece stays flat as the string grows with ropes, and grows
+    # with the string's length when every + copies it
+    print(f"{'pieces':>8} {'backend':<12} {'copying':>10} {'ropes':>10} {'per piece':>22}")
+    for pieces in (12_500, 25_000, 50_000, 100_000):
+        statements = parse(accumulated_string(pieces))
+        chunk = VM().compile(statements)
+        for backend, fn in [
+            ("interpreter", lambda output: Interpreter(output).interpret(statements)),
+            ("vm", lambda output: VM(output).interpret_compiled(chunk)),
+        ]:
+            copying, expected = timed(flat(fn))
+            ropes, lines = timed(fn)
+            assert lines == expected
+            print(
+                f"{pieces:>8} {backend:<12} {copying * 1e3:8.0f} ms {ropes * 1e3:8.0f} ms"
+                f"   {copying / pieces * 1e6:5.2f} us vs {ropes / pieces * 1e6:5.2f} us"
+            )
@@ -0,0 +1,47 @@
+import contextlib
+import io
+import time
+
+from benchmarks.programs import string_concatenation, variable_heavy
+from interpreter import Interpreter
+from parser import Parser
+from profiler import SamplingProfiler
+from resolver import Resolver
+from scanner import FastScanner
+
+
+def run(statements, sampler: SamplingProfiler | None) -> float:
+    start = time.perf_counter()
+    if sampler is not None:
+        sampler.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        Interpreter().interpret(statements)
+    if sampler is not None:
+        sampler.stop()
+    return time.perf_counter() - start
+
+
+def bench(name: str, source: str, interval: float, repeat: int = 7):
+    statements = Parser(FastScanner(source, None).scan_tokens()).parse()
+    Resolver().resolve(statements)
+
+    # alternate the two so drift in machine speed hits both alike
+    plain = sampled = float("inf")
+    samples = 0
+    for _ in range(repeat):
+        plain = min(plain, run(statements, None))
+        sampler = SamplingProfiler(interval)
+        sampled = min(sampled, run(statements, sampler))
+        samples = max(samples, sum(sampler.stacks.values()))
+
+    print(f"{name}, {interval * 1e3:g} ms interval")
+    print(f"  plain:   {plain * 1e3:8.2f} ms")
+    print(f"  sampled: {sampled * 1e3:8.2f} ms  overhead {(sampled / plain - 1) * 100:5.1f}%")
+    # the kernel delivers SIGPROF on its own tick, which can be coarser than
+    # the interval asked for
+    print(f"  {samples} samples, one per {sampled / samples * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    bench("variable heavy", variable_heavy(100000), 0.001)
+    bench("string concatenation", string_concatenation(10000), 0.001)
@@ -0,0 +1,154 @@
+import io
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.programs import deep_arithmetic, variable_heavy
+from scanner import (
+    BufferScanner,
+    FastScanner,
+    FileScanner,
+    MappedScanner,
+    ParallelScanner,
+    Scanner,
+)
+
+edge_cases = [
+    "",
+    "print 1;",
+    "var a = 1.5; var b = 1.; var c = .5;",
+    'print "multi\nline\nstring"; print 1;',
+    '"unterminated\nstring',
+    "/* block\ncomment */ print 1;",
+    "/* stops at the first star * then */",
+    "/* unterminated\ncomment",
+    "// line comment\n// another",
+    "a_b _c @ # $ ~ ` ^ & | ? : [ ]",
+    "café naïve über π2 x²",
+    "x1é 12é é1.5 andé € ¢x a€b",
+    'print "naïve\nstring"; π = "€";',
+    "!=!===<=<>=>=/ /* */ //",
+    "\t\r\n  \n\r\t",
+    "\f\v",
+    "and class else false for fun if nil or print return super this true var while",
+    "andy classic 123abc 1.2.3 1..2",
+    '"" "\\"" "a" "b',
+    'print "a\r\nb";\r\nprint 1;\r\n',
+    "var a = 1;\rprint b;\r// comment\rprint c;",
+    '/* a\r\nb\rc */ "d\r\ne\rf" // g\r\n"h',
+    "café\r\nnaïve\rü\r\n",
+    "1٣ 1.٣ 12.5٣ 1.55٣ ٣1 1.é 1é 2.x.٣ a.é1.2 1.2.٣",
+]
+
+fuzz_alphabet = "aZé_09٣ .\t\n\r\"/*+-!=<>;(){},@#"
+
+
+class Errors:
+    def __init__(self):
+        self.errors = []
+
+    def error(self, line: int, message: str):
+        self.errors.append((line, message))
+
+
+def scan(scanner_class, source: str):
+    errors = Errors()
+    tokens = scanner_class(source, errors).scan_tokens()
+    return tokens, errors.errors
+
+
+def scan_file(source: str, block_size: int):
+    # tiny blocks make sure lexemes get split across reads
+    errors = Errors()
+    tokens = list(FileScanner(io.StringIO(source), errors, block_size).iter_tokens())
+    return tokens, errors.errors
+
+
+def scan_buffer(source: str):
+    # materializes every token, to compare with the other scanners' lists
+    errors = Errors()
+    buffer = BufferScanner(source, errors).scan_buffer()
+    return [buffer[i] for i in range(len(buffer))], errors.errors
+
+
+def scan_mapped(source: str):
+    errors = Errors()
+    buffer = MappedScanner(source.encode(), errors).scan_buffer()
+    return [buffer[i] for i in range(len(buffer))], errors.errors
+
+
+def scan_parallel(source: str, executor, pieces: int):
+    # many pieces for a short source, so most newlines become boundaries
+    errors = Errors()
+    buffer = ParallelScanner(source, errors, executor, pieces).scan_buffer()
+    return [buffer[i] for i in range(len(buffer))], errors.errors
+
+
+def text_mode(source: str) -> str:
+    # the source as reading it from a file in text mode gives it, which is
+    # what a mapped file's bytes have to scan like
+    return source.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def corpus(fuzz_cases: int = 5000, seed: int = 0):
+    yield from edge_cases
+    with open("test.lox") as f:
+        yield f.read()
+    yield deep_arithmetic(8)
+    yield variable_heavy(500)
+
+    rng = random.Random(seed)
+    for _ in range(fuzz_cases):
+        yield "".join(rng.choices(fuzz_alphabet, k=rng.randint(1, 40)))
+
+
+def differential() -> int:
+    cases = 0
+    mismatches = 0
+    executor = ProcessPoolExecutor(2)
+    for source in corpus():
+        cases += 1
+        expected = scan(Scanner, source)
+        if expected != scan(FastScanner, source):
+            mismatches += 1
+            print(f"FastScanner mismatch on {source!r}")
+        if expected != scan_file(source, 7):
+            mismatches += 1
+            print(f"FileScanner mismatch on {source!r}")
+        if expected != scan_buffer(source):
+            mismatches += 1
+            print(f"BufferScanner mismatch on {source!r}")
+        if scan(Scanner, text_mode(source)) != scan_mapped(source):
+            mismatches += 1
+            print(f"MappedScanner mismatch on {source!r}")
+        if expected != scan_parallel(source, executor, 8):
+            mismatches += 1
+            print(f"ParallelScanner mismatch on {source!r}")
+    executor.shutdown()
+    print(f"differential: {cases} sources, {mismatches} mismatches")
+    return mismatches
+
+
+def best_of(scanner_class, source: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        scan(scanner_class, source)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    if differential():
+        sys.exit(1)
+
+    source = variable_heavy(40000)
+    tokens, _ = scan(Scanner, source)
+    reference = best_of(Scanner, source, 3)
+    fast = best_of(FastScanner, source, 3)
+
+    print(f"{len(source) / 1e6:.1f} MB source, {len(tokens)} tokens")
+    print(f"  Scanner:     {reference * 1e3:8.2f} ms  {len(tokens) / reference:12,.0f} tokens/s")
+    print(f"  FastScanner: {fast * 1e3:8.2f} ms  {len(tokens) / fast:12,.0f} tokens/s")
+    print(f"  speedup:     {reference / fast:8.2f}x")
@@ -0,0 +1,107 @@
+import argparse
+import io
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from client import request
+
+here = os.path.dirname(os.path.abspath(__file__))
+script = os.path.join(here, "corpus", "mortgage.lox")
+
+
+def latency(fn, runs: int) -> tuple[float, float]:
+    # median and 90th percentile, in seconds
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return statistics.median(times), times[int(len(times) * 0.9)]
+
+
+def command(*args: str):
+    return lambda: subprocess.run(
+        [sys.executable, *args], stdout=subprocess.DEVNULL, check=True
+    )
+
+
+def wait_for(path: str, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(path):
+        if time.monotonic() > deadline:
+            raise RuntimeError("the server didn't start")
+        time.sleep(0.01)
+
+
+def raw_request(line: bytes, socket_path: str) -> list[dict]:
+    # every reply to a request line sent as is, well formed or not
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(socket_path)
+        connection.sendall(line)
+        with connection.makefile("rb") as replies:
+            return [json.loads(reply) for reply in replies]
+
+
+bad_requests = [
+    b"not json\n",
+    b"\xff\xfe\n",
+    b"[1, 2]\n",
+    b"{}\n",
+    b'{"script": "x.lox"}\n',
+    b'{"source": 1}\n',
+    b'{"path": null}\n',
+]
+
+
+def check_bad_requests(socket_path: str) -> int:
+    # a request the server can't make sense of gets a message and usage
+    # status 64, not a dropped connection
+    failures = 0
+    for line in bad_requests:
+        replies = raw_request(line, socket_path)
+        if not replies or replies[-1] != {"status": 64} or "output" not in replies[0]:
+            failures += 1
+            print(f"{line!r}: {replies}")
+    print(f"bad requests: {len(bad_requests)} sent, {failures} failures")
+    return failures
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(prog="python -m benchmarks.serve")
+    arg_parser.add_argument(
+        "runs", nargs="?", type=int, default=20, metavar="N", help="runs of each case (default: 20)"
+    )
+    args = arg_parser.parse_args()
+    runs = args.runs
+    with tempfile.TemporaryDirectory() as tmp:
+        socket_path = os.path.join(tmp, "lox.sock")
+        cache_dir = os.path.join(tmp, "cache")
+        server = subprocess.Popen(
+            [sys.executable, "lox.py", "--serve", "--socket", socket_path],
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_for(socket_path)
+            if check_bad_requests(socket_path):
+                raise SystemExit(1)
+            cases = [
+                ("python lox.py --no-cache", command("lox.py", "--no-cache", script)),
+                ("python lox.py, warm cache", command("lox.py", "--cache-dir", cache_dir, script)),
+                ("python client.py", command("client.py", "--socket", socket_path, script)),
+                ("request from a live process", lambda: request({"path": script}, socket_path, io.StringIO())),
+            ]
+            print(f"{os.path.basename(script)}, {runs} runs each")
+            for name, fn in cases:
+                fn()  # warms the caches, the server's included
+                median, p90 = latency(fn, runs)
+                print(f"  {name:<28} median {median * 1e3:8.2f} ms   p90 {p90 * 1e3:8.2f} ms")
+        finally:
+            server.terminate()
+            server.wait()
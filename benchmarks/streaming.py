@@ -0,0 +1,65 @@
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def write_script(path: str, megabytes: float, variables: int = 1000):
+    # a long run of small statements over a fixed set of globals, so the
+    # interpreter's own state stays the same size however long the file is
+    target = int(megabytes * 1e6)
+    written = 0
+    i = 0
+    with open(path, "w") as f:
+        while written < target:
+            block = "".join(
+                f"var v{(i + j) % variables} = {j}.5 * 2 + 1; // filler\n"
+                for j in range(1000)
+            )
+            block += f"print v{i % variables};\n"
+            f.write(block)
+            written += len(block)
+            i += 1000
+
+
+def run(script: str, *flags: str) -> tuple[float, int]:
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "lox.py", *flags, script], stdout=subprocess.DEVNULL
+    )
+    _, status, usage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - start
+    if os.waitstatus_to_exitcode(status) != 0:
+        raise RuntimeError(f"lox.py {' '.join(flags)} failed")
+    # ru_maxrss is in kilobytes on Linux
+    return elapsed, usage.ru_maxrss * 1024
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(prog="python -m benchmarks.streaming")
+    arg_parser.add_argument(
+        "megabytes",
+        nargs="?",
+        type=float,
+        default=100,
+        metavar="MB",
+        help="size of the generated script (default: 100)",
+    )
+    args = arg_parser.parse_args()
+    megabytes = args.megabytes
+
+    with tempfile.TemporaryDirectory() as tmp:
+        script = os.path.join(tmp, "generated.lox")
+        write_script(script, megabytes)
+        size = os.path.getsize(script)
+        print(f"generated script: {size / 1e6:.1f} MB")
+
+        for name, flags in [
+            ("whole file", ()),
+            ("--mmap", ("--mmap",)),
+            ("--stream", ("--stream",)),
+        ]:
+            elapsed, rss = run(script, "--no-cache", *flags)
+            print(f"  {name:<10}  peak RSS {rss / 1e6:9.1f} MB  {elapsed:8.1f} s")
@@ -0,0 +1,71 @@
+import argparse
+import gc
+import time
+import tracemalloc
+
+from benchmarks.programs import comment_heavy, string_concatenation, variable_heavy
+from cache import paused_gc
+from parser import BufferParser, PrattParser
+from scanner import BufferScanner, FastScanner
+
+
+def traced(fn):
+    # fn's result, the bytes it allocated that are still alive, and the peak
+    gc.collect()
+    tracemalloc.start()
+    result = fn()
+    gc.collect()
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size, peak
+
+
+def best_of(fn, repeat: int = 3) -> float:
+    # with the collector paused, as Lox.parse runs the front end
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        with paused_gc():
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench(name: str, source: str):
+    tokens, token_bytes, _ = traced(lambda: FastScanner(source, None).scan_tokens())
+    buffer, buffer_bytes, _ = traced(lambda: BufferScanner(source, None).scan_buffer())
+    _, _, list_peak = traced(lambda: PrattParser(FastScanner(source, None).scan_tokens()).parse())
+    _, _, buffer_peak = traced(lambda: BufferParser(BufferScanner(source, None).scan_buffer()).parse())
+
+    scan_list = best_of(lambda: FastScanner(source, None).scan_tokens())
+    scan_buffer = best_of(lambda: BufferScanner(source, None).scan_buffer())
+    parse_list = best_of(lambda: PrattParser(tokens).parse())
+    parse_buffer = best_of(lambda: BufferParser(buffer).parse())
+
+    print(f"{name}: {len(source) / 1e6:.1f} MB source, {len(tokens)} tokens")
+    print(f"  token storage:  list {token_bytes / 1e6:8.1f} MB ({token_bytes / len(tokens):5.1f} B/token)"
+          f"   buffer {buffer_bytes / 1e6:8.1f} MB ({buffer_bytes / len(tokens):5.1f} B/token)")
+    print(f"  scan + parse peak:  list {list_peak / 1e6:8.1f} MB   buffer {buffer_peak / 1e6:8.1f} MB")
+    print(f"  scan:   list {scan_list * 1e3:8.1f} ms   buffer {scan_buffer * 1e3:8.1f} ms  {scan_list / scan_buffer:5.2f}x")
+    print(f"  parse:  list {parse_list * 1e3:8.1f} ms   buffer {parse_buffer * 1e3:8.1f} ms  {parse_list / parse_buffer:5.2f}x")
+    both_list = scan_list + parse_list
+    both_buffer = scan_buffer + parse_buffer
+    print(f"  both:   list {both_list * 1e3:8.1f} ms   buffer {both_buffer * 1e3:8.1f} ms  {both_list / both_buffer:5.2f}x")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(prog="python -m benchmarks.token_buffer")
+    arg_parser.add_argument(
+        "scale",
+        nargs="?",
+        type=int,
+        default=1,
+        metavar="N",
+        help="multiplies the size of the generated sources (default: 1)",
+    )
+    args = arg_parser.parse_args()
+    scale = args.scale
+    bench("many vars", variable_heavy(60000 * scale))
+    bench("string concatenation", string_concatenation(4000 * scale))
+    bench("heavy comments", comment_heavy(40000 * scale))
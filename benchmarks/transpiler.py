@@ -0,0 +1,86 @@
+import contextlib
+import io
+import time
+
+from benchmarks.programs import deep_arithmetic, digit_variables, variable_heavy
+from closure_compiler import ClosureInterpreter
+from interpreter import Interpreter
+from lox import Lox
+from output import CapturedOutput
+from parser import Parser
+from resolver import Resolver
+from scanner import FastScanner
+from transpiler import PythonBackend
+
+
+def best_of(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_compiled(code, namespace, tokens):
+    exec(code, namespace)
+    namespace["_lox_program"](tokens)
+
+
+# names Python would take for the same identifier once NFKC-normalized
+name_sources = [
+    "var fi = 1;\nvar ﬁ = 2;\nprint fi;\nprint ﬁ;",
+    "var ﬁ = 2;\nvar fi = 1;\nprint ﬁ;\nfi = 3;\nprint ﬁ + fi;",
+    "var x² = 1;\nvar x2 = 2;\nprint x²;\nprint x2;",
+    "var Ａ = 1;\nvar A = 2;\nprint Ａ;",
+]
+
+
+def differential() -> int:
+    # the python backend must print what the interpreter prints
+    mismatches = 0
+    for source in name_sources:
+        runs = {}
+        for backend in ("interpreter", "python"):
+            output = CapturedOutput()
+            Lox(backend=backend, output=output).run(source)
+            runs[backend] = output.lines
+        if runs["python"] != runs["interpreter"]:
+            mismatches += 1
+            print(f"mismatch on {source!r}: {runs}")
+    print(f"differential: {len(name_sources)} sources, {mismatches} mismatches")
+    return mismatches
+
+
+def bench(name: str, source: str):
+    statements = Parser(FastScanner(source, None).scan_tokens()).parse()
+    Resolver().resolve(statements)
+
+    tree = best_of(lambda: Interpreter().interpret(statements))
+    closures = best_of(lambda: ClosureInterpreter().interpret(statements))
+    python = best_of(lambda: PythonBackend().interpret(statements))
+
+    backend = PythonBackend()
+    program = backend.compile(statements)
+    run_time = best_of(lambda: run_compiled(program.code, backend.namespace, program.tokens))
+
+    print(name)
+    print(f"  tree-walking interpreter:    {tree * 1e3:8.2f} ms")
+    print(f"  closures, compile + run:     {closures * 1e3:8.2f} ms  {tree / closures:5.2f}x")
+    print(f"  python, transpile + run:     {python * 1e3:8.2f} ms  {tree / python:5.2f}x")
+    print(f"  python, run only:            {run_time * 1e3:8.2f} ms  {tree / run_time:5.2f}x")
+
+
+if __name__ == "__main__":
+    if differential():
+        raise SystemExit(1)
+    # CPython folds an expression over literals when it compiles the
+    # generated code, which would leave nothing for "run only" to time, so
+    # the operands are read from variables
+    bench(
+        "arithmetic heavy",
+        digit_variables()
+        + "".join(deep_arithmetic(12, seed, variables=True) for seed in range(8)),
+    )
+    bench("variable heavy", variable_heavy(20000))
@@ -0,0 +1,40 @@
+import contextlib
+import io
+import time
+
+from benchmarks.programs import deep_arithmetic, variable_heavy
+from interpreter import Interpreter
+from parser import Parser
+from scanner import Scanner
+from vm import VM
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench(name: str, source: str, repeat: int = 5):
+    statements = Parser(Scanner(source, None).scan_tokens()).parse()
+
+    tree = best_of(lambda: Interpreter().interpret(statements), repeat)
+    chunk = VM().compiler.compile(statements)
+    compile_time = best_of(lambda: VM().compiler.compile(statements), repeat)
+    run_time = best_of(lambda: VM().run(chunk), repeat)
+
+    print(f"{name}: {len(chunk.code)} code words, {len(chunk.constants)} constants")
+    print(f"  tree-walking interpreter: {tree * 1e3:8.2f} ms")
+    print(f"  vm compile:               {compile_time * 1e3:8.2f} ms")
+    print(f"  vm run:                   {run_time * 1e3:8.2f} ms")
+    print(f"  speedup (run only):       {tree / run_time:8.2f}x")
+    print(f"  speedup (compile + run):  {tree / (compile_time + run_time):8.2f}x")
+
+
+if __name__ == "__main__":
+    bench("deep arithmetic", "".join(deep_arithmetic(12, seed) for seed in range(8)))
+    bench("variable heavy", variable_heavy(20000))
@@ -0,0 +1,90 @@
+from array import array
+from enum import IntEnum
+from typing import Any
+
+
+class OpCode(IntEnum):
+    CONSTANT = 0
+    NIL = 1
+    TRUE = 2
+    FALSE = 3
+    POP = 4
+    GET_GLOBAL = 5
+    DEFINE_GLOBAL = 6
+    SET_GLOBAL = 7
+    EQUAL = 8
+    NOT_EQUAL = 9
+    GREATER = 10
+    GREATER_EQUAL = 11
+    LESS = 12
+    LESS_EQUAL = 13
+    ADD = 14
+    SUBTRACT = 15
+    MULTIPLY = 16
+    DIVIDE = 17
+    NOT = 18
+    NEGATE = 19
+    PRINT = 20
+    RETURN = 21
+
+
+# opcodes followed by a single operand, an index into the constant pool
+OPERAND_OPS = {
+    OpCode.CONSTANT,
+    OpCode.GET_GLOBAL,
+    OpCode.DEFINE_GLOBAL,
+    OpCode.SET_GLOBAL,
+    OpCode.GREATER,
+    OpCode.GREATER_EQUAL,
+    OpCode.LESS,
+    OpCode.LESS_EQUAL,
+    OpCode.ADD,
+    OpCode.SUBTRACT,
+    OpCode.MULTIPLY,
+    OpCode.DIVIDE,
+    OpCode.NEGATE,
+}
+
+
+class Chunk:
+    def __init__(self):
+        self.code = array("I")
+        self.constants: list[Any] = []
+        self.constant_index: dict[Any, int] = {}
+
+    def write(self, op: OpCode, operand: int | None = None):
+        if operand is None:
+            self.code.append(op)
+        else:
+            self.code.extend((op, operand))
+
+    def add_constant(self, value: Any) -> int:
+        # numbers and strings are shared; tokens are kept per use site so that
+        # errors still point at the right line
+        if isinstance(value, (float, str)):
+            # 0.0 == -0.0, so zeros are keyed by their sign as well
+            key = (type(value), value, str(value) if value == 0 else None)
+            index = self.constant_index.get(key)
+            if index is None:
+                index = self.constant_index[key] = len(self.constants)
+                self.constants.append(value)
+            return index
+
+        self.constants.append(value)
+        return len(self.constants) - 1
+
+    def disassemble(self) -> str:
+        lines = []
+        ip = 0
+        while ip < len(self.code):
+            op = OpCode(self.code[ip])
+            if op in OPERAND_OPS:
+                operand = self.code[ip + 1]
+                lines.append(
+                    f"{ip:04d} {op.name:<16} {operand:4d} {self.constants[operand]!r}"
+                )
+                ip += 2
+            else:
+                lines.append(f"{ip:04d} {op.name}")
+                ip += 1
+        return "\n".join(lines)
@@ -0,0 +1,253 @@
+import contextlib
+import copyreg
+import gc
+import hashlib
+import io
+import marshal
+import mmap
+import os
+import pickle
+import sys
+import threading
+import types
+from collections import OrderedDict
+from dataclasses import fields
+from operator import attrgetter
+from typing import Any
+
+from expr import Expr
+from stmt import Stmt
+from tokens import Token
+
+magic = b"LOXC"
+default_max_size = 64 << 20
+
+# the modules whose output ends up in a cached program; editing any of them
+# changes the implementation version and so invalidates every entry. The
+# optimizer folds constants by evaluating them with the interpreter, whose
+# values come from runtime, so those two are in it as well.
+cached_modules = [
+    "scanner",
+    "parser",
+    "resolver",
+    "optimizer",
+    "interpreter",
+    "runtime",
+    "expr",
+    "stmt",
+    "tokens",
+    "token_type",
+    "bytecode",
+    "compiler",
+    "transpiler",
+    "cache",
+]
+
+
+def default_directory() -> str:
+    if "LOX_CACHE_DIR" in os.environ:
+        return os.environ["LOX_CACHE_DIR"]
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "lox")
+
+
+def implementation_version() -> str:
+    digest = hashlib.sha256(sys.version.encode())
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name in cached_modules:
+        with open(os.path.join(here, name + ".py"), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+@contextlib.contextmanager
+def paused_gc():
+    # a parsed program is hundreds of thousands of small objects, and the
+    # collections that building or reducing them triggers would cost more
+    # than the pickling itself
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def node_reducer(cls: type):
+    names = [field.name for field in fields(cls)]
+    if len(names) == 1:
+        getter = attrgetter(names[0])
+        return lambda node: (cls, (getter(node),))
+    getter = attrgetter(*names)
+    return lambda node: (cls, getter(node))
+
+
+def code_reducer(code: types.CodeType):
+    return marshal.loads, (marshal.dumps(code),)
+
+
+# Slotted dataclasses pickle through a __getstate__ written in Python, which
+# makes loading slower than parsing; reducing them to a constructor call keeps
+# both sides in pickle's C code. Code objects from the transpiler have no
+# pickle support at all and go through marshal.
+dispatch_table = copyreg.dispatch_table.copy()
+for cls in [Token, *Expr.__subclasses__(), *Stmt.__subclasses__()]:
+    dispatch_table[cls] = node_reducer(cls)
+dispatch_table[types.CodeType] = code_reducer
+
+
+class ProgramCache:
+    # Keeps programs that have been through the front end (and whatever
+    # compilation the backend does) on disk, so running an unchanged script
+    # again skips straight to executing it.
+    #
+    # An entry's file name is a hash of the implementation version, the
+    # options that shaped the program and the source. The file starts with a
+    # magic number and a hash of its body, and the body repeats the version
+    # and the source hash: entries that don't match are stale, ones that
+    # don't check out or won't unpickle are corrupt, and both are treated as
+    # a miss and rebuilt. Loading an entry touches its mtime, and once the
+    # directory outgrows max_size the least recently used entries go first.
+    #
+    # The cache must never stop a script from running, so filesystem errors
+    # just turn into misses.
+
+    def __init__(self, directory: str | None = None, max_size: int = default_max_size):
+        self.directory = directory or default_directory()
+        self.max_size = max_size
+        self.version = implementation_version()
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, source: str | mmap.mmap, options: str) -> tuple[str, str]:
+        # a mapped file is hashed as it is, without copying it. For a UTF-8
+        # file with only \n newlines that is the same as hashing the text
+        # read from it, so --mmap and plain runs share an entry; reading
+        # text turns \r\n and \r into \n, though, so a file with those gets
+        # one entry per mode (each of them right)
+        data = source.encode() if isinstance(source, str) else source
+        source_hash = hashlib.sha256(data).hexdigest()
+        key = hashlib.sha256(f"{self.version}\0{options}\0{source_hash}".encode())
+        return os.path.join(self.directory, key.hexdigest() + ".loxc"), source_hash
+
+    def load(self, source: str | mmap.mmap, options: str) -> Any | None:
+        path, source_hash = self.path(source, options)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            self.misses += 1
+            return None
+
+        program = self.decode(data, source_hash, options)
+        if program is None:
+            self.misses += 1
+            self.discard(path)
+            return None
+
+        self.hits += 1
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return program
+
+    def decode(self, data: bytes, source_hash: str, options: str) -> Any | None:
+        body = data[36:]
+        if data[:4] != magic or data[4:36] != hashlib.sha256(body).digest():
+            return None
+        try:
+            with paused_gc():
+                version, entry_options, entry_hash, program = pickle.loads(body)
+        except Exception:
+            return None
+        if (version, entry_options, entry_hash) != (self.version, options, source_hash):
+            return None
+        return program
+
+    def store(self, source: str | mmap.mmap, options: str, program: Any):
+        path, source_hash = self.path(source, options)
+        buffer = io.BytesIO()
+        pickler = pickle.Pickler(buffer, pickle.HIGHEST_PROTOCOL)
+        pickler.dispatch_table = dispatch_table
+        try:
+            with paused_gc():
+                pickler.dump((self.version, options, source_hash, program))
+        except (pickle.PicklingError, RecursionError, TypeError):
+            return
+        body = buffer.getvalue()
+
+        temporary = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(temporary, "wb") as f:
+                f.write(magic + hashlib.sha256(body).digest() + body)
+            os.replace(temporary, path)
+        except OSError:
+            self.discard(temporary)
+            return
+        self.evict()
+
+    def evict(self):
+        entries = []
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.name.endswith(".loxc"):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError:
+            return
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            self.discard(path)
+            total -= size
+
+    def discard(self, path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class MemoryCache:
+    # Programs kept in memory by a long-running server, with the same load
+    # and store as ProgramCache. Entries are keyed by the options and a hash
+    # of the source; there is no version to check, since the code that built
+    # them is the code that's running. At most max_entries are kept, and the
+    # least recently used go first. Requests are served from several threads,
+    # so every access holds the lock.
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.entries: OrderedDict[str, Any] = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, source: str | mmap.mmap, options: str) -> str:
+        data = source.encode() if isinstance(source, str) else source
+        return f"{options}\0{hashlib.sha256(data).hexdigest()}"
+
+    def load(self, source: str | mmap.mmap, options: str) -> Any | None:
+        key = self.key(source, options)
+        with self.lock:
+            program = self.entries.get(key)
+            if program is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return program
+
+    def store(self, source: str | mmap.mmap, options: str, program: Any):
+        key = self.key(source, options)
+        with self.lock:
+            self.entries[key] = program
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
@@ -0,0 +1,60 @@
+import json
+import os
+import socket
+import sys
+from typing import Any, TextIO
+
+# The thin client for lox.py --serve. It imports nothing of the interpreter,
+# so running a script through a server costs little more than starting
+# Python and one round trip over the socket.
+#
+# A request is one line of JSON, {"path": ...} or {"source": ...}. The server
+# answers with lines of JSON too: {"output": text} as the script's output is
+# flushed, then {"status": n}, the status lox.py would have exited with.
+
+
+def default_socket() -> str:
+    if "LOX_SOCKET" in os.environ:
+        return os.environ["LOX_SOCKET"]
+    directory = os.environ.get("XDG_RUNTIME_DIR") or "/tmp"
+    return os.path.join(directory, f"lox-{os.getuid()}.sock")
+
+
+def request(message: dict[str, Any], socket_path: str, out: TextIO) -> int:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(socket_path)
+        connection.sendall(json.dumps(message).encode() + b"\n")
+        with connection.makefile("r", encoding="utf-8") as replies:
+            for line in replies:
+                reply = json.loads(line)
+                if "status" in reply:
+                    return reply["status"]
+                out.write(reply["output"])
+                out.flush()
+    raise ConnectionError("the server closed the connection before the script finished")
+
+
+def main(argv: list[str]) -> int:
+    socket_path = default_socket()
+    if len(argv) == 3 and argv[0] == "--socket":
+        socket_path = argv[1]
+        argv = argv[2:]
+    if len(argv) != 1:
+        print("usage: client.py [--socket PATH] script.lox | -", file=sys.stderr)
+        return 64
+
+    # paths are sent whole, since the server has its own working directory;
+    # "-" sends the source from stdin instead
+    if argv[0] == "-":
+        message = {"source": sys.stdin.read()}
+    else:
+        message = {"path": os.path.abspath(argv[0])}
+    try:
+        return request(message, socket_path, sys.stdout)
+    except OSError as e:
+        print(f"client.py: can't reach a server at {socket_path}: {e}", file=sys.stderr)
+        return 69
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,290 @@
+import asyncio
+from typing import Any, Callable, Iterable
+
+from environment import Environment, SlotEnvironment
+from error import LoxRuntimeError
+from expr import Assign, Binary, Grouping, Literal, Unary, Variable
+from interpreter import check_slice_size, default_slice_size
+from output import Output
+from runtime import (
+    check_number_operands,
+    concat,
+    is_equal,
+    is_truthy,
+    plus_operands_error,
+    stringify,
+    strings,
+)
+from stmt import Expression, Print, Stmt, Var
+from token_type import TokenType
+from visitor import Visitor
+
+# called with the ClosureInterpreter that runs it
+Thunk = Callable[[Any], Any]
+
+
+class ClosureCompiler(Visitor):
+    # Turns each node into a Python closure once, specialized on everything
+    # that is fixed at compile time: the operator, the child closures, and
+    # where a variable lives. Running a tree is then just calling closures,
+    # with no visitor dispatch and no operator comparisons. The closures are
+    # passed the ClosureInterpreter running them, and find the globals, the
+    # slots and the output on it, so one compiled program can be run by any
+    # number of interpreters (see Lox.prepare).
+
+    def compile(self, stmt: Stmt) -> Thunk:
+        return stmt.accept(self)
+
+    def visit_binary_expr(self, expr: Binary) -> Thunk:
+        left = expr.left.accept(self)
+        right = expr.right.accept(self)
+        operator = expr.operator
+        op = operator.type
+
+        if op == TokenType.PLUS:
+
+            def plus(run):
+                a = left(run)
+                b = right(run)
+                if type(a) is float and type(b) is float:
+                    return a + b
+                if type(a) in strings and type(b) in strings:
+                    return concat(a, b)
+                raise plus_operands_error(operator, a, b)
+
+            return plus
+
+        if op == TokenType.MINUS:
+
+            def minus(run):
+                a = left(run)
+                b = right(run)
+                if type(a) is not float or type(b) is not float:
+                    check_number_operands(operator, a, b)
+                return a - b
+
+            return minus
+
+        if op == TokenType.STAR:
+
+            def star(run):
+                a = left(run)
+                b = right(run)
+                if type(a) is not float or type(b) is not float:
+                    check_number_operands(operator, a, b)
+                return a * b
+
+            return star
+
+        if op == TokenType.SLASH:
+
+            def slash(run):
+                a = left(run)
+                b = right(run)
+                if type(a) is not float or type(b) is not float:
+                    check_number_operands(operator, a, b)
+                return a / b
+
+            return slash
+
+        if op == TokenType.GREATER:
+
+            def greater(run):
+                a = left(run)
+                b = right(run)
+                if type(a) is not float or type(b) is not float:
+                    check_number_operands(operator, a, b)
+                return a > b
+
+            return greater
+
+        if op == TokenType.GREATER_EQUAL:
+
+            def greater_equal(run):
+                a = left(run)
+                b = right(run)
+                if type(a) is not float or type(b) is not float:
+                    check_number_operands(operator, a, b)
+                return a >= b
+
+            return greater_equal
+
+        if op == TokenType.LESS:
+
+            def less(run):
+                a = left(run)
+                b = right(run)
+                if type(a) is not float or type(b) is not float:
+                    check_number_operands(operator, a, b)
+                return a < b
+
+            return less
+
+        if op == TokenType.LESS_EQUAL:
+
+            def less_equal(run):
+                a = left(run)
+                b = right(run)
+                if type(a) is not float or type(b) is not float:
+                    check_number_operands(operator, a, b)
+                return a <= b
+
+            return less_equal
+
+        if op == TokenType.BANG_EQUAL:
+            return lambda run: not is_equal(left(run), right(run))
+
+        if op == TokenType.EQUAL_EQUAL:
+            return lambda run: is_equal(left(run), right(run))
+
+        def unknown(run):
+            left(run)
+            right(run)
+            raise LoxRuntimeError(operator, f"Unknown operator {operator}")
+
+        return unknown
+
+    def visit_grouping_expr(self, expr: Grouping) -> Thunk:
+        return expr.expression.accept(self)
+
+    def visit_literal_expr(self, expr: Literal) -> Thunk:
+        value = expr.value
+        return lambda run: value
+
+    def visit_unary_expr(self, expr: Unary) -> Thunk:
+        right = expr.right.accept(self)
+        operator = expr.operator
+
+        if operator.type == TokenType.MINUS:
+
+            def negate(run):
+                a = right(run)
+                if type(a) is not float:
+                    check_number_operands(operator, a)
+                return -a
+
+            return negate
+
+        if operator.type == TokenType.BANG:
+            return lambda run: not is_truthy(right(run))
+
+        def unknown(run):
+            right(run)
+
+        return unknown
+
+    def visit_variable_expr(self, expr: Variable) -> Thunk:
+        if expr.slot < 0:
+            name = expr.name
+            return lambda run: run.environment.get(name)
+
+        slot = expr.slot
+        if expr.depth == 0:
+            return lambda run: run.values[slot]
+
+        depth = expr.depth
+        return lambda run: run.slots.get_at(depth, slot)
+
+    def visit_assign_expr(self, expr: Assign) -> Thunk:
+        value = expr.value.accept(self)
+
+        if expr.slot < 0:
+            name = expr.name
+
+            def assign_name(run):
+                result = value(run)
+                run.environment.assign(name, result)
+                return result
+
+            return assign_name
+
+        depth = expr.depth
+        slot = expr.slot
+
+        def assign_slot(run):
+            result = value(run)
+            run.slots.assign_at(depth, slot, result)
+            return result
+
+        return assign_slot
+
+    def visit_expression_stmt(self, stmt: Expression) -> Thunk:
+        return stmt.expression.accept(self)
+
+    def visit_print_stmt(self, stmt: Print) -> Thunk:
+        expression = stmt.expression.accept(self)
+        return lambda run: run.output.write_line(stringify(expression(run)))
+
+    def visit_var_stmt(self, stmt: Var) -> Thunk:
+        if stmt.initializer is None:
+            initializer = lambda run: None
+        else:
+            initializer = stmt.initializer.accept(self)
+
+        if stmt.slot < 0:
+            name = stmt.name.lexeme
+            return lambda run: run.environment.define(name, initializer(run))
+
+        slot = stmt.slot
+        return lambda run: run.slots.define_at(slot, initializer(run))
+
+
+class ClosureInterpreter:
+    def __init__(self, output: Output | None = None):
+        self.environment = Environment()
+        self.slots = SlotEnvironment()
+        # define_at extends the list in place, so this stays the slots' list
+        self.values = self.slots.values
+        self.output = Output() if output is None else output
+        self.compiler = ClosureCompiler()
+        self.had_runtime_error = False
+
+    def compile(self, statements: Iterable[Stmt]) -> list[Thunk]:
+        return [self.compiler.compile(statement) for statement in statements]
+
+    def interpret(self, statements: Iterable[Stmt]):
+        compile = self.compiler.compile
+        try:
+            for statement in statements:
+                compile(statement)(self)
+        except LoxRuntimeError as e:
+            self.output.write_line(str(e))
+            self.had_runtime_error = True
+        finally:
+            self.output.flush()
+
+    def interpret_compiled(self, thunks: Iterable[Thunk]):
+        try:
+            for thunk in thunks:
+                thunk(self)
+        except LoxRuntimeError as e:
+            self.output.write_line(str(e))
+            self.had_runtime_error = True
+        finally:
+            self.output.flush()
+
+    async def interpret_async(
+        self, statements: Iterable[Stmt], slice_size: int = default_slice_size
+    ):
+        compile = self.compiler.compile
+        thunks = (compile(statement) for statement in statements)
+        await self.interpret_compiled_async(thunks, slice_size)
+
+    async def interpret_compiled_async(
+        self, thunks: Iterable[Thunk], slice_size: int = default_slice_size
+    ):
+        # as Interpreter.interpret_async does
+        check_slice_size(slice_size)
+        left = slice_size
+        try:
+            for thunk in thunks:
+                thunk(self)
+                left -= 1
+                if left == 0:
+                    left = slice_size
+                    await asyncio.sleep(0)
+        except LoxRuntimeError as e:
+            self.output.write_line(str(e))
+            self.had_runtime_error = True
+        finally:
+            self.output.flush()
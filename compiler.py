@@ -0,0 +1,86 @@
+from bytecode import Chunk, OpCode
+from expr import Assign, Binary, Grouping, Literal, Unary, Variable
+from stmt import Expression, Print, Stmt, Var
+from token_type import TokenType
+from visitor import Visitor
+
+binary_ops = {
+    TokenType.MINUS: OpCode.SUBTRACT,
+    TokenType.SLASH: OpCode.DIVIDE,
+    TokenType.STAR: OpCode.MULTIPLY,
+    TokenType.PLUS: OpCode.ADD,
+    TokenType.GREATER: OpCode.GREATER,
+    TokenType.GREATER_EQUAL: OpCode.GREATER_EQUAL,
+    TokenType.LESS: OpCode.LESS,
+    TokenType.LESS_EQUAL: OpCode.LESS_EQUAL,
+}
+
+
+class Compiler(Visitor):
+    def __init__(self):
+        self.chunk = Chunk()
+
+    def compile(self, statements: list[Stmt]) -> Chunk:
+        self.chunk = Chunk()
+        self.code = self.chunk.code
+        self.constant = self.chunk.add_constant
+        for statement in statements:
+            statement.accept(self)
+        self.code.append(OpCode.RETURN)
+        return self.chunk
+
+    def visit_binary_expr(self, expr: Binary):
+        expr.left.accept(self)
+        expr.right.accept(self)
+
+        op = expr.operator.type
+        if op == TokenType.BANG_EQUAL:
+            self.code.append(OpCode.NOT_EQUAL)
+        elif op == TokenType.EQUAL_EQUAL:
+            self.code.append(OpCode.EQUAL)
+        else:
+            # the operator token rides along so runtime errors can report it
+            self.code.extend((binary_ops[op], self.constant(expr.operator)))
+
+    def visit_grouping_expr(self, expr: Grouping):
+        expr.expression.accept(self)
+
+    def visit_literal_expr(self, expr: Literal):
+        if expr.value is None:
+            self.code.append(OpCode.NIL)
+        elif expr.value is True:
+            self.code.append(OpCode.TRUE)
+        elif expr.value is False:
+            self.code.append(OpCode.FALSE)
+        else:
+            self.code.extend((OpCode.CONSTANT, self.constant(expr.value)))
+
+    def visit_unary_expr(self, expr: Unary):
+        expr.right.accept(self)
+
+        if expr.operator.type == TokenType.MINUS:
+            self.code.extend((OpCode.NEGATE, self.constant(expr.operator)))
+        elif expr.operator.type == TokenType.BANG:
+            self.code.append(OpCode.NOT)
+
+    def visit_variable_expr(self, expr: Variable):
+        self.code.extend((OpCode.GET_GLOBAL, self.constant(expr.name)))
+
+    def visit_assign_expr(self, expr: Assign):
+        expr.value.accept(self)
+        self.code.extend((OpCode.SET_GLOBAL, self.constant(expr.name)))
+
+    def visit_expression_stmt(self, stmt: Expression):
+        stmt.expression.accept(self)
+        self.code.append(OpCode.POP)
+
+    def visit_print_stmt(self, stmt: Print):
+        stmt.expression.accept(self)
+        self.code.append(OpCode.PRINT)
+
+    def visit_var_stmt(self, stmt: Var):
+        if stmt.initializer is not None:
+            stmt.initializer.accept(self)
+        else:
+            self.code.append(OpCode.NIL)
+        self.code.extend((OpCode.DEFINE_GLOBAL, self.constant(stmt.name.lexeme)))
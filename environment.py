@@ -12,14 +12,56 @@ class Environment:
         self.values[name] = value
 
     def get(self, name: Token):
-        if name.lexeme in self.values.keys():
+        # names are interned by the scanner, so a hit is found by identity
+        # and one lookup does
+        try:
             return self.values[name.lexeme]
+        except KeyError:
+            pass
 
         raise LoxRuntimeError(name, "Undefined variable '" + name.lexeme + "'.")
 
     def assign(self, name: Token, value: Any):
-        if name.lexeme in self.values.keys():
-            self.values[name.lexeme] = value
+        # as in get, one lookup: the store itself, which only adds an entry,
+        # taken back out, if the name wasn't defined
+        values = self.values
+        size = len(values)
+        values[name.lexeme] = value
+        if len(values) == size:
             return
 
+        del values[name.lexeme]
         raise LoxRuntimeError(name, "Undefined variable '" + name.lexeme + "'.")
+
+
+class SlotEnvironment:
+    # Variables live in a list at the slot the Resolver gave them, so reads
+    # and writes index instead of hashing names. Whether a name is defined was
+    # settled during resolution, so no check is made here.
+
+    def __init__(self, enclosing: "SlotEnvironment | None" = None):
+        self.values: list[Any] = []
+        self.enclosing = enclosing
+
+    def define_at(self, slot: int, value: Any):
+        values = self.values
+        if slot >= len(values):
+            values.extend([None] * (slot + 1 - len(values)))
+        values[slot] = value
+
+    def ancestor(self, depth: int) -> "SlotEnvironment":
+        environment = self
+        for _ in range(depth):
+            environment = environment.enclosing
+        return environment
+
+    def get_at(self, depth: int, slot: int) -> Any:
+        if depth == 0:
+            return self.values[slot]
+        return self.ancestor(depth).values[slot]
+
+    def assign_at(self, depth: int, slot: int, value: Any):
+        if depth == 0:
+            self.values[slot] = value
+        else:
+            self.ancestor(depth).values[slot] = value
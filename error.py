@@ -9,6 +9,12 @@ class LoxError(ABC):
         return f"[line {line}] Error {where}: {message}"
 
 
+class ScanError(LoxError, Exception):
+    def __init__(self, line: int, message: str):
+        msg = self.make_error(line, "", message)
+        super().__init__(msg)
+
+
 class ParseError(LoxError, Exception):
     def __init__(self, token: Token, message: str):
         if token.type == TokenType.EOF:
@@ -23,3 +29,11 @@ class LoxRuntimeError(LoxError, Exception):
     def __init__(self, token: Token, message: str):
         msg = self.make_error(token.line, "", message)
         super().__init__(msg)
+
+
+class PrepareError(Exception):
+    # raised by Lox.prepare for a script that doesn't scan or parse, with
+    # the errors that were reported, one per line
+    def __init__(self, messages: list[str]):
+        super().__init__("\n".join(messages))
+        self.messages = messages
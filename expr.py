@@ -4,34 +4,59 @@ from abc import ABC, abstractmethod
 from dataclasses import dataclass
 
 class Expr(ABC):
+	__slots__ = ()
+
+	@abstractmethod
 	def accept(self, visitor):
-		return visitor.visit(self)
+		pass
 
-@dataclass
+@dataclass(slots=True)
 class Binary(Expr):
 	left: Expr
 	operator: Token
 	right: Expr
 
-@dataclass
+	def accept(self, visitor):
+		return visitor.visit_binary_expr(self)
+
+@dataclass(slots=True)
 class Grouping(Expr):
 	expression: Expr
 
-@dataclass
+	def accept(self, visitor):
+		return visitor.visit_grouping_expr(self)
+
+@dataclass(slots=True)
 class Literal(Expr):
 	value: Any
 
-@dataclass
+	def accept(self, visitor):
+		return visitor.visit_literal_expr(self)
+
+@dataclass(slots=True)
 class Unary(Expr):
 	operator: Token
 	right: Expr
 
-@dataclass
+	def accept(self, visitor):
+		return visitor.visit_unary_expr(self)
+
+@dataclass(slots=True)
 class Variable(Expr):
 	name: Token
+	depth: int = -1
+	slot: int = -1
+
+	def accept(self, visitor):
+		return visitor.visit_variable_expr(self)
 
-@dataclass
+@dataclass(slots=True)
 class Assign(Expr):
 	name: Token
 	value: Expr
+	depth: int = -1
+	slot: int = -1
+
+	def accept(self, visitor):
+		return visitor.visit_assign_expr(self)
 
@@ -18,16 +18,26 @@ def generate_ast(
     # expression classes
 
     code.append(f"\nclass {base_name}(ABC):\n")
+    code.append("\t__slots__ = ()\n\n")
+    code.append("\t@abstractmethod\n")
     code.append("\tdef accept(self, visitor):\n")
-    code.append("\t\treturn visitor.visit(self)\n\n")
+    code.append("\t\tpass\n\n")
 
+    # node classes are slotted, so that nodes carry no per-instance __dict__,
+    # and each dispatches straight to its own visit method, so the cost of a
+    # visit does not depend on how many node types there are
     for class_name, fields in types.items():
-        code.append("@dataclass\n")
+        code.append("@dataclass(slots=True)\n")
         code.append(f"class {class_name}({base_name}):\n")
         for field in fields.split(", "):
             field_name, field_type = field.split(": ")
             code.append(f"\t{field_name}: {field_type}\n")
         code.append("\n")
+        code.append("\tdef accept(self, visitor):\n")
+        code.append(
+            f"\t\treturn visitor.visit_{class_name.lower()}_{base_name.lower()}(self)\n"
+        )
+        code.append("\n")
 
     return code
 
@@ -47,11 +57,7 @@ def generate_visitor(
     # visitor interface
     code.append("class Visitor(ABC):\n")
     code.append(f"\tdef visit(self, val: {'|'.join(base_names)}):\n")
-
-    for bnl, tps in zip(basename_lower, types):
-        for class_name in tps.keys():
-            code.append(f"\t\tif isinstance(val, {class_name}):\n")
-            code.append(f"\t\t\treturn self.visit_{class_name.lower()}_{bnl}(val)\n")
+    code.append("\t\treturn val.accept(self)\n")
 
     code.append("\n")
 
@@ -93,8 +99,9 @@ if __name__ == "__main__":
         "Grouping": "expression: Expr",
         "Literal": "value: Any",
         "Unary": "operator: Token, right: Expr",
-        "Variable": "name: Token",
-        "Assign": "name: Token, value: Expr",
+        # depth and slot are filled in by the Resolver; -1 means unresolved
+        "Variable": "name: Token, depth: int = -1, slot: int = -1",
+        "Assign": "name: Token, value: Expr, depth: int = -1, slot: int = -1",
     }
     outs.extend(generate_ast(base_name="Expr", types=expr_types))
 
@@ -119,7 +126,7 @@ if __name__ == "__main__":
     stmt_types = {
         "Expression": "expression: Expr",
         "Print": "expression: Expr",
-        "Var": "name: Token, initializer: Expr",
+        "Var": "name: Token, initializer: Expr, slot: int = -1",
     }
     outs.extend(generate_ast(base_name="Stmt", types=stmt_types))
 
@@ -1,17 +1,38 @@
-from typing import Any
+import asyncio
+from typing import Any, Iterable
 
-from environment import Environment
+import runtime
+from environment import Environment, SlotEnvironment
 from error import LoxRuntimeError
 from expr import Assign, Binary, Expr, Grouping, Literal, Unary, Variable
+from output import Output
 from stmt import Expression, Print, Stmt, Var
 from token_type import TokenType
-from tokens import Token
 from visitor import Visitor
 
+# how many statements interpret_async runs between yields to the event loop
+default_slice_size = 100
+
+
+def check_slice_size(slice_size: int):
+    # a slice that is never used up would never yield
+    if slice_size < 1:
+        raise ValueError(f"slice_size must be at least 1, not {slice_size}")
+
 
 class Interpreter(Visitor):
-    def __init__(self):
+    check_number_operands = staticmethod(runtime.check_number_operands)
+    is_truthy = staticmethod(runtime.is_truthy)
+    is_equal = staticmethod(runtime.is_equal)
+    stringify = staticmethod(runtime.stringify)
+
+    def __init__(self, output: Output | None = None):
+        # resolved variables live in slots; the dict-based environment holds
+        # the ones that weren't resolved, like everything typed at the prompt
         self.environment = Environment()
+        self.slots = SlotEnvironment()
+        self.output = Output() if output is None else output
+        self.had_runtime_error = False
 
     def visit_binary_expr(self, expr: Binary):
         left = self.evaluate(expr.left)
@@ -30,12 +51,15 @@ class Interpreter(Visitor):
             if isinstance(left, float) and isinstance(right, float):
                 return left + right
             if isinstance(left, str) and isinstance(right, str):
-                return left + right
+                # short strings are joined here rather than in concat, which
+                # the call would make the slower of the two
+                if len(left) + len(right) < runtime.min_rope_length:
+                    return left + right
+                return runtime.Rope(left, right)
+            if isinstance(left, runtime.strings) and isinstance(right, runtime.strings):
+                return runtime.concat(left, right)
             else:
-                raise LoxRuntimeError(
-                    expr.operator,
-                    f"Operands to operation {expr.operator} must both be strings or floats, got {type(left)} and {type(right)}",
-                )
+                raise runtime.plus_operands_error(expr.operator, left, right)
         elif expr.operator.type == TokenType.GREATER:
             self.check_number_operands(expr.operator, left, right)
             return float(left) > float(right)
@@ -56,14 +80,6 @@ class Interpreter(Visitor):
         else:
             raise LoxRuntimeError(expr.operator, f"Unknown operator {expr.operator}")
 
-    def check_number_operands(self, operator: Token, *operands: Any):
-        for i, operand in enumerate(operands):
-            if not isinstance(operand, float):
-                raise LoxRuntimeError(
-                    operator,
-                    f"All operands to operation f{operator} must be floats, got {type(operand)} at index {i}",
-                )
-
     def visit_grouping_expr(self, expr: Grouping):
         return self.evaluate(expr.expression)
 
@@ -82,62 +98,71 @@ class Interpreter(Visitor):
     def evaluate(self, expr: Expr) -> Any:
         return expr.accept(self)
 
-    def is_truthy(self, value: Any) -> bool:
-        if value is None:
-            return False
-        if isinstance(value, bool):
-            return value
-        if isinstance(value, float) or isinstance(value, int):
-            return value != 0
-        return True
-
-    def is_equal(self, a: Any, b: Any) -> bool:
-        if a is None and b is None:
-            return True
-        if a is None:
-            return False
-        return a == b
-
-    def interpret(self, statements: list[Stmt]):
+    def interpret(self, statements: Iterable[Stmt]):
+        try:
+            for statement in statements:
+                self.execute(statement)
+        except LoxRuntimeError as e:
+            self.output.write_line(str(e))
+            self.had_runtime_error = True
+        finally:
+            self.output.flush()
+
+    async def interpret_async(
+        self, statements: Iterable[Stmt], slice_size: int = default_slice_size
+    ):
+        # Like interpret, as a coroutine that hands control back to the event
+        # loop after every slice_size statements, so a long script doesn't
+        # stall everything else on the loop. asyncio resumes tasks in the
+        # order they yielded, so scripts on one loop take turns. Cancelling
+        # the task stops the script where it last yielded, with what it
+        # printed until then flushed.
+        check_slice_size(slice_size)
+        left = slice_size
         try:
             for statement in statements:
                 self.execute(statement)
+                left -= 1
+                if left == 0:
+                    left = slice_size
+                    await asyncio.sleep(0)
         except LoxRuntimeError as e:
-            print(e)
+            self.output.write_line(str(e))
+            self.had_runtime_error = True
+        finally:
+            self.output.flush()
 
     def execute(self, stmt: Stmt):
         return stmt.accept(self)
 
-    def stringify(self, value: Any) -> str:
-        if value is None:
-            return "nil"
-
-        if isinstance(value, float):
-            text = str(value)
-            if text.endswith(".0"):
-                text = text[:-2]
-            return text
-
-        return str(value)
-
     def visit_expression_stmt(self, stmt: Expression):
         self.evaluate(stmt.expression)
 
     def visit_print_stmt(self, stmt: Print):
         value = self.evaluate(stmt.expression)
-        print(self.stringify(value))
+        self.output.write_line(self.stringify(value))
 
     def visit_var_stmt(self, stmt: Var):
         value = None
         if stmt.initializer is not None:
             value = self.evaluate(stmt.initializer)
 
-        self.environment.define(stmt.name.lexeme, value)
+        if stmt.slot < 0:
+            self.environment.define(stmt.name.lexeme, value)
+        else:
+            self.slots.define_at(stmt.slot, value)
 
     def visit_variable_expr(self, expr: Variable):
-        return self.environment.get(expr.name)
+        if expr.slot < 0:
+            return self.environment.get(expr.name)
+        if expr.depth == 0:
+            return self.slots.values[expr.slot]
+        return self.slots.get_at(expr.depth, expr.slot)
 
     def visit_assign_expr(self, expr: Assign):
         value = self.evaluate(expr.value)
-        self.environment.assign(expr.name, value)
+        if expr.slot < 0:
+            self.environment.assign(expr.name, value)
+        else:
+            self.slots.assign_at(expr.depth, expr.slot, value)
         return value
@@ -1,53 +1,601 @@
+import argparse
+import atexit
+import mmap
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, TextIO
 
+from cache import MemoryCache, ProgramCache, paused_gc
+from closure_compiler import ClosureInterpreter
+from error import PrepareError, ScanError
 from interpreter import Interpreter
-from parser import Parser
+from optimizer import Optimizer
+from output import BufferedOutput, CapturedOutput, HookedOutput, Output
+from parser import BufferParser, MappedBufferParser, Parser, PrattParser, TokenStream
+from prepared import PreparedProgram, declared_slots
+from profiler import ProfilingInterpreter, SamplingProfiler
+from quickening import QuickeningInterpreter
+from resolver import Resolver
 import scanner
+from stmt import Stmt
+from tokens import TokenBuffer
+from transpiler import PythonBackend
+from vm import VM
+
+
+default_parallel_threshold = 8 << 20
+
+backends = {
+    "interpreter": Interpreter,
+    "vm": VM,
+    "closure": ClosureInterpreter,
+    "python": PythonBackend,
+}
 
 
 class Lox:
-    def __init__(self):
-        self.interpreter = Interpreter()
+    def __init__(
+        self,
+        backend: str = "interpreter",
+        reference_scanner: bool = False,
+        reference_parser: bool = False,
+        optimize: bool = True,
+        cache: ProgramCache | MemoryCache | None = None,
+        profile: bool = False,
+        output: Output | None = None,
+        scan_workers: int = 0,
+        parallel_threshold: int = default_parallel_threshold,
+        quicken: bool = False,
+    ):
+        if profile and backend != "interpreter":
+            raise ValueError("profiling only works with the tree-walking interpreter")
+        if quicken and (backend != "interpreter" or profile):
+            raise ValueError(
+                "quickening only works with the tree-walking interpreter, unprofiled"
+            )
+        self.backend = backend
+        # program output and error reports share one buffer, which the
+        # backends flush at the end of every run and before exiting
+        self.output = BufferedOutput() if output is None else output
+        # profiling hooks into the tree walker's evaluate and execute, and
+        # quickening rewrites the tree walker's Binary and Unary nodes
+        if profile:
+            self.interpreter = ProfilingInterpreter(output=self.output)
+        elif quicken:
+            self.interpreter = QuickeningInterpreter(output=self.output)
+        else:
+            self.interpreter = backends[backend](output=self.output)
+        self.quicken = quicken
+        # only the tree walker and the closures use resolved slots; the other
+        # backends keep looking globals up by name. The session's programs
+        # share one Resolver, so each sees the globals the ones before it
+        # declared, in the slots they were given
+        self.resolver: Resolver | None = (
+            Resolver() if backend in ("interpreter", "closure") else None
+        )
+        self.optimizer: Optimizer | None = Optimizer() if optimize else None
+        self.scanner_class = (
+            scanner.Scanner if reference_scanner else scanner.FastScanner
+        )
+        self.parser_class = Parser if reference_parser else PrattParser
+        # unless either reference is asked for, whole files are scanned into
+        # a TokenBuffer and parsed straight from it
+        self.token_buffer = not (reference_scanner or reference_parser)
+        # sources of at least parallel_threshold characters are lexed in
+        # that many worker processes, if there's more than one
+        self.scan_workers = scan_workers
+        self.parallel_threshold = parallel_threshold
+        self.cache = cache
+        # the intern table for every scanner this Lox makes, so names and
+        # string literals typed at the prompt share the ones before them
+        self.strings: dict[str, str] = {}
         self.had_error: bool = False
 
-    def run(self, source: str):
-        _scanner = scanner.Scanner(source, self)
-        tokens = _scanner.scan_tokens()
-        parser = Parser(tokens)
-        statements = parser.parse()
-        if statements is None:
+    def error(self, line: int, message: str):
+        self.output.write_line(str(ScanError(line, message)))
+        self.had_error = True
+
+    def parse(self, source: str | mmap.mmap) -> list[Stmt] | None:
+        # the front end only builds acyclic objects, so there's nothing for
+        # the cyclic collector to find in them, yet allocating them triggers
+        # it over and over
+        with paused_gc():
+            if not isinstance(source, str):
+                # the UTF-8 bytes of a mapped file
+                tokens = scanner.MappedScanner(source, self, self.strings).scan_buffer()
+                parser = MappedBufferParser(tokens, self.output)
+            elif self.token_buffer:
+                tokens = self.scan_buffer(source)
+                parser = BufferParser(tokens, self.output)
+            else:
+                tokens = self.scanner_class(source, self, self.strings).scan_tokens()
+                parser = self.parser_class(tokens, self.output)
+            statements = parser.parse()
+        # scan errors were reported as they were found; don't run a broken script
+        if statements is None or self.had_error:
             self.had_error = True
+            return None
+        if self.resolver is not None:
+            self.resolver.resolve(statements)
+        if self.optimizer is not None:
+            statements = self.optimizer.optimize(statements)
+        return statements
+
+    def scan_buffer(self, source: str) -> TokenBuffer:
+        if self.scan_workers < 2 or len(source) < self.parallel_threshold:
+            return scanner.BufferScanner(source, self, self.strings).scan_buffer()
+        with ProcessPoolExecutor(self.scan_workers) as executor:
+            _scanner = scanner.ParallelScanner(
+                source, self, executor, self.scan_workers, self.strings
+            )
+            return _scanner.scan_buffer()
+
+    def run(self, source: str | mmap.mmap):
+        statements = self.parse(source)
+        if statements is not None:
+            self.interpreter.interpret(statements)
+            self.forget_undefined()
+
+    def prepare(self, source: str) -> PreparedProgram:
+        # Scans, parses and compiles source once, for running it many times,
+        # concurrently if need be, each run with its own globals and output:
+        # see PreparedProgram. Errors are raised as a PrepareError rather
+        # than written to self.output.
+        if self.backend == "python":
+            # the generated Python depends on which globals were defined
+            # when it was compiled
+            raise ValueError("the python backend can't prepare programs")
+        errors = CapturedOutput()
+        output, self.output = self.output, errors
+        # each run starts from empty slots, so a prepared program is resolved
+        # on its own, from slot 0, not in the session's scope
+        resolver = self.resolver
+        if resolver is not None:
+            self.resolver = Resolver()
+        try:
+            statements = self.parse(source)
+        finally:
+            self.output = output
+            self.resolver = resolver
+        if statements is None:
+            self.had_error = False
+            raise PrepareError(errors.lines)
+
+        interpreter_class = type(self.interpreter)
+        compiled = self.backend in ("vm", "closure")
+        program = self.interpreter.compile(statements) if compiled else statements
+        slots = declared_slots(statements) if resolver is not None else None
+        return PreparedProgram(
+            program, lambda output: interpreter_class(output=output), compiled, slots
+        )
+
+    def forget_undefined(self):
+        # a declaration that failed at runtime, or came after the statement
+        # that did, left its name resolved to a slot that was never defined;
+        # later programs must find it undefined, as the other backends do
+        if self.resolver is not None:
+            self.resolver.forget_from(len(self.interpreter.slots.values))
+
+    def run_cached(self, source: str | mmap.mmap):
+        # the tree walker and the closures cache the parsed program; the VM and
+        # the Python backend cache what they compile it to
+        compiles = self.backend in ("vm", "python")
+        # quickened trees can only be run by a QuickeningInterpreter, so
+        # they mustn't be shared with other modes through a MemoryCache
+        options = f"{self.backend} optimize={self.optimizer is not None} quicken={self.quicken}"
+        if self.resolver is not None and self.resolver.scopes[0]:
+            # a tree resolved against this session's globals is only right in
+            # this session, and one from the cache would reuse their slots
+            self.run(source)
             return
-        self.interpreter.interpret(statements)
+        program = self.cache.load(source, options)
+        if program is not None and self.resolver is not None:
+            # declare the loaded program's globals in the slots it has them in,
+            # for any program the session runs after it
+            for name in declared_slots(program):
+                self.resolver.declare(name)
+        if program is None:
+            statements = self.parse(source)
+            if statements is None:
+                return
+            program = self.interpreter.compile(statements) if compiles else statements
+            self.cache.store(source, options, program)
+
+        if compiles:
+            self.interpreter.interpret_compiled(program)
+        else:
+            self.interpreter.interpret(program)
+        self.forget_undefined()
+
+    def run_stream(self, file: TextIO):
+        # executes each top-level statement as soon as it has been parsed, so
+        # memory use doesn't grow with the size of the script; output from
+        # statements before an error has already been printed by the time it
+        # is found
+        output = self.output
+        if isinstance(self.interpreter, PythonBackend):
+            # the python backend runs statements in batches, so the front end
+            # runs the pending batch before reporting an error. A runtime
+            # error in it is raised out of the report, which then never
+            # happens, as no other backend would have got that far.
+            self.output = HookedOutput(output, self.interpreter.run_pending)
+        try:
+            _scanner = scanner.FileScanner(file, self)
+            parser = self.parser_class(TokenStream(_scanner.iter_tokens()), self.output)
+            statements = parser.parse_iter()
+            if self.resolver is not None:
+                statements = self.resolver.resolve_iter(statements)
+            if self.optimizer is not None:
+                statements = self.optimizer.optimize_iter(statements)
+            self.interpreter.interpret(self.until_error(statements))
+            self.forget_undefined()
+        finally:
+            self.output = output
+        if parser.had_error:
+            self.had_error = True
+
+    def until_error(self, statements: Iterator[Stmt]) -> Iterator[Stmt]:
+        for statement in statements:
+            if self.had_error:
+                break
+            yield statement
+
+        # nothing more runs, but keep parsing to report any further errors
+        for _ in statements:
+            pass
+
+    # read a file and use self.run to run it, exiting with its status
+    def run_file(
+        self,
+        path: str,
+        stream: bool = False,
+        sampler: SamplingProfiler | None = None,
+        mapped: bool = False,
+    ):
+        status = self.run_script(path, stream, sampler, mapped)
+        if status:
+            sys.exit(status)
 
-    # read a file and use self.run to run it
-    def run_file(self, path: str):
-        with open(path, "r") as f:
-            self.run(f.read())
+    def run_script(
+        self,
+        path: str,
+        stream: bool = False,
+        sampler: SamplingProfiler | None = None,
+        mapped: bool = False,
+    ) -> int:
+        if sampler is not None:
+            sampler.start()
+        try:
+            if mapped:
+                self.run_mapped(path)
+            else:
+                with open(path, "r") as f:
+                    if stream:
+                        self.run_stream(f)
+                    elif self.cache is not None:
+                        self.run_cached(f.read())
+                    else:
+                        self.run(f.read())
+        finally:
+            if sampler is not None:
+                sampler.stop()
+            self.output.flush()
+        return self.exit_status()
+
+    def exit_status(self) -> int:
+        # 65 (EX_DATAERR) for a script that didn't scan or parse, 70
+        # (EX_SOFTWARE) for one that stopped on a runtime error
         if self.had_error:
-            sys.exit(65)
+            return 65
+        if self.interpreter.had_runtime_error:
+            return 70
+        return 0
+
+    def run_mapped(self, path: str):
+        # scans the file's bytes where they are mapped, so the whole script
+        # is never decoded into one str; only the text of names and literals
+        # is, as the tree is built
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # an empty file can't be mapped
+                source = b""
+            else:
+                source = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                if self.cache is not None:
+                    self.run_cached(source)
+                else:
+                    self.run(source)
+            finally:
+                if isinstance(source, mmap.mmap):
+                    source.close()
 
     def run_prompt(self):
+        # a line that fails at runtime may leave a name declared but never
+        # defined, which slots can't represent, so the prompt keeps its globals
+        # in the dict-based Environment
+        self.resolver = None
         while True:
             line = input("> ")
             if line == "exit":
                 break
             self.run(line)
+            self.output.flush()
             self.had_error = False
 
 
-if __name__ == "__main__":
-    args = sys.argv[1:]
-    lox = Lox()
-
-    # if there are no command line arguments
-    if len(args) > 1:
-        # print an error message
-        print("Usage: lox.py <script>")
-        # exit the program
+class ArgumentParser(argparse.ArgumentParser):
+    # usage errors exit with 64 (EX_USAGE) rather than argparse's 2
+    def error(self, message: str):
+        self.print_usage(sys.stderr)
+        print(f"{self.prog}: error: {message}", file=sys.stderr)
         sys.exit(64)
-    # if there is a command line argument
-    elif len(args) == 1:
-        lox.run_file(args[0])
+
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser(prog="lox.py")
+    arg_parser.add_argument("script", nargs="?")
+    backend = arg_parser.add_mutually_exclusive_group()
+    backend.add_argument(
+        "--vm",
+        action="store_const",
+        dest="backend",
+        const="vm",
+        help="compile to bytecode and run it on the stack VM",
+    )
+    backend.add_argument(
+        "--closure",
+        action="store_const",
+        dest="backend",
+        const="closure",
+        help="compile each node to a Python closure and run those",
+    )
+    backend.add_argument(
+        "--python",
+        action="store_const",
+        dest="backend",
+        const="python",
+        help="translate the script to Python and run it with exec",
+    )
+    arg_parser.add_argument(
+        "--reference-scanner",
+        action="store_true",
+        help="lex one character at a time instead of with the regex scanner",
+    )
+    arg_parser.add_argument(
+        "--reference-parser",
+        action="store_true",
+        help="parse expressions by recursive descent instead of precedence climbing",
+    )
+    arg_parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="run each statement as soon as it is parsed, in bounded memory",
+    )
+    arg_parser.add_argument(
+        "--mmap",
+        action="store_true",
+        help="map the script into memory and scan its bytes instead of decoding it whole",
+    )
+    arg_parser.add_argument(
+        "--batch",
+        metavar="DIR",
+        help="run every .lox file under DIR in a pool of worker processes",
+    )
+    arg_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        metavar="N",
+        help="worker processes for --batch (default: one per CPU)",
+    )
+    arg_parser.add_argument(
+        "--batch-output",
+        metavar="DIR",
+        help="with --batch, write each script's output to DIR/<script>.out "
+        "instead of stdout",
+    )
+    arg_parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="run scripts sent by client.py on a Unix socket until interrupted",
+    )
+    arg_parser.add_argument(
+        "--socket",
+        metavar="PATH",
+        help="the socket for --serve (default: $LOX_SOCKET, else lox-<uid>.sock "
+        "in $XDG_RUNTIME_DIR or /tmp)",
+    )
+    arg_parser.add_argument(
+        "--scan-workers",
+        type=int,
+        default=0,
+        metavar="N",
+        help="lex scripts of at least --parallel-threshold MB in N processes",
+    )
+    arg_parser.add_argument(
+        "--parallel-threshold",
+        type=float,
+        default=default_parallel_threshold / (1 << 20),
+        metavar="MB",
+        help="smallest script --scan-workers applies to (default: 8)",
+    )
+    arg_parser.add_argument(
+        "--no-optimize",
+        action="store_true",
+        help="run the tree as parsed, without constant folding and simplification",
+    )
+    arg_parser.add_argument(
+        "--optimizer-stats",
+        action="store_true",
+        help="report how many nodes the optimizer removed, on stderr",
+    )
+    arg_parser.add_argument(
+        "--dump-python",
+        action="store_true",
+        help="with --python, print the generated Python on stderr",
+    )
+    arg_parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="always scan and parse the script instead of loading a cached program",
+    )
+    arg_parser.add_argument(
+        "--cache-dir",
+        help="where to keep cached programs (default: $LOX_CACHE_DIR or ~/.cache/lox)",
+    )
+    arg_parser.add_argument(
+        "--quicken",
+        action="store_true",
+        help="specialize arithmetic and comparison nodes on the operand types they see",
+    )
+    arg_parser.add_argument(
+        "--quicken-stats",
+        action="store_true",
+        help="like --quicken, and report specializations and guard failures on stderr",
+    )
+    arg_parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="count and time evaluations per node class and line, report on stderr",
+    )
+    arg_parser.add_argument(
+        "--profile-json",
+        metavar="PATH",
+        help="like --profile, but write the results to PATH as JSON",
+    )
+    arg_parser.add_argument(
+        "--sample",
+        metavar="PATH",
+        help="sample the Lox stack while the script runs and write collapsed "
+        "stacks for flamegraph tools to PATH",
+    )
+    arg_parser.add_argument(
+        "--sample-interval",
+        type=float,
+        default=1.0,
+        metavar="MS",
+        help="milliseconds of CPU time between samples (default: 1)",
+    )
+    args = arg_parser.parse_args()
+    profile = args.profile or args.profile_json is not None
+    if profile and args.backend is not None:
+        arg_parser.error("--profile only works with the tree-walking interpreter")
+    if args.sample is not None and args.backend is not None:
+        arg_parser.error("--sample only works with the tree-walking interpreter")
+    quicken = args.quicken or args.quicken_stats
+    if quicken and (args.backend is not None or profile or args.sample is not None):
+        # the sampler only knows the plain interpreter's visit methods, so
+        # the specialized ones would drop out of the sampled stacks
+        arg_parser.error(
+            "--quicken only works with the tree-walking interpreter, unprofiled and unsampled"
+        )
+    if args.optimizer_stats and args.no_optimize:
+        arg_parser.error("--optimizer-stats needs the optimizer, which --no-optimize turns off")
+    if args.mmap and (args.stream or args.reference_scanner or args.reference_parser):
+        arg_parser.error("--mmap can't be combined with --stream or the reference front end")
+    # only whole files scanned into a TokenBuffer are lexed in parallel
+    if args.scan_workers and (
+        args.mmap or args.stream or args.reference_scanner or args.reference_parser
+    ):
+        arg_parser.error(
+            "--scan-workers can't be combined with --mmap, --stream or the reference front end"
+        )
+
+    if args.batch is not None or args.serve:
+        # the reports are written by the process that runs the scripts, which
+        # for these is a worker or the daemon, not this one
+        mode = "--serve" if args.serve else "--batch"
+        for flag, given in [
+            ("--optimizer-stats", args.optimizer_stats),
+            ("--quicken-stats", args.quicken_stats),
+            ("--dump-python", args.dump_python),
+        ]:
+            if given:
+                arg_parser.error(f"{flag} can't be combined with {mode}")
+
+    options = {
+        "backend": args.backend or "interpreter",
+        "reference_scanner": args.reference_scanner,
+        "reference_parser": args.reference_parser,
+        "optimize": not args.no_optimize,
+        "quicken": quicken,
+    }
+    if args.serve:
+        if args.script is not None or args.batch is not None or profile or args.sample is not None:
+            arg_parser.error("--serve takes no script and can't be profiled")
+        # the daemon runs whatever it is sent through the default front end
+        if args.stream or args.mmap or args.scan_workers:
+            arg_parser.error("--serve can't be combined with --stream, --mmap or --scan-workers")
+        # and keeps the programs it compiles in memory
+        if args.no_cache or args.cache_dir is not None:
+            arg_parser.error("--serve can't be combined with --no-cache or --cache-dir")
+        # like batch, server imports this module back for Lox
+        from client import default_socket
+        from server import serve
+
+        try:
+            serve(args.socket or default_socket(), options)
+        except OSError as e:
+            print(f"lox.py: {e}", file=sys.stderr)
+            sys.exit(71)
+        sys.exit(0)
+
+    if args.batch is not None:
+        if args.script is not None or profile or args.sample is not None:
+            arg_parser.error("--batch takes no script and can't be profiled")
+        if args.jobs < 1:
+            arg_parser.error("-j needs at least one worker")
+        # the scripts already run in parallel, one per worker
+        if args.scan_workers:
+            arg_parser.error("--scan-workers can't be combined with --batch")
+        # batch imports this module back for Lox, so it's only imported here
+        from batch import run_batch
+
+        status = run_batch(
+            args.batch,
+            args.jobs,
+            options=options,
+            script_options={"stream": args.stream, "mapped": args.mmap},
+            cache=None if args.no_cache else ProgramCache(args.cache_dir),
+            output_directory=args.batch_output,
+        )
+        sys.exit(status)
+
+    # a program loaded from the cache isn't optimized again, so there would
+    # be nothing for --optimizer-stats to count
+    use_cache = not args.no_cache and not args.optimizer_stats
+    lox = Lox(
+        backend=args.backend or "interpreter",
+        reference_scanner=args.reference_scanner,
+        reference_parser=args.reference_parser,
+        optimize=not args.no_optimize,
+        cache=ProgramCache(args.cache_dir) if use_cache else None,
+        profile=profile,
+        quicken=quicken,
+        scan_workers=args.scan_workers,
+        parallel_threshold=int(args.parallel_threshold * (1 << 20)),
+    )
+    if args.dump_python and isinstance(lox.interpreter, PythonBackend):
+        lox.interpreter.dump = True
+    if args.profile:
+        atexit.register(lambda: print(lox.interpreter.report(), file=sys.stderr))
+    if args.profile_json is not None:
+        atexit.register(lambda: lox.interpreter.dump(args.profile_json))
+    if args.quicken_stats:
+        atexit.register(lambda: print(lox.interpreter.report(), file=sys.stderr))
+    if args.optimizer_stats and lox.optimizer is not None:
+        atexit.register(lambda: print(lox.optimizer.report(), file=sys.stderr))
+
+    sampler = None
+    if args.sample is not None:
+        sampler = SamplingProfiler(args.sample_interval / 1e3)
+        atexit.register(lambda: sampler.write(args.sample))
+
+    # if there is a script argument run it, otherwise start the prompt
+    if args.script is not None:
+        lox.run_file(args.script, stream=args.stream, sampler=sampler, mapped=args.mmap)
     else:
         lox.run_prompt()
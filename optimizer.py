@@ -0,0 +1,209 @@
+import math
+from dataclasses import fields
+from typing import Iterable, Iterator
+
+from expr import Assign, Binary, Expr, Grouping, Literal, Unary, Variable
+from interpreter import Interpreter
+from runtime import Rope
+from stmt import Expression, Print, Stmt, Var
+from token_type import TokenType
+from visitor import Visitor
+
+# operators whose result is always a float when they don't raise
+float_operators = {TokenType.MINUS, TokenType.SLASH, TokenType.STAR}
+
+bool_operators = {
+    TokenType.GREATER,
+    TokenType.GREATER_EQUAL,
+    TokenType.LESS,
+    TokenType.LESS_EQUAL,
+    TokenType.BANG_EQUAL,
+    TokenType.EQUAL_EQUAL,
+}
+
+
+def count_nodes(node: Expr | Stmt) -> int:
+    count = 1
+    for field in fields(node):
+        child = getattr(node, field.name)
+        if isinstance(child, (Expr, Stmt)):
+            count += count_nodes(child)
+    return count
+
+
+class Optimizer(Visitor):
+    # Rewrites resolved trees so they do less work at runtime:
+    #   - Binary, Unary and Grouping subtrees over literals become a Literal,
+    #     unless evaluating them raises, in which case they're left to raise
+    #     at runtime
+    #   - Grouping wrappers are dropped
+    #   - x * 1, 1 * x, x / 1, x - 0, -(-x) and !!x become x when x is known to
+    #     be a float (or a bool, for !!x), which are exact identities for IEEE
+    #     floats; x + 0 is not, because -0 + 0 is 0
+    #   - expression statements that can neither raise nor change anything
+    #     are removed
+
+    def __init__(self):
+        self.evaluator = Interpreter()
+        self.folded = 0
+        self.simplified = 0
+        self.groupings = 0
+        self.dead_statements = 0
+        self.removed = 0
+
+    def optimize(self, statements: Iterable[Stmt]) -> list[Stmt]:
+        return list(self.optimize_iter(statements))
+
+    def optimize_iter(self, statements: Iterable[Stmt]) -> Iterator[Stmt]:
+        for statement in statements:
+            optimized = statement.accept(self)
+            if optimized is not None:
+                yield optimized
+
+    def report(self) -> str:
+        return (
+            f"optimizer: removed {self.removed} nodes "
+            f"({self.folded} folded, {self.simplified} simplified, "
+            f"{self.groupings} groupings, {self.dead_statements} dead statements)"
+        )
+
+    def fold(self, expr: Expr) -> Expr:
+        try:
+            value = self.evaluator.evaluate(expr)
+        except Exception:
+            return expr
+
+        # a literal holds plain text: the backends that emit literals as
+        # code, or cache them, know nothing of ropes
+        if type(value) is Rope:
+            value = str(value)
+
+        # only ever called once the operands are literals
+        self.folded += 1
+        self.removed += 2 if isinstance(expr, Binary) else 1
+        return Literal(value)
+
+    def simplify(self, kept: Expr) -> Expr:
+        # every simplification drops two nodes: the operation and either a
+        # literal operand or a second, cancelling unary
+        self.simplified += 1
+        self.removed += 2
+        return kept
+
+    def is_float(self, expr: Expr) -> bool:
+        if isinstance(expr, Literal):
+            return isinstance(expr.value, float)
+        if isinstance(expr, Binary):
+            if expr.operator.type in float_operators:
+                return True
+            # + only succeeds on two floats or two strings
+            return expr.operator.type == TokenType.PLUS and (
+                self.is_float(expr.left) or self.is_float(expr.right)
+            )
+        if isinstance(expr, Unary):
+            return expr.operator.type == TokenType.MINUS
+        return False
+
+    def is_bool(self, expr: Expr) -> bool:
+        if isinstance(expr, Literal):
+            return isinstance(expr.value, bool)
+        if isinstance(expr, Binary):
+            return expr.operator.type in bool_operators
+        if isinstance(expr, Unary):
+            return expr.operator.type == TokenType.BANG
+        return False
+
+    def is_pure(self, expr: Expr) -> bool:
+        # evaluating it can't raise and can't change any state
+        if isinstance(expr, Literal):
+            return True
+        if isinstance(expr, Variable):
+            return expr.slot >= 0
+        if isinstance(expr, Unary):
+            return expr.operator.type == TokenType.BANG and self.is_pure(expr.right)
+        if isinstance(expr, Binary):
+            return (
+                expr.operator.type in (TokenType.EQUAL_EQUAL, TokenType.BANG_EQUAL)
+                and self.is_pure(expr.left)
+                and self.is_pure(expr.right)
+            )
+        return False
+
+    def is_number(self, expr: Expr, value: float) -> bool:
+        # the sign counts: -0 == 0, but x - -0 isn't x when x is -0
+        return (
+            isinstance(expr, Literal)
+            and isinstance(expr.value, float)
+            and expr.value == value
+            and math.copysign(1.0, expr.value) == math.copysign(1.0, value)
+        )
+
+    def visit_binary_expr(self, expr: Binary):
+        expr.left = expr.left.accept(self)
+        expr.right = expr.right.accept(self)
+        left, right = expr.left, expr.right
+
+        if isinstance(left, Literal) and isinstance(right, Literal):
+            return self.fold(expr)
+
+        op = expr.operator.type
+        if op == TokenType.STAR:
+            if self.is_number(right, 1) and self.is_float(left):
+                return self.simplify(left)
+            if self.is_number(left, 1) and self.is_float(right):
+                return self.simplify(right)
+        elif op == TokenType.SLASH:
+            if self.is_number(right, 1) and self.is_float(left):
+                return self.simplify(left)
+        elif op == TokenType.MINUS:
+            if self.is_number(right, 0) and self.is_float(left):
+                return self.simplify(left)
+
+        return expr
+
+    def visit_grouping_expr(self, expr: Grouping):
+        self.groupings += 1
+        self.removed += 1
+        return expr.expression.accept(self)
+
+    def visit_literal_expr(self, expr: Literal):
+        return expr
+
+    def visit_unary_expr(self, expr: Unary):
+        expr.right = expr.right.accept(self)
+        right = expr.right
+
+        if isinstance(right, Literal):
+            return self.fold(expr)
+
+        if isinstance(right, Unary) and right.operator.type == expr.operator.type:
+            if expr.operator.type == TokenType.MINUS and self.is_float(right.right):
+                return self.simplify(right.right)
+            if expr.operator.type == TokenType.BANG and self.is_bool(right.right):
+                return self.simplify(right.right)
+
+        return expr
+
+    def visit_variable_expr(self, expr: Variable):
+        return expr
+
+    def visit_assign_expr(self, expr: Assign):
+        expr.value = expr.value.accept(self)
+        return expr
+
+    def visit_expression_stmt(self, stmt: Expression):
+        stmt.expression = stmt.expression.accept(self)
+        if self.is_pure(stmt.expression):
+            self.dead_statements += 1
+            self.removed += count_nodes(stmt)
+            return None
+        return stmt
+
+    def visit_print_stmt(self, stmt: Print):
+        stmt.expression = stmt.expression.accept(self)
+        return stmt
+
+    def visit_var_stmt(self, stmt: Var):
+        if stmt.initializer is not None:
+            stmt.initializer = stmt.initializer.accept(self)
+        return stmt
@@ -0,0 +1,81 @@
+import sys
+from typing import Callable, TextIO
+
+
+class Output:
+    # Where a session's output goes: what print statements produce and the
+    # errors reported along the way. This base class writes each line
+    # straight to the stream, which defaults to whatever sys.stdout is at the
+    # time, like print does.
+
+    def __init__(self, stream: TextIO | None = None):
+        self.stream = stream
+
+    def write_line(self, text: str):
+        print(text, file=self.stream or sys.stdout)
+
+    def flush(self):
+        pass
+
+
+class BufferedOutput(Output):
+    # Collects lines and writes them out in one go once they add up to
+    # buffer_size characters, or when flushed. The backends flush at the end
+    # of every interpret call, and errors go through the same buffer, so they
+    # still come out after the output that preceded them.
+
+    def __init__(self, stream: TextIO | None = None, buffer_size: int = 1 << 16):
+        super().__init__(stream)
+        self.buffer_size = buffer_size
+        self.lines: list[str] = []
+        self.size = 0
+
+    def write_line(self, text: str):
+        self.lines.append(text)
+        self.size += len(text) + 1
+        if self.size >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if not self.lines:
+            return
+        stream = self.stream or sys.stdout
+        self.lines.append("")
+        stream.write("\n".join(self.lines))
+        stream.flush()
+        self.lines = []
+        self.size = 0
+
+
+class HookedOutput(Output):
+    # Passes lines on to another Output, calling before_write first.
+
+    def __init__(self, output: Output, before_write: Callable[[], None]):
+        super().__init__()
+        self.output = output
+        self.before_write = before_write
+
+    def write_line(self, text: str):
+        self.before_write()
+        self.output.write_line(text)
+
+    def flush(self):
+        self.output.flush()
+
+
+class CapturedOutput(Output):
+    # Keeps everything in memory, for embedders that want a script's output
+    # as a string rather than on stdout.
+
+    def __init__(self):
+        super().__init__()
+        self.lines: list[str] = []
+
+    def write_line(self, text: str):
+        self.lines.append(text)
+
+    def getvalue(self) -> str:
+        return "".join(line + "\n" for line in self.lines)
+
+    def clear(self):
+        self.lines = []
@@ -1,8 +1,33 @@
+from typing import Iterator
+
 from error import ParseError
 from expr import Assign, Binary, Expr, Grouping, Literal, Unary, Variable
+from output import Output
 from stmt import Expression, Print, Stmt, Var
 from token_type import TokenType
-from tokens import Token
+from tokens import Token, TokenBuffer, decode_text, number_code, token_codes, token_types
+
+
+class TokenStream:
+    # Lets Parser index into a token iterator. Only the current and previous
+    # token are ever looked at, so older ones are dropped as the parser moves on.
+
+    def __init__(self, tokens: Iterator[Token]):
+        self.tokens = tokens
+        self.window: list[Token] = []
+        self.offset = 0
+
+    def __getitem__(self, index: int) -> Token:
+        window = self.window
+        while index >= self.offset + len(window):
+            window.append(next(self.tokens))
+
+        stale = index - 1 - self.offset
+        if stale > 0:
+            del window[:stale]
+            self.offset += stale
+
+        return window[index - self.offset]
 
 
 class Parser:
@@ -18,9 +43,13 @@ class Parser:
     # primary        → NUMBER | STRING | "true" | "false" | "nil"
     #                | "(" expression ")" ;
 
-    def __init__(self, tokens: list[Token]):
+    def __init__(self, tokens: list[Token] | TokenStream, output: Output | None = None):
         self.tokens = tokens
         self.current = 0
+        self.had_error = False
+        # errors are reported through the session's output, so they come out
+        # in order with anything the program has printed before them
+        self.output = Output() if output is None else output
 
     def expression(self) -> Expr:
         return self.assignment()
@@ -36,7 +65,7 @@ class Parser:
                 name = expr.name
                 return Assign(name, value)
 
-            return ParseError(equals, "Invalid assignment target.")
+            self.error(equals, "Invalid assignment target.")
 
         return expr
 
@@ -151,6 +180,13 @@ class Parser:
 
         return self.peek().type == type
 
+    def error(self, token: Token, message: str) -> ParseError:
+        # report without unwinding, for errors the parser can recover from in place
+        error = ParseError(token, message)
+        self.output.write_line(str(error))
+        self.had_error = True
+        return error
+
     def synchronize(self):
         self.advance()
 
@@ -174,13 +210,21 @@ class Parser:
 
     def parse(self):
         try:
-            statements: list[Stmt] = []
-            while not self.is_at_end():
-                statements.append(self.declaration())
+            statements: list[Stmt] = list(self.parse_iter())
 
+            if self.had_error:
+                return None
             return statements
         except ParseError as e:
-            print(e)
+            self.output.write_line(str(e))
+
+    def parse_iter(self) -> Iterator[Stmt]:
+        # yields each statement as soon as it is parsed; after an error the
+        # rest is still parsed, to report further errors, but nothing is yielded
+        while not self.is_at_end():
+            statement = self.declaration()
+            if not self.had_error:
+                yield statement
 
     def statement(self):
         if self.match(TokenType.PRINT):
@@ -195,6 +239,8 @@ class Parser:
 
             return self.statement()
         except ParseError as e:
+            self.output.write_line(str(e))
+            self.had_error = True
             self.synchronize()
 
     def var_declaration(self):
@@ -217,3 +263,196 @@ class Parser:
         value = self.expression()
         self.consume(TokenType.SEMICOLON, "Expect ';' after value.")
         return Expression(value)
+
+
+class PrattParser(Parser):
+    # Parses everything below assignment by precedence climbing: each token
+    # type that can start an operand has a prefix handler, and each binary
+    # operator a binding power, so an operand costs one table lookup rather
+    # than a call at every level of the grammar. Trees, and the tokens errors
+    # are reported at, are the same as Parser's; assignment, which needs to
+    # look back at its target, is still Parser.assignment.
+
+    def equality(self) -> Expr:
+        return self.binary(1)
+
+    def binary(self, min_power: int) -> Expr:
+        tokens = self.tokens
+        token = tokens[self.current]
+        prefix = prefix_rules.get(token.type)
+        if prefix is None:
+            raise ParseError(token, "Expect expression.")
+        self.current += 1
+        left = prefix(self, token)
+
+        while True:
+            operator = tokens[self.current]
+            power = binding_powers.get(operator.type, 0)
+            if power < min_power:
+                return left
+            self.current += 1
+            # every operator is left-associative, so the right operand only
+            # takes operators that bind tighter
+            left = Binary(left, operator, self.binary(power + 1))
+
+    def literal(self, token: Token) -> Expr:
+        return Literal(token.literal)
+
+    def variable(self, token: Token) -> Expr:
+        return Variable(token)
+
+    def grouping(self, token: Token) -> Expr:
+        expr = self.expression()
+        self.consume(TokenType.RIGHT_PAREN, "Expect ')' after expression.")
+        return Grouping(expr)
+
+    def unary_operator(self, token: Token) -> Expr:
+        # the operand is another prefix expression and takes no binary
+        # operators, as Parser.unary
+        return Unary(token, self.binary(unary_power))
+
+
+binding_powers = {
+    TokenType.BANG_EQUAL: 1,
+    TokenType.EQUAL_EQUAL: 1,
+    TokenType.GREATER: 2,
+    TokenType.GREATER_EQUAL: 2,
+    TokenType.LESS: 2,
+    TokenType.LESS_EQUAL: 2,
+    TokenType.MINUS: 3,
+    TokenType.PLUS: 3,
+    TokenType.SLASH: 4,
+    TokenType.STAR: 4,
+}
+unary_power = max(binding_powers.values()) + 1
+
+prefix_rules = {
+    TokenType.TRUE: lambda parser, token: Literal(True),
+    TokenType.FALSE: lambda parser, token: Literal(False),
+    TokenType.NIL: lambda parser, token: Literal(None),
+    TokenType.NUMBER: PrattParser.literal,
+    TokenType.STRING: PrattParser.literal,
+    TokenType.IDENTIFIER: PrattParser.variable,
+    TokenType.LEFT_PAREN: PrattParser.grouping,
+    TokenType.BANG: PrattParser.unary_operator,
+    TokenType.MINUS: PrattParser.unary_operator,
+}
+
+
+class BufferParser(PrattParser):
+    # Parses straight from a TokenBuffer. Checking and skipping tokens looks
+    # only at the type codes, and prefix rules and binding powers are lists
+    # indexed by code; Tokens are only built for what ends up in the tree or
+    # an error message (operators, names and the ones consume returns), and
+    # literal values are converted from the source without one.
+
+    def __init__(self, tokens: TokenBuffer, output: Output | None = None):
+        super().__init__(tokens, output)
+        self.types = tokens.types
+        self.source = tokens.source
+        self.starts = tokens.starts
+        self.ends = tokens.ends
+        self.lines = tokens.lines
+        self.intern = tokens.strings.setdefault
+
+    def is_at_end(self) -> bool:
+        return self.types[self.current] == eof_code
+
+    def check(self, type: TokenType) -> bool:
+        code = self.types[self.current]
+        return code != eof_code and code == token_codes[type]
+
+    def match(self, *types: TokenType) -> bool:
+        code = self.types[self.current]
+        if code == eof_code:
+            return False
+        for t in types:
+            if code == token_codes[t]:
+                self.current += 1
+                return True
+        return False
+
+    def binary(self, min_power: int) -> Expr:
+        types = self.types
+        index = self.current
+        prefix = self.prefix_rules[types[index]]
+        if prefix is None:
+            raise ParseError(self.tokens[index], "Expect expression.")
+        self.current = index + 1
+        left = prefix(self, index)
+
+        while True:
+            index = self.current
+            power = buffer_binding_powers[types[index]]
+            if power < min_power:
+                return left
+            self.current = index + 1
+            # an operator's lexeme is always the same text, its type's value
+            code = types[index]
+            operator = Token(token_types[code], operator_lexemes[code], None, self.lines[index])
+            left = Binary(left, operator, self.binary(power + 1))
+
+    def buffer_literal(self, index: int) -> Expr:
+        if self.types[index] == number_code:
+            return Literal(float(self.source[self.starts[index] : self.ends[index]]))
+        text = self.source[self.starts[index] + 1 : self.ends[index] - 1]
+        return Literal(self.intern(text, text))
+
+    def buffer_variable(self, index: int) -> Expr:
+        lexeme = self.source[self.starts[index] : self.ends[index]]
+        lexeme = self.intern(lexeme, lexeme)
+        return Variable(Token(identifier_type, lexeme, None, self.lines[index]))
+
+    def buffer_grouping(self, index: int) -> Expr:
+        return self.grouping(None)
+
+    def buffer_unary(self, index: int) -> Expr:
+        return Unary(self.tokens[index], self.binary(unary_power))
+
+
+class MappedBufferParser(BufferParser):
+    # Parses from a MappedTokenBuffer, whose source is bytes, so literals and
+    # names are decoded as they are sliced out.
+
+    def buffer_literal(self, index: int) -> Expr:
+        if self.types[index] == number_code:
+            # decoded, as a number that ran into non-ASCII digits was
+            # scanned from text and float() only takes ASCII bytes
+            return Literal(float(self.source[self.starts[index] : self.ends[index]].decode()))
+        text = decode_text(self.source[self.starts[index] + 1 : self.ends[index] - 1])
+        return Literal(self.intern(text, text))
+
+    def buffer_variable(self, index: int) -> Expr:
+        lexeme = self.source[self.starts[index] : self.ends[index]].decode()
+        lexeme = self.intern(lexeme, lexeme)
+        return Variable(Token(identifier_type, lexeme, None, self.lines[index]))
+
+
+eof_code = token_codes[TokenType.EOF]
+identifier_type = TokenType.IDENTIFIER
+operator_lexemes = [token_type.value for token_type in token_types]
+
+buffer_binding_powers = [binding_powers.get(token_type, 0) for token_type in token_types]
+
+
+def buffer_prefix_rules(cls: type) -> list:
+    # indexed by type code; built per class so that the rules are the class's
+    # own versions of the methods
+    rules = [None] * len(token_types)
+    for token_type, rule in {
+        TokenType.TRUE: lambda parser, index: Literal(True),
+        TokenType.FALSE: lambda parser, index: Literal(False),
+        TokenType.NIL: lambda parser, index: Literal(None),
+        TokenType.NUMBER: cls.buffer_literal,
+        TokenType.STRING: cls.buffer_literal,
+        TokenType.IDENTIFIER: cls.buffer_variable,
+        TokenType.LEFT_PAREN: cls.buffer_grouping,
+        TokenType.BANG: cls.buffer_unary,
+        TokenType.MINUS: cls.buffer_unary,
+    }.items():
+        rules[token_codes[token_type]] = rule
+    return rules
+
+
+BufferParser.prefix_rules = buffer_prefix_rules(BufferParser)
+MappedBufferParser.prefix_rules = buffer_prefix_rules(MappedBufferParser)
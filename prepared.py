@@ -0,0 +1,142 @@
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable
+
+from bytecode import Chunk
+from environment import Environment
+from interpreter import check_slice_size, default_slice_size
+from output import CapturedOutput, Output
+from runtime import Rope
+from stmt import Stmt, Var
+from vm import VM
+
+# A program scanned, parsed, resolved, optimized and, for the VM and the
+# closures, compiled once by Lox.prepare, to be run any number of times. Each run gets a fresh
+# interpreter with its own slots and stack, so nothing a run does is seen
+# by the next one, or by another thread running the same program at the
+# same time; the tree, the chunk and the closures are only ever read. (A quickened tree
+# is rewritten as it runs, but each rewrite is a single assignment, and the
+# variants check their operands, so every run computes what it would have
+# anyway.)
+#
+# run_async is the same as a coroutine, for asyncio services: the script
+# yields to the event loop every slice_size statements. The VM runs its
+# chunk in one go, so it can't.
+#
+# Globals are passed in per run: names the script uses without declaring
+# them are looked up in the run's Environment, which is where they are
+# bound, and where a script's assignments to them end up. The variables the
+# script declares end up there too, whatever the backend: the VM defines
+# them there as it runs, and the tree walker and the closures keep them in
+# slots, which are copied over once the run is done.
+
+
+@dataclass(slots=True)
+class RunResult:
+    # status is what lox.py would exit with: 0, or 70 after a runtime
+    # error, whose message is the last line of output. output is everything
+    # printed, unless the run was given an Output of its own to print to.
+    status: int
+    output: str
+    environment: Environment
+
+
+def lox_value(value: Any) -> Any:
+    # Lox numbers are floats; Python ints would fail its arithmetic checks
+    if type(value) is int:
+        return float(value)
+    return value
+
+
+def use_environment(interpreter: Any, environment: Environment):
+    # the backends keep their globals under different names
+    if isinstance(interpreter, VM):
+        interpreter.globals = environment
+    else:
+        interpreter.environment = environment
+
+
+def declared_slots(statements: Iterable[Stmt]) -> dict[str, int]:
+    # the slot of each variable a resolved script declares
+    return {
+        statement.name.lexeme: statement.slot
+        for statement in statements
+        if isinstance(statement, Var) and statement.slot >= 0
+    }
+
+
+class PreparedProgram:
+    def __init__(
+        self,
+        program: Any,
+        make_interpreter: Callable[[Output], Any],
+        compiled: bool,
+        slots: dict[str, int] | None = None,
+    ):
+        self.program = program
+        self.make_interpreter = make_interpreter
+        self.compiled = compiled
+        self.slots = slots or {}
+
+    def run(
+        self,
+        globals: dict[str, Any] | None = None,
+        environment: Environment | None = None,
+        output: Output | None = None,
+    ) -> RunResult:
+        captured, interpreter, environment = self.start(globals, environment, output)
+        if self.compiled:
+            interpreter.interpret_compiled(self.program)
+        else:
+            interpreter.interpret(self.program)
+        return self.result(captured, interpreter, environment)
+
+    async def run_async(
+        self,
+        globals: dict[str, Any] | None = None,
+        environment: Environment | None = None,
+        output: Output | None = None,
+        slice_size: int = default_slice_size,
+    ) -> RunResult:
+        if isinstance(self.program, Chunk):
+            raise ValueError("the vm backend can't run programs asynchronously")
+        check_slice_size(slice_size)
+        captured, interpreter, environment = self.start(globals, environment, output)
+        if self.compiled:
+            await interpreter.interpret_compiled_async(self.program, slice_size)
+        else:
+            await interpreter.interpret_async(self.program, slice_size)
+        return self.result(captured, interpreter, environment)
+
+    def start(
+        self,
+        globals: dict[str, Any] | None,
+        environment: Environment | None,
+        output: Output | None,
+    ) -> tuple[CapturedOutput | None, Any, Environment]:
+        captured = CapturedOutput() if output is None else None
+        interpreter = self.make_interpreter(output or captured)
+        environment = Environment() if environment is None else environment
+        if globals:
+            for name, value in globals.items():
+                environment.define(name, lox_value(value))
+        use_environment(interpreter, environment)
+        return captured, interpreter, environment
+
+    def result(
+        self, captured: CapturedOutput | None, interpreter: Any, environment: Environment
+    ) -> RunResult:
+        values = interpreter.slots.values if self.slots else []
+        for name, slot in self.slots.items():
+            # slots are numbered in the order the script declares them, so
+            # the ones past the end were never reached
+            if slot < len(values):
+                environment.define(name, values[slot])
+        # ropes are how Lox builds long strings, not values embedders should
+        # see, so whatever the script left in the environment is flattened
+        bound = environment.values
+        for name, value in bound.items():
+            if type(value) is Rope:
+                bound[name] = str(value)
+        status = 70 if interpreter.had_runtime_error else 0
+        text = captured.getvalue() if captured is not None else ""
+        return RunResult(status, text, environment)
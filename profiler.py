@@ -0,0 +1,213 @@
+import json
+import os
+import signal
+import time
+from collections import Counter
+from dataclasses import fields
+from types import FrameType
+from typing import Any
+
+from expr import Expr
+from interpreter import Interpreter
+from output import Output
+from stmt import Stmt
+from tokens import Token
+
+# the field holding each node class's own token, or None for classes without
+# one, filled in the first time a class is seen
+token_fields: dict[type, str | None] = {}
+
+
+def token_field(cls: type) -> str | None:
+    if cls not in token_fields:
+        token_fields[cls] = next(
+            (field.name for field in fields(cls) if field.type in (Token, "Token")),
+            None,
+        )
+    return token_fields[cls]
+
+
+def first_line(node: Expr | Stmt) -> int | None:
+    # the line of the first token anywhere in the tree
+    name = token_field(type(node))
+    for field in fields(node):
+        child = getattr(node, field.name)
+        if field.name == name:
+            return child.line
+        if isinstance(child, (Expr, Stmt)):
+            line = first_line(child)
+            if line is not None:
+                return line
+    return None
+
+
+class ProfilingInterpreter(Interpreter):
+    # Every node is evaluated through evaluate or execute, so overriding the
+    # two is enough to see all of them, and the plain Interpreter runs exactly
+    # as before when profiling is off.
+    #
+    # For each node class this counts evaluations and sums both the total
+    # time spent in them, children included, and the self time, without
+    # children. Lines get the count and self time of the nodes on them, so
+    # line times add up to the whole run. A node's line is that of its own
+    # token (the operator or the variable's name); nodes without one, like
+    # literals, belong to the line of the node around them.
+
+    def __init__(self, output: Output | None = None):
+        super().__init__(output)
+        # class name -> [count, total seconds, self seconds]
+        self.nodes: dict[str, list] = {}
+        # line -> [count, self seconds]
+        self.lines: dict[int | None, list] = {}
+        self.line: int | None = None
+        self.children = 0.0
+
+    def evaluate(self, expr: Expr) -> Any:
+        return self.timed(expr)
+
+    def execute(self, stmt: Stmt):
+        self.line = first_line(stmt)
+        return self.timed(stmt)
+
+    def timed(self, node: Expr | Stmt) -> Any:
+        outer_line = self.line
+        name = token_field(type(node))
+        if name is not None:
+            self.line = getattr(node, name).line
+        outer_children = self.children
+        self.children = 0.0
+
+        start = time.perf_counter()
+        try:
+            return node.accept(self)
+        finally:
+            elapsed = time.perf_counter() - start
+            own = elapsed - self.children
+
+            stats = self.nodes.setdefault(type(node).__name__, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += elapsed
+            stats[2] += own
+            stats = self.lines.setdefault(self.line, [0, 0.0])
+            stats[0] += 1
+            stats[1] += own
+
+            self.line = outer_line
+            self.children = outer_children + elapsed
+
+    def results(self) -> dict:
+        return {
+            "nodes": {
+                name: {"count": count, "seconds": total, "self_seconds": own}
+                for name, (count, total, own) in self.nodes.items()
+            },
+            "lines": {
+                str(line): {"count": count, "self_seconds": own}
+                for line, (count, own) in sorted(
+                    self.lines.items(), key=lambda item: item[0] or 0
+                )
+            },
+        }
+
+    def report(self, lines: int = 20) -> str:
+        out = [f"{'node':<12} {'count':>10} {'total ms':>10} {'self ms':>10}"]
+        by_self = sorted(self.nodes.items(), key=lambda item: -item[1][2])
+        for name, (count, total, own) in by_self:
+            out.append(f"{name:<12} {count:>10} {total * 1e3:>10.2f} {own * 1e3:>10.2f}")
+
+        out.append("")
+        out.append(f"{'line':<12} {'count':>10} {'self ms':>21}")
+        by_self = sorted(self.lines.items(), key=lambda item: -item[1][1])
+        for line, (count, own) in by_self[:lines]:
+            out.append(f"{line if line is not None else '-':<12} {count:>10} {own * 1e3:>21.2f}")
+        if len(by_self) > lines:
+            out.append(f"... {len(by_self) - lines} more lines")
+        return "\n".join(out)
+
+    def dump(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.results(), f, indent=2)
+
+
+# samples taken outside the interpreter are charged to the front-end phase
+# that was running, found by the module of the frames on the stack
+phase_modules = {
+    "scanner.py": "[scan]",
+    "parser.py": "[parse]",
+    "resolver.py": "[resolve]",
+    "optimizer.py": "[optimize]",
+    "cache.py": "[cache]",
+}
+
+
+class SamplingProfiler:
+    # A statistical profiler for the tree-walking interpreter. A SIGPROF
+    # timer interrupts the program every interval seconds of CPU time, and
+    # the handler, which runs on the main thread between two bytecodes, reads
+    # the Lox evaluation stack straight off the Python one: every frame of an
+    # Interpreter visit_* method has the node it is visiting as an argument.
+    # Nothing in the interpreter changes, so between samples the program runs
+    # at full speed.
+    #
+    # Stacks are written in the collapsed format flamegraph.pl and speedscope
+    # read, one "Print:3;Binary:3;Variable:3 12" line per distinct stack,
+    # with a node's line found as in ProfilingInterpreter.
+
+    def __init__(self, interval: float = 0.001):
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self.visit_codes = {
+            getattr(Interpreter, name).__code__
+            for name in dir(Interpreter)
+            if name.startswith("visit_")
+        }
+        self.previous_handler = None
+
+    def start(self):
+        self.previous_handler = signal.signal(signal.SIGPROF, self.sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self):
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, self.previous_handler or signal.SIG_DFL)
+
+    def sample(self, signum: int, frame: FrameType | None):
+        nodes = []
+        phase = "[other]"
+        while frame is not None:
+            code = frame.f_code
+            if code in self.visit_codes:
+                nodes.append(frame.f_locals.get("expr") or frame.f_locals.get("stmt"))
+            else:
+                name = os.path.basename(code.co_filename)
+                if name in phase_modules:
+                    # the optimizer folds constants with an Interpreter, but
+                    # that time belongs to the optimizer
+                    phase = phase_modules[name]
+                    nodes = []
+                    break
+            frame = frame.f_back
+
+        if not nodes:
+            self.stacks[phase] += 1
+            return
+
+        stack = []
+        line = None
+        for node in reversed(nodes):
+            name = token_field(type(node))
+            if name is not None:
+                line = getattr(node, name).line
+            elif line is None:
+                line = first_line(node)
+            stack.append(f"{type(node).__name__}:{line if line is not None else '-'}")
+        self.stacks[";".join(stack)] += 1
+
+    def collapsed(self) -> str:
+        return "".join(
+            f"{stack} {count}\n" for stack, count in sorted(self.stacks.items())
+        )
+
+    def write(self, path: str):
+        with open(path, "w") as f:
+            f.write(self.collapsed())
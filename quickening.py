@@ -0,0 +1,262 @@
+import operator
+from collections import Counter
+from typing import Any
+
+from expr import Binary, Literal, Unary
+from interpreter import Interpreter
+from output import Output
+from runtime import Rope, concat, strings
+
+# Specialized variants of Binary and Unary. A node is turned into one by
+# assigning its __class__: the variants add no fields, so the layout is the
+# node's own, and their accept sends it to a visit method that does the one
+# thing the node has been seen to do, behind a type check. The rewrite stays
+# with the tree, so a program that is run again (from the server's cache, say)
+# starts out specialized.
+
+
+class FloatBinary(Binary):
+    # an arithmetic or comparison operator on two floats
+    __slots__ = ()
+    operation = None
+
+    def accept(self, visitor):
+        return visitor.visit_float_binary(self)
+
+
+class FloatAdd(FloatBinary):
+    __slots__ = ()
+    operation = staticmethod(operator.add)
+
+
+class FloatSubtract(FloatBinary):
+    __slots__ = ()
+    operation = staticmethod(operator.sub)
+
+
+class FloatMultiply(FloatBinary):
+    __slots__ = ()
+    operation = staticmethod(operator.mul)
+
+
+class FloatDivide(FloatBinary):
+    __slots__ = ()
+    operation = staticmethod(operator.truediv)
+
+
+class FloatGreater(FloatBinary):
+    __slots__ = ()
+    operation = staticmethod(operator.gt)
+
+
+class FloatGreaterEqual(FloatBinary):
+    __slots__ = ()
+    operation = staticmethod(operator.ge)
+
+
+class FloatLess(FloatBinary):
+    __slots__ = ()
+    operation = staticmethod(operator.lt)
+
+
+class FloatLessEqual(FloatBinary):
+    __slots__ = ()
+    operation = staticmethod(operator.le)
+
+
+class StringConcat(Binary):
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visit_string_concat(self)
+
+
+class Equal(Binary):
+    # == and != take any operands, so these need no guard at all
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visit_equal(self)
+
+
+class NotEqual(Binary):
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visit_not_equal(self)
+
+
+class GenericBinary(Binary):
+    # a node that has seen more than one kind of operand, or none there is a
+    # variant for; it stays on the generic path without trying again
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visit_generic_binary_expr(self)
+
+
+class FloatNegate(Unary):
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visit_float_negate(self)
+
+
+class BoolNot(Unary):
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visit_bool_not(self)
+
+
+class GenericUnary(Unary):
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visit_generic_unary_expr(self)
+
+
+# keyed by the operator's lexeme rather than its TokenType, which hashes
+# far more slowly
+binary_variants = {
+    ("+", float, float): FloatAdd,
+    ("-", float, float): FloatSubtract,
+    ("*", float, float): FloatMultiply,
+    ("/", float, float): FloatDivide,
+    (">", float, float): FloatGreater,
+    (">=", float, float): FloatGreaterEqual,
+    ("<", float, float): FloatLess,
+    ("<=", float, float): FloatLessEqual,
+    ("+", str, str): StringConcat,
+    ("+", str, Rope): StringConcat,
+    ("+", Rope, str): StringConcat,
+    ("+", Rope, Rope): StringConcat,
+}
+equality_variants = {"==": Equal, "!=": NotEqual}
+
+unary_variants = {
+    ("-", float): FloatNegate,
+    ("!", bool): BoolNot,
+}
+
+
+class QuickeningInterpreter(Interpreter):
+    # The first evaluation of a plain Binary or Unary goes through the
+    # generic code as usual, and then rewrites the node into the variant for
+    # the operator and operand types it saw, or into GenericBinary or
+    # GenericUnary if there is none. A variant whose type check fails hands
+    # the operands it has already evaluated to the generic code, so nothing
+    # is evaluated twice, and turns the node generic for good.
+    #
+    # specialized counts nodes rewritten into each variant, generic the
+    # nodes that had none and went straight to GenericBinary or GenericUnary,
+    # and guard_failures the type checks that failed, by variant.
+
+    def __init__(self, output: Output | None = None):
+        super().__init__(output)
+        self.specialized: Counter[str] = Counter()
+        self.generic: Counter[str] = Counter()
+        self.guard_failures: Counter[str] = Counter()
+
+    def visit_binary_expr(self, expr: Binary):
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+        lexeme = expr.operator.lexeme
+        variant = binary_variants.get((lexeme, type(left), type(right)))
+        if variant is None:
+            variant = equality_variants.get(lexeme, GenericBinary)
+        expr.__class__ = variant
+        self.count_rewrite(variant, GenericBinary)
+        # the operands are what the variant is for, so its operation gives
+        # the result without going through the generic code
+        if variant is StringConcat:
+            return concat(left, right)
+        if variant is Equal:
+            return self.is_equal(left, right)
+        if variant is NotEqual:
+            return not self.is_equal(left, right)
+        if variant is GenericBinary:
+            return self.generic_binary(expr, left, right)
+        return variant.operation(left, right)
+
+    def visit_unary_expr(self, expr: Unary):
+        right = self.evaluate(expr.right)
+        variant = unary_variants.get((expr.operator.lexeme, type(right)), GenericUnary)
+        expr.__class__ = variant
+        self.count_rewrite(variant, GenericUnary)
+        if variant is FloatNegate:
+            return -right
+        if variant is BoolNot:
+            return not right
+        return self.generic_unary(expr, right)
+
+    def count_rewrite(self, variant: type, generic: type):
+        if variant is generic:
+            self.generic[variant.__name__] += 1
+        else:
+            self.specialized[variant.__name__] += 1
+
+    visit_generic_binary_expr = Interpreter.visit_binary_expr
+    visit_generic_unary_expr = Interpreter.visit_unary_expr
+
+    def visit_float_binary(self, expr: FloatBinary):
+        left = expr.left.accept(self)
+        right = expr.right.accept(self)
+        if type(left) is float and type(right) is float:
+            return expr.operation(left, right)
+        return self.binary_guard_failed(expr, left, right)
+
+    def visit_string_concat(self, expr: StringConcat):
+        left = expr.left.accept(self)
+        right = expr.right.accept(self)
+        if type(left) in strings and type(right) in strings:
+            return concat(left, right)
+        return self.binary_guard_failed(expr, left, right)
+
+    def visit_equal(self, expr: Equal):
+        return self.is_equal(expr.left.accept(self), expr.right.accept(self))
+
+    def visit_not_equal(self, expr: NotEqual):
+        return not self.is_equal(expr.left.accept(self), expr.right.accept(self))
+
+    def visit_float_negate(self, expr: FloatNegate):
+        right = expr.right.accept(self)
+        if type(right) is float:
+            return -right
+        return self.unary_guard_failed(expr, right)
+
+    def visit_bool_not(self, expr: BoolNot):
+        right = expr.right.accept(self)
+        if type(right) is bool:
+            return not right
+        return self.unary_guard_failed(expr, right)
+
+    def binary_guard_failed(self, expr: Binary, left: Any, right: Any) -> Any:
+        self.guard_failures[type(expr).__name__] += 1
+        expr.__class__ = GenericBinary
+        return self.generic_binary(expr, left, right)
+
+    def unary_guard_failed(self, expr: Unary, right: Any) -> Any:
+        self.guard_failures[type(expr).__name__] += 1
+        expr.__class__ = GenericUnary
+        return self.generic_unary(expr, right)
+
+    def generic_binary(self, expr: Binary, left: Any, right: Any) -> Any:
+        # the generic code on values already in hand, for the same result
+        # and the same errors
+        operands = Binary(Literal(left), expr.operator, Literal(right))
+        return Interpreter.visit_binary_expr(self, operands)
+
+    def generic_unary(self, expr: Unary, right: Any) -> Any:
+        return Interpreter.visit_unary_expr(self, Unary(expr.operator, Literal(right)))
+
+    def report(self) -> str:
+        out = [f"{'variant':<18} {'specialized':>12} {'guard failures':>15}"]
+        for name in sorted(self.specialized.keys() | self.guard_failures.keys()):
+            out.append(f"{name:<18} {self.specialized[name]:>12} {self.guard_failures[name]:>15}")
+        if self.generic:
+            out.append("")
+            out.append(f"{'no variant':<18} {'nodes':>12}")
+            for name in sorted(self.generic):
+                out.append(f"{name:<18} {self.generic[name]:>12}")
+        return "\n".join(out)
@@ -0,0 +1,82 @@
+from typing import Iterable
+
+from expr import Assign, Binary, Grouping, Literal, Unary, Variable
+from stmt import Expression, Print, Stmt, Var
+from visitor import Visitor
+
+
+class Resolver(Visitor):
+    # Gives every declared variable a slot in its scope and every use of one a
+    # (depth, slot) pair: how many scopes out the declaration is, and where in
+    # that scope. A use that comes before any declaration of its name is left
+    # unresolved; the interpreter reports it as undefined when it is reached.
+    #
+    # Lox only has a global scope so far, and top-level code runs straight
+    # through, so a declaration seen earlier has always run by the time a use
+    # of it does.
+
+    def __init__(self):
+        self.scopes: list[dict[str, int]] = [{}]
+
+    def resolve(self, statements: Iterable[Stmt]):
+        for statement in statements:
+            statement.accept(self)
+
+    def resolve_iter(self, statements: Iterable[Stmt]) -> Iterable[Stmt]:
+        for statement in statements:
+            statement.accept(self)
+            yield statement
+
+    def declare(self, name: str) -> int:
+        scope = self.scopes[-1]
+        if name not in scope:
+            scope[name] = len(scope)
+        return scope[name]
+
+    def forget_from(self, slot: int):
+        # drops the globals given slot or a later one. Top-level code runs
+        # straight through and new names get the next slot, so after a run
+        # stops on an error, the declarations that never ran are exactly the
+        # ones past the last slot it defined.
+        scope = self.scopes[0]
+        if len(scope) > slot:
+            self.scopes[0] = {name: s for name, s in scope.items() if s < slot}
+
+    def resolve_name(self, expr: Variable | Assign):
+        for depth, scope in enumerate(reversed(self.scopes)):
+            if expr.name.lexeme in scope:
+                expr.depth = depth
+                expr.slot = scope[expr.name.lexeme]
+                return
+
+    def visit_binary_expr(self, expr: Binary):
+        expr.left.accept(self)
+        expr.right.accept(self)
+
+    def visit_grouping_expr(self, expr: Grouping):
+        expr.expression.accept(self)
+
+    def visit_literal_expr(self, expr: Literal):
+        pass
+
+    def visit_unary_expr(self, expr: Unary):
+        expr.right.accept(self)
+
+    def visit_variable_expr(self, expr: Variable):
+        self.resolve_name(expr)
+
+    def visit_assign_expr(self, expr: Assign):
+        expr.value.accept(self)
+        self.resolve_name(expr)
+
+    def visit_expression_stmt(self, stmt: Expression):
+        stmt.expression.accept(self)
+
+    def visit_print_stmt(self, stmt: Print):
+        stmt.expression.accept(self)
+
+    def visit_var_stmt(self, stmt: Var):
+        # the initializer can't see the variable it initializes
+        if stmt.initializer is not None:
+            stmt.initializer.accept(self)
+        stmt.slot = self.declare(stmt.name.lexeme)
@@ -0,0 +1,130 @@
+from typing import Any
+
+from error import LoxRuntimeError
+from tokens import Token
+
+
+# Below this many characters + just copies; a rope only pays for itself once
+# copying the left operand costs more than allocating a node
+min_rope_length = 256
+
+
+class Rope:
+    # A Lox string built by +, kept as the two strings it joins until its
+    # text is needed. Adding to a rope is one allocation, where copying would
+    # make a string built up piece by piece quadratic in its length. str()
+    # flattens it, without recursing, and keeps the text in place of the
+    # children. Ropes compare and hash like the text they hold, and Lox code
+    # can't tell one from a str: see strings, concat and lox_type.
+
+    __slots__ = ("left", "right", "length", "text")
+
+    def __init__(self, left: "str | Rope", right: "str | Rope"):
+        self.left = left
+        self.right = right
+        self.length = len(left) + len(right)
+        self.text: str | None = None
+
+    def __str__(self) -> str:
+        if self.text is None:
+            pieces = []
+            stack: list[str | Rope] = [self]
+            while stack:
+                node = stack.pop()
+                if type(node) is str:
+                    pieces.append(node)
+                elif node.text is not None:
+                    pieces.append(node.text)
+                else:
+                    stack.append(node.right)
+                    stack.append(node.left)
+            self.text = "".join(pieces)
+            self.left = self.right = None
+        return self.text
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __eq__(self, other: Any) -> bool:
+        if type(other) is Rope or type(other) is str:
+            return self.length == len(other) and str(self) == str(other)
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(str(self))
+
+    # so that Python's + on Lox strings, in the generated Python, makes ropes
+    def __add__(self, other: Any) -> "Rope":
+        if type(other) is str or type(other) is Rope:
+            return Rope(self, other)
+        return NotImplemented
+
+    def __radd__(self, other: Any) -> "Rope":
+        if type(other) is str:
+            return Rope(other, self)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"Rope({str(self)!r})"
+
+
+# the Python types of a Lox string
+strings = (str, Rope)
+
+
+def concat(a: str | Rope, b: str | Rope) -> str | Rope:
+    if type(a) is str and type(b) is str and len(a) + len(b) < min_rope_length:
+        return a + b
+    return Rope(a, b)
+
+
+def lox_type(value: Any) -> type:
+    # the type error messages report, which for a rope is str
+    return str if type(value) is Rope else type(value)
+
+
+def is_truthy(value: Any) -> bool:
+    if value is None:
+        return False
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, float) or isinstance(value, int):
+        return value != 0
+    return True
+
+
+def is_equal(a: Any, b: Any) -> bool:
+    if a is None and b is None:
+        return True
+    if a is None:
+        return False
+    return a == b
+
+
+def stringify(value: Any) -> str:
+    if value is None:
+        return "nil"
+
+    if isinstance(value, float):
+        text = str(value)
+        if text.endswith(".0"):
+            text = text[:-2]
+        return text
+
+    return str(value)
+
+
+def check_number_operands(operator: Token, *operands: Any):
+    for i, operand in enumerate(operands):
+        if not isinstance(operand, float):
+            raise LoxRuntimeError(
+                operator,
+                f"All operands to operation f{operator} must be floats, got {lox_type(operand)} at index {i}",
+            )
+
+
+def plus_operands_error(operator: Token, left: Any, right: Any) -> LoxRuntimeError:
+    return LoxRuntimeError(
+        operator,
+        f"Operands to operation {operator} must both be strings or floats, got {lox_type(left)} and {lox_type(right)}",
+    )
@@ -1,8 +1,11 @@
-from typing import List
+import re
+from array import array
+from concurrent.futures import Executor
+from typing import Iterator, List, TextIO
 
 import lox
 from token_type import TokenType
-from tokens import Token
+from tokens import MappedTokenBuffer, Token, TokenBuffer, token_codes
 
 keywords = {
     "and": TokenType.AND,
@@ -23,15 +26,103 @@ keywords = {
     "while": TokenType.WHILE,
 }
 
+operators = {
+    token_type.value: token_type
+    for token_type in TokenType
+    if not token_type.value.isalpha()
+}
+
+keyword_codes = {text: token_codes[token_type] for text, token_type in keywords.items()}
+operator_codes = {text: token_codes[token_type] for text, token_type in operators.items()}
+byte_keyword_codes = {text.encode(): code for text, code in keyword_codes.items()}
+byte_operator_codes = {text.encode(): code for text, code in operator_codes.items()}
+
+# leading blanks plus one lexeme per match; anything that matches none of the
+# alternatives (a stray character, or a non-ASCII letter starting an
+# identifier) is handed to the character-at-a-time Scanner.scan_token.
+# Scanner.number takes any Unicode digit, so neither does a number running
+# into a non-ASCII character, or a dot and one. The lookaheads after the
+# digits keep the match from backing off to a shorter number instead.
+token_pattern = re.compile(
+    r"""
+    [ \r\t]*
+    (?:
+    (?P<identifier>[A-Za-z][^\W_]*)
+    | (?P<number>
+        [0-9]+(?![0-9])(?:\.[0-9]+(?![0-9])|(?!\.[0-9]))
+        (?![^\x00-\x7f]|\.[^\x00-\x7f])
+      )
+    | (?P<string>"[^"]*")
+    | (?P<unterminated_string>"[^"]*)
+    | (?P<line_comment>//[^\n]*)
+    | (?P<block_comment>/\*[^*]*\*/?)
+    | (?P<unterminated_comment>/\*[^*]*)
+    | (?P<operator>!=|==|<=|>=|[(){},.\-+;*!=<>/])
+    | (?P<newline>\n)
+    | (?P<end>\Z)
+    )
+    """,
+    re.VERBOSE,
+)
+
+# token_pattern for UTF-8 bytes. Only ASCII is matched here: an identifier
+# running into a non-ASCII byte doesn't match at all, and MappedScanner
+# decodes that stretch and scans it as text. The bytes are the file as it
+# is, so \r\n and a lone \r are newlines here, as they are in the text
+# that reading the file in text mode gives.
+byte_token_pattern = re.compile(
+    rb"""
+    [ \t]*
+    (?:
+    (?P<identifier>[A-Za-z][A-Za-z0-9]*(?![A-Za-z0-9\x80-\xff]))
+    | (?P<number>
+        [0-9]+(?![0-9])(?:\.[0-9]+(?![0-9])|(?!\.[0-9]))
+        (?![\x80-\xff]|\.[\x80-\xff])
+      )
+    | (?P<string>"[^"]*")
+    | (?P<unterminated_string>"[^"]*)
+    | (?P<line_comment>//[^\r\n]*)
+    | (?P<block_comment>/\*[^*]*\*/?)
+    | (?P<unterminated_comment>/\*[^*]*)
+    | (?P<operator>!=|==|<=|>=|[(){},.\-+;*!=<>/])
+    | (?P<newline>\r\n|\r|\n)
+    | (?P<end>\Z)
+    )
+    """,
+    re.VERBOSE,
+)
+
+# what MappedScanner decodes when byte_token_pattern doesn't match: a run of
+# letters and digits, non-ASCII ones included, and of dots between them, so
+# that a number like 1.٣ is decoded whole, or else the single stray byte
+text_run_pattern = re.compile(rb"[ \t]*([A-Za-z0-9\x80-\xff]+(?:\.[A-Za-z0-9\x80-\xff]+)*|.)")
+
+
+def count_newlines(text: str) -> int:
+    return text.count("\n")
+
+
+def count_byte_newlines(data: bytes) -> int:
+    # \r\n, a lone \r and a lone \n each end one line
+    return data.count(b"\n") + data.count(b"\r") - data.count(b"\r\n")
+
 
 class Scanner:
-    def __init__(self, source: str, interpreter: lox.Lox):
+    # strings is the intern table: identifier lexemes and string literals are
+    # looked up in it, so each distinct one is stored once however often it
+    # appears, and lookups by name hit on identity. A Lox passes the same
+    # table to every scanner it makes, the prompt's included.
+
+    def __init__(
+        self, source: str, interpreter: "lox.Lox", strings: dict[str, str] | None = None
+    ):
         self.source: str = source
+        self.strings: dict[str, str] = {} if strings is None else strings
         self.tokens: List[Token] = []
         self.start: int = 0
         self.current: int = 0
         self.line: int = 1
-        self.interpreter: lox.Lox = interpreter
+        self.interpreter: "lox.Lox" = interpreter
 
     def scan_tokens(self) -> List[Token]:
         while not self.is_at_end():
@@ -127,7 +218,7 @@ class Scanner:
         self.advance()
 
         # Add stuff between quotes as token
-        value = self.source[self.start + 1 : self.current - 1]
+        value = self.intern(self.source[self.start + 1 : self.current - 1])
         self.add_token(TokenType.STRING, value)
 
     def number(self):
@@ -154,8 +245,13 @@ class Scanner:
 
     def add_token(self, token: TokenType, literal=None):
         text = self.source[self.start : self.current]
+        if token == TokenType.IDENTIFIER:
+            text = self.intern(text)
         self.tokens.append(Token(token, text, literal, self.line))
 
+    def intern(self, text: str) -> str:
+        return self.strings.setdefault(text, text)
+
     def match(self, expected: str) -> bool:
         if self.is_at_end():
             return False
@@ -182,3 +278,364 @@ class Scanner:
 
     def is_at_end(self) -> bool:
         return self.current >= len(self.source)
+
+
+class FastScanner(Scanner):
+    # Produces the same tokens and errors as Scanner, matching a whole lexeme
+    # per step with token_pattern instead of one character per call.
+
+    def scan_tokens(self) -> List[Token]:
+        self.scan_source(final=True)
+        self.tokens.append(Token(TokenType.EOF, "", None, self.line))
+        return self.tokens
+
+    def scan_source(self, final: bool):
+        # Lexes self.source from self.current. Unless this is the final piece
+        # of input, stops in front of an unterminated string or comment, which
+        # may still be closed by text that hasn't been read yet.
+        source = self.source
+        tokens = self.tokens
+        match = token_pattern.match
+        end = len(source)
+        pos = self.current
+        line = self.line
+        intern = self.strings.setdefault
+        IDENTIFIER = TokenType.IDENTIFIER
+        NUMBER = TokenType.NUMBER
+        STRING = TokenType.STRING
+
+        while pos < end:
+            m = match(source, pos)
+
+            if m is None:
+                self.start = self.current = pos
+                self.line = line
+                self.scan_token()
+                pos = self.current
+                line = self.line
+                continue
+
+            kind = m.lastgroup
+            text = m.group(kind)
+
+            if kind == "identifier":
+                # keywords go through the table too, which is cheaper than
+                # telling them apart first
+                text = intern(text, text)
+                tokens.append(Token(keywords.get(text, IDENTIFIER), text, None, line))
+            elif kind == "operator":
+                tokens.append(Token(operators[text], text, None, line))
+            elif kind == "newline":
+                line += 1
+            elif kind == "number":
+                tokens.append(Token(NUMBER, text, float(text), line))
+            elif kind == "string":
+                line += text.count("\n")
+                value = text[1:-1]
+                tokens.append(Token(STRING, text, intern(value, value), line))
+            elif kind == "line_comment":
+                pass
+            elif kind == "block_comment":
+                line += text.count("\n")
+            elif not final:
+                pos = m.start(kind)
+                break
+            elif kind == "unterminated_string":
+                line += text.count("\n")
+                self.interpreter.error(line, "Unterminated string.")
+            elif kind == "unterminated_comment":
+                line += text.count("\n")
+                self.interpreter.error(line, "Unterminated comment.")
+
+            pos = m.end()
+
+        self.start = self.current = pos
+        self.line = line
+
+
+class BufferScanner(FastScanner):
+    # Lexes into a TokenBuffer: the same tokens and errors as FastScanner, but
+    # stored as type codes and offsets, without a Token object, lexeme string
+    # or literal per token.
+
+    pattern = token_pattern
+    keyword_codes = keyword_codes
+    operator_codes = operator_codes
+    count_lines = staticmethod(count_newlines)
+
+    def scan_buffer(self) -> TokenBuffer:
+        source = self.source
+        buffer = self.new_buffer()
+        add_type = buffer.types.append
+        add_start = buffer.starts.append
+        add_end = buffer.ends.append
+        add_line = buffer.lines.append
+        match = self.pattern.match
+        keyword_codes = self.keyword_codes
+        operator_codes = self.operator_codes
+        end = len(source)
+        pos = self.current
+        line = self.line
+        IDENTIFIER = token_codes[TokenType.IDENTIFIER]
+        NUMBER = token_codes[TokenType.NUMBER]
+        STRING = token_codes[TokenType.STRING]
+        count_lines = self.count_lines
+
+        while pos < end:
+            m = match(source, pos)
+
+            if m is None:
+                pos, line = self.scan_unmatched(buffer, pos, line)
+                continue
+
+            # every lexeme ends where the match does, after any leading blanks
+            kind = m.lastgroup
+            pos = m.end()
+
+            if kind == "identifier":
+                text = m.group(kind)
+                add_type(keyword_codes.get(text, IDENTIFIER))
+                add_start(pos - len(text))
+            elif kind == "operator":
+                text = m.group(kind)
+                add_type(operator_codes[text])
+                add_start(pos - len(text))
+            elif kind == "newline":
+                line += 1
+                continue
+            elif kind == "number":
+                add_type(NUMBER)
+                add_start(m.start(kind))
+            elif kind == "string":
+                start = m.start(kind)
+                line += count_lines(m.group(kind))
+                add_type(STRING)
+                add_start(start)
+            elif kind == "block_comment":
+                line += count_lines(m.group(kind))
+                continue
+            elif kind == "unterminated_string" or kind == "unterminated_comment":
+                line += count_lines(m.group(kind))
+                what = "string" if kind == "unterminated_string" else "comment"
+                self.interpreter.error(line, f"Unterminated {what}.")
+                continue
+            else:
+                continue
+
+            add_end(pos)
+            add_line(line)
+
+        add_type(token_codes[TokenType.EOF])
+        add_start(end)
+        add_end(end)
+        add_line(line)
+        self.start = self.current = end
+        self.line = line
+        return buffer
+
+    def new_buffer(self) -> TokenBuffer:
+        return TokenBuffer(self.source, self.strings)
+
+    def scan_unmatched(self, buffer: TokenBuffer, pos: int, line: int) -> tuple[int, int]:
+        # whatever scan_token produces is converted to columns; its lexeme
+        # runs from self.start to self.current like any other
+        self.start = self.current = pos
+        self.line = line
+        self.tokens = []
+        self.scan_token()
+        for token in self.tokens:
+            buffer.types.append(token_codes[token.type])
+            buffer.starts.append(self.start)
+            buffer.ends.append(self.current)
+            buffer.lines.append(token.line)
+        return self.current, self.line
+
+
+class MappedScanner(BufferScanner):
+    # Lexes UTF-8 bytes, typically a memory-mapped file, into a
+    # MappedTokenBuffer without ever decoding the whole source: offsets are
+    # byte offsets, and lexemes are decoded as the parser asks for them. The
+    # tokens and errors are the same as for the decoded text.
+
+    pattern = byte_token_pattern
+    keyword_codes = byte_keyword_codes
+    operator_codes = byte_operator_codes
+    count_lines = staticmethod(count_byte_newlines)
+
+    def new_buffer(self) -> TokenBuffer:
+        return MappedTokenBuffer(self.source, self.strings)
+
+    def scan_unmatched(self, buffer: TokenBuffer, pos: int, line: int) -> tuple[int, int]:
+        # Non-ASCII letters, or a byte no token starts with. The run is
+        # decoded and scanned as text; it can't hold a newline, and it ends
+        # where any token would, so it scans exactly as it would in place.
+        m = text_run_pattern.match(self.source, pos)
+        start = m.start(1)
+        text = self.source[start : m.end()].decode()
+        scanner = BufferScanner(text, self.interpreter)
+        scanner.line = line
+        piece = scanner.scan_buffer()
+        for index in range(len(piece) - 1):
+            buffer.types.append(piece.types[index])
+            buffer.starts.append(start + len(text[: piece.starts[index]].encode()))
+            buffer.ends.append(start + len(text[: piece.ends[index]].encode()))
+            buffer.lines.append(piece.lines[index])
+        return m.end(), line
+
+
+# the spans a chunk boundary mustn't fall in: strings and block comments,
+# which can hold newlines, matched as token_pattern matches them. Line
+# comments are matched too, so that quotes and /* inside them are skipped.
+multiline_pattern = re.compile(r'"[^"]*"?|//[^\n]*|/\*[^*]*(?:\*/?)?')
+
+
+def split_points(source: str, pieces: int) -> list[int]:
+    # Up to pieces - 1 offsets, each just after a newline that isn't inside
+    # a string or comment, near even fractions of the source.
+    points = []
+    spans = multiline_pattern.finditer(source)
+    span = next(spans, None)
+    position = 0
+    for piece in range(1, pieces):
+        newline = source.find("\n", max(position, len(source) * piece // pieces))
+        while newline != -1:
+            while span is not None and span.end() <= newline:
+                span = next(spans, None)
+            if span is None or span.start() > newline:
+                break
+            newline = source.find("\n", span.end())
+        if newline == -1:
+            break
+        position = newline + 1
+        if position < len(source) and (not points or points[-1] != position):
+            points.append(position)
+    return points
+
+
+class CollectedErrors:
+    # Stands in for Lox in a worker process, keeping the scan errors for the
+    # parent to report.
+
+    def __init__(self):
+        self.errors: list[tuple[int, str]] = []
+
+    def error(self, line: int, message: str):
+        self.errors.append((line, message))
+
+
+def scan_piece(source: str, offset: int, line: int):
+    # runs in a worker: the piece's columns, with offsets and lines as in
+    # the whole source, minus the EOF entry, then its errors and last line
+    errors = CollectedErrors()
+    scanner = BufferScanner(source, errors)
+    scanner.line = line
+    buffer = scanner.scan_buffer()
+    for column in (buffer.types, buffer.starts, buffer.ends, buffer.lines):
+        column.pop()
+    if offset:
+        buffer.starts = array("I", [start + offset for start in buffer.starts])
+        buffer.ends = array("I", [end + offset for end in buffer.ends])
+    return buffer.types, buffer.starts, buffer.ends, buffer.lines, errors.errors, scanner.line
+
+
+class ParallelScanner(BufferScanner):
+    # Splits the source into pieces at newlines outside strings and comments,
+    # where no token can be cut in two, lexes them with BufferScanner in an
+    # executor's worker processes and joins the results. Each piece starts
+    # on the line the newlines before it put it on, and the errors are
+    # reported in order once all pieces are done, so the TokenBuffer and the
+    # errors are those of scanning the whole source in one go.
+
+    def __init__(
+        self,
+        source: str,
+        interpreter: "lox.Lox",
+        executor: Executor,
+        pieces: int,
+        strings: dict[str, str] | None = None,
+    ):
+        super().__init__(source, interpreter, strings)
+        self.executor = executor
+        self.pieces = pieces
+
+    def scan_buffer(self) -> TokenBuffer:
+        source = self.source
+        bounds = [0, *split_points(source, self.pieces), len(source)]
+        first_lines = [1]
+        for start, end in zip(bounds, bounds[1:-1]):
+            first_lines.append(first_lines[-1] + source.count("\n", start, end))
+        results = self.executor.map(
+            scan_piece,
+            [source[start:end] for start, end in zip(bounds, bounds[1:])],
+            bounds[:-1],
+            first_lines,
+        )
+
+        buffer = self.new_buffer()
+        # the line each piece ends on; the last one's is where EOF is
+        line = 1
+        for types, starts, ends, lines, errors, piece_line in results:
+            buffer.types.extend(types)
+            buffer.starts.extend(starts)
+            buffer.ends.extend(ends)
+            buffer.lines.extend(lines)
+            for error_line, message in errors:
+                self.interpreter.error(error_line, message)
+            line = piece_line
+
+        buffer.types.append(token_codes[TokenType.EOF])
+        buffer.starts.append(len(source))
+        buffer.ends.append(len(source))
+        buffer.lines.append(line)
+        self.start = self.current = len(source)
+        self.line = line
+        return buffer
+
+
+class FileScanner(FastScanner):
+    # Lexes a file a block of lines at a time, so neither the whole source nor
+    # the whole token list has to be in memory at once. For the same reason
+    # it has an intern table of its own, emptied for every block, rather
+    # than the session's, which would keep every distinct name and literal
+    # in the file alive.
+
+    def __init__(
+        self, file: TextIO, interpreter: "lox.Lox", block_size: int = 1 << 16
+    ):
+        super().__init__("", interpreter)
+        self.file = file
+        self.block_size = block_size
+
+    def iter_tokens(self) -> Iterator[Token]:
+        pending = ""
+        read_size = self.block_size
+
+        while True:
+            data = self.file.read(read_size)
+            final = not data
+            source = pending + data
+
+            # only lex up to the last complete line; no token but strings and
+            # comments crosses a newline
+            cut = len(source) if final else source.rfind("\n") + 1
+            self.source = source[:cut]
+            pending = source[cut:]
+            self.current = 0
+
+            self.tokens = []
+            self.strings.clear()
+            self.scan_source(final)
+            yield from self.tokens
+            if final:
+                break
+
+            if self.current < cut or cut == 0:
+                # an unterminated string or comment, or no complete line yet;
+                # read further before retrying, growing the reads so long ones
+                # aren't rescanned over and over
+                pending = self.source[self.current :] + pending
+                read_size *= 2
+            else:
+                read_size = self.block_size
+
+        yield Token(TokenType.EOF, "", None, self.line)
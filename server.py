@@ -0,0 +1,119 @@
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+from typing import Any
+
+from cache import MemoryCache
+from lox import Lox
+from output import BufferedOutput, Output
+
+
+class Frames:
+    # The stream a request's BufferedOutput writes to: each flush of the
+    # script's output goes back to the client as one {"output": ...} line.
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+
+    def write(self, text: str):
+        self.wfile.write(json.dumps({"output": text}).encode() + b"\n")
+
+    def flush(self):
+        self.wfile.flush()
+
+
+def check_request(message: Any) -> dict[str, Any]:
+    # a request is {"path": ...} or {"source": ...}, with a string
+    if not isinstance(message, dict):
+        raise ValueError("a request must be a JSON object")
+    for key in ("path", "source"):
+        if key in message:
+            if not isinstance(message[key], str):
+                raise ValueError(f'"{key}" must be a string')
+            return message
+    raise KeyError('a request needs a "path" or a "source"')
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            # a connection that sends nothing, like remove_stale_socket's probe
+            return
+        try:
+            output = BufferedOutput(Frames(self.wfile))
+            try:
+                message = check_request(json.loads(line))
+            except (ValueError, KeyError) as e:
+                # what lox.py does with a bad command line
+                output.write_line(f"lox server: bad request: {e.args[0]}")
+                status = 64
+            else:
+                status = self.server.run(message, output)
+            output.flush()
+            self.wfile.write(json.dumps({"status": status}).encode() + b"\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # the client went away; nobody is left to tell
+            pass
+
+
+class LoxServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    # Runs scripts for clients on a Unix socket, each request in its own
+    # thread with a fresh Lox, so scripts share nothing but the cache of
+    # parsed (or, for --vm and --python, compiled) programs, which is keyed
+    # by a hash of the source and so picks up edited files by itself.
+
+    daemon_threads = True
+
+    def __init__(self, path: str, options: dict[str, Any], cache_size: int = 256):
+        self.options = options
+        self.cache = MemoryCache(cache_size)
+        super().__init__(path, RequestHandler)
+
+    def run(self, message: dict[str, Any], output: Output) -> int:
+        lox = Lox(cache=self.cache, output=output, **self.options)
+        try:
+            if "path" in message:
+                return lox.run_script(message["path"])
+            lox.run_cached(message["source"])
+            return lox.exit_status()
+        except OSError as e:
+            output.write_line(f"Can't open {e.filename}: {e.strerror}.")
+            return 66
+        except Exception as e:
+            # a script that crashes the interpreter itself mustn't take the
+            # server down
+            output.write_line(f"{type(e).__name__}: {e}")
+            return 70
+
+
+def remove_stale_socket(path: str):
+    # a socket file left behind by a server that's gone can be replaced, but
+    # not one that a running server still answers on
+    if not os.path.exists(path):
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(path)
+        except OSError:
+            os.remove(path)
+            return
+    raise OSError(f"a server is already listening on {path}")
+
+
+def serve(path: str, options: dict[str, Any]):
+    remove_stale_socket(path)
+    server = LoxServer(path, options)
+    # stop cleanly on SIGTERM as well as Ctrl-C, so the socket file goes
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print(f"serving on {path}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.remove(path)
@@ -4,19 +4,32 @@ from abc import ABC, abstractmethod
 from dataclasses import dataclass
 
 class Stmt(ABC):
+	__slots__ = ()
+
+	@abstractmethod
 	def accept(self, visitor):
-		return visitor.visit(self)
+		pass
 
-@dataclass
+@dataclass(slots=True)
 class Expression(Stmt):
 	expression: Expr
 
-@dataclass
+	def accept(self, visitor):
+		return visitor.visit_expression_stmt(self)
+
+@dataclass(slots=True)
 class Print(Stmt):
 	expression: Expr
 
-@dataclass
+	def accept(self, visitor):
+		return visitor.visit_print_stmt(self)
+
+@dataclass(slots=True)
 class Var(Stmt):
 	name: Token
 	initializer: Expr
+	slot: int = -1
+
+	def accept(self, visitor):
+		return visitor.visit_var_stmt(self)
 
@@ -0,0 +1,170 @@
+import asyncio
+import random
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import pytest
+
+from benchmarks import parser as parser_checks
+from benchmarks import quickening as quickening_checks
+from benchmarks import ropes as rope_checks
+from benchmarks import scanner as scanner_checks
+from cache import MemoryCache
+from interpreter import Interpreter
+from lox import Lox
+from output import CapturedOutput
+from parser import Parser, PrattParser
+from quickening import QuickeningInterpreter
+from scanner import FastScanner, Scanner
+
+
+@pytest.mark.parametrize("backend", ["interpreter", "vm", "closure"])
+def test_run_keeps_globals_between_runs(backend):
+    output = CapturedOutput()
+    lox = Lox(backend=backend, output=output)
+    lox.run("var a = 1;")
+    lox.run("var b = 2; print a; print b;")
+    assert output.getvalue() == "1\n2\n"
+    assert not lox.had_error
+    assert not lox.interpreter.had_runtime_error
+
+
+def test_profile_rejects_other_backends():
+    with pytest.raises(ValueError):
+        Lox(backend="closure", profile=True)
+
+
+@pytest.mark.parametrize(
+    "options", [{"backend": "vm"}, {"backend": "closure"}, {"profile": True}]
+)
+def test_quicken_rejects_other_modes(options):
+    with pytest.raises(ValueError):
+        Lox(quicken=True, **options)
+
+
+@pytest.mark.parametrize("backend", ["interpreter", "vm", "closure", "python"])
+@pytest.mark.parametrize("second", ["print a;", "var b = 1; print a;"])
+def test_failed_declaration_stays_undefined(backend, second):
+    output = CapturedOutput()
+    lox = Lox(backend=backend, output=output)
+    lox.run("var a = -nil;")
+    lox.run(second)
+    assert output.lines[-1].endswith("Undefined variable 'a'.")
+
+
+@pytest.mark.parametrize("backend", ["interpreter", "closure"])
+def test_cached_programs_are_not_resolved_against_another_session(backend):
+    cache = MemoryCache()
+    first = Lox(backend=backend, cache=cache, output=CapturedOutput())
+    first.run_cached("var a = 1;")
+    first.run_cached("var b = 2; print a;")
+
+    output = CapturedOutput()
+    second = Lox(backend=backend, cache=cache, output=output)
+    second.run_cached("var x = 5;")
+    second.run_cached("var b = 2; print a;")
+    second.run_cached("print x;")
+    assert output.lines[0].endswith("Undefined variable 'a'.")
+    assert output.lines[1] == "5"
+
+    output = CapturedOutput()
+    third = Lox(backend=backend, cache=cache, output=output)
+    third.run_cached("var x = 5;")
+    third.run_cached("print x;")
+    assert output.lines == ["5"]
+
+
+@pytest.mark.parametrize("backend", ["interpreter", "vm", "closure"])
+def test_prepared_results_hold_no_ropes(backend):
+    program = Lox(backend=backend).prepare('var s = p + "y"; p = p + "z";')
+    environment = program.run({"p": "x" * 300}).environment
+    assert environment.values["s"] == "x" * 300 + "y"
+    assert type(environment.values["s"]) is str
+    assert type(environment.values["p"]) is str
+
+
+@pytest.mark.parametrize("backend", ["interpreter", "closure"])
+@pytest.mark.parametrize("slice_size", [0, -1])
+def test_run_async_rejects_slices_that_never_yield(backend, slice_size):
+    program = Lox(backend=backend).prepare("print 1;")
+    with pytest.raises(ValueError):
+        asyncio.run(program.run_async(slice_size=slice_size))
+
+
+def test_quickening_counts_generic_fallbacks_apart():
+    lox = Lox(quicken=True, optimize=False, output=CapturedOutput())
+    lox.run("print 1 + 2; print !1;")
+    assert lox.interpreter.specialized == {"FloatAdd": 1}
+    assert lox.interpreter.generic == {"GenericUnary": 1}
+
+
+def test_assigning_an_undefined_global_defines_nothing():
+    lox = Lox(backend="vm", output=CapturedOutput())
+    lox.run("a = 1;")
+    assert lox.interpreter.had_runtime_error
+    assert "a" not in lox.interpreter.globals.values
+
+
+
+# small, fixed subsets of the differential checks in benchmarks/, which run
+# thousands of cases
+
+
+def fuzz(alphabet, count: int, joiner: str = "") -> list[str]:
+    rng = random.Random(0)
+    return [joiner.join(rng.choices(alphabet, k=rng.randint(1, 30))) for _ in range(count)]
+
+
+scanner_sources = scanner_checks.edge_cases + fuzz(scanner_checks.fuzz_alphabet, 200)
+
+
+@pytest.mark.parametrize("source", scanner_sources)
+def test_scanners_agree_with_the_reference(source):
+    expected = scanner_checks.scan(Scanner, source)
+    assert scanner_checks.scan(FastScanner, source) == expected
+    assert scanner_checks.scan_file(source, 7) == expected
+    assert scanner_checks.scan_buffer(source) == expected
+    text = scanner_checks.text_mode(source)
+    assert scanner_checks.scan_mapped(source) == scanner_checks.scan(Scanner, text)
+
+
+def test_parallel_scanner_agrees_with_the_reference():
+    with ProcessPoolExecutor(2) as executor:
+        for source in scanner_checks.edge_cases:
+            expected = scanner_checks.scan(Scanner, source)
+            assert scanner_checks.scan_parallel(source, executor, 8) == expected
+
+
+parser_sources = parser_checks.edge_cases + fuzz(parser_checks.fuzz_tokens, 200, " ")
+
+
+@pytest.mark.parametrize("source", parser_sources)
+def test_parsers_agree_with_the_reference(source):
+    expected = parser_checks.parse(Parser, source)
+    assert parser_checks.parse(PrattParser, source) == expected
+    assert parser_checks.parse_stream(PrattParser, source) == expected
+    assert parser_checks.parse_buffer(source) == expected
+    text = parser_checks.text_mode(source)
+    assert parser_checks.parse_mapped(source) == parser_checks.parse(Parser, text)
+
+
+@pytest.mark.parametrize("source", list(islice(quickening_checks.programs(), 100)))
+def test_quickened_trees_print_what_the_interpreter_prints(source):
+    statements = quickening_checks.parse(source)
+    expected, _ = quickening_checks.run(Interpreter, statements)
+    # once as the tree specializes, once specialized
+    for _ in range(2):
+        assert quickening_checks.run(QuickeningInterpreter, statements)[0] == expected
+
+
+@pytest.mark.parametrize("source", rope_checks.rope_sources)
+def test_ropes_print_what_flat_strings_print(source):
+    flat = CapturedOutput()
+    rope_checks.flat(lambda output: Lox(optimize=False, output=output).run(source))(flat)
+    runs = {}
+    for backend in ("interpreter", "closure", "vm", "python"):
+        for optimize in (False, True):
+            output = CapturedOutput()
+            Lox(backend=backend, optimize=optimize, output=output).run(source)
+            runs[backend, optimize] = output.lines
+    assert all(lines == flat.lines for lines in runs.values())
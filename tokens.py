@@ -1,10 +1,11 @@
+from array import array
 from dataclasses import dataclass
 from typing import Any
 
 from token_type import TokenType
 
 
-@dataclass
+@dataclass(slots=True)
 class Token:
     type: TokenType
     lexeme: str
@@ -13,3 +14,73 @@ class Token:
 
     def __str__(self):
         return f"{self.type} {self.lexeme} {self.literal}"
+
+
+token_types = list(TokenType)
+# each TokenType's position in token_types, as stored in TokenBuffer.types
+token_codes = {token_type: code for code, token_type in enumerate(token_types)}
+number_code = token_codes[TokenType.NUMBER]
+string_code = token_codes[TokenType.STRING]
+identifier_code = token_codes[TokenType.IDENTIFIER]
+
+
+class TokenBuffer:
+    # A scanned source as parallel columns rather than a list of Tokens: a
+    # type code, the start and end offsets of the lexeme in the source, and
+    # the line, about 13 bytes a token all told. Indexing builds the Token on
+    # the spot, slicing out its lexeme and converting its literal, so only
+    # the tokens something actually asks for are ever materialized. Names and
+    # string literals come from the scanner's intern table, strings.
+
+    def __init__(self, source: str, strings: dict[str, str] | None = None):
+        self.source = source
+        self.strings: dict[str, str] = {} if strings is None else strings
+        self.types = array("B")
+        self.starts = array("I")
+        self.ends = array("I")
+        self.lines = array("I")
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def __getitem__(self, index: int) -> Token:
+        code = self.types[index]
+        lexeme = self.text(self.starts[index], self.ends[index])
+        literal = None
+        if code == identifier_code:
+            lexeme = self.strings.setdefault(lexeme, lexeme)
+        elif code == number_code:
+            literal = float(lexeme)
+        elif code == string_code:
+            literal = lexeme[1:-1]
+            literal = self.strings.setdefault(literal, literal)
+        return Token(token_types[code], lexeme, literal, self.lines[index])
+
+    def literal(self, index: int) -> Any:
+        code = self.types[index]
+        if code == number_code:
+            return float(self.text(self.starts[index], self.ends[index]))
+        if code == string_code:
+            text = self.text(self.starts[index] + 1, self.ends[index] - 1)
+            return self.strings.setdefault(text, text)
+        return None
+
+    def text(self, start: int, end: int) -> str:
+        return self.source[start:end]
+
+
+def decode_text(data: bytes) -> str:
+    # UTF-8 bytes of a file as text mode would read them, with \r\n and a
+    # lone \r turned into \n; only strings and comments can hold either
+    text = data.decode()
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+class MappedTokenBuffer(TokenBuffer):
+    # A TokenBuffer over UTF-8 bytes, such as an mmap of the script: offsets
+    # count bytes, and each lexeme is decoded when it is asked for.
+
+    def text(self, start: int, end: int) -> str:
+        return decode_text(self.source[start:end])
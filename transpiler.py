@@ -0,0 +1,392 @@
+import math
+import sys
+from types import CodeType
+from typing import Any, Iterable
+
+from error import LoxRuntimeError
+from expr import Assign, Binary, Grouping, Literal, Unary, Variable
+from output import Output
+from runtime import (
+    check_number_operands,
+    concat,
+    is_truthy,
+    plus_operands_error,
+    stringify,
+    strings,
+)
+from stmt import Expression, Print, Stmt, Var
+from token_type import TokenType
+from tokens import Token
+from visitor import Visitor
+
+# Python's parser gives up on expressions nested a couple of hundred levels
+# deep, so statements deeper than this are flattened into temporaries
+max_depth = 64
+
+
+def _plus(a, b, operator):
+    if type(a) is float and type(b) is float:
+        return a + b
+    if type(a) in strings and type(b) in strings:
+        return concat(a, b)
+    raise plus_operands_error(operator, a, b)
+
+
+def _sub(a, b, operator):
+    if type(a) is not float or type(b) is not float:
+        check_number_operands(operator, a, b)
+    return a - b
+
+
+def _mul(a, b, operator):
+    if type(a) is not float or type(b) is not float:
+        check_number_operands(operator, a, b)
+    return a * b
+
+
+def _div(a, b, operator):
+    if type(a) is not float or type(b) is not float:
+        check_number_operands(operator, a, b)
+    return a / b
+
+
+def _gt(a, b, operator):
+    if type(a) is not float or type(b) is not float:
+        check_number_operands(operator, a, b)
+    return a > b
+
+
+def _ge(a, b, operator):
+    if type(a) is not float or type(b) is not float:
+        check_number_operands(operator, a, b)
+    return a >= b
+
+
+def _lt(a, b, operator):
+    if type(a) is not float or type(b) is not float:
+        check_number_operands(operator, a, b)
+    return a < b
+
+
+def _le(a, b, operator):
+    if type(a) is not float or type(b) is not float:
+        check_number_operands(operator, a, b)
+    return a <= b
+
+
+def _neg(a, operator):
+    if type(a) is not float:
+        check_number_operands(operator, a)
+    return -a
+
+
+def _undefined(name: Token):
+    raise LoxRuntimeError(name, "Undefined variable '" + name.lexeme + "'.")
+
+
+def _assign_undefined(value: Any, name: Token):
+    _undefined(name)
+
+
+helpers = {
+    "_plus": _plus,
+    "_sub": _sub,
+    "_mul": _mul,
+    "_div": _div,
+    "_gt": _gt,
+    "_ge": _ge,
+    "_lt": _lt,
+    "_le": _le,
+    "_neg": _neg,
+    "_truthy": is_truthy,
+    "_str": stringify,
+    "_undefined": _undefined,
+    "_assign_undefined": _assign_undefined,
+}
+
+# operator: (helper, inline Python operator, result kind)
+binary_operators = {
+    TokenType.MINUS: ("_sub", "-", "float"),
+    TokenType.STAR: ("_mul", "*", "float"),
+    TokenType.SLASH: ("_div", "/", "float"),
+    TokenType.GREATER: ("_gt", ">", "bool"),
+    TokenType.GREATER_EQUAL: ("_ge", ">=", "bool"),
+    TokenType.LESS: ("_lt", "<", "bool"),
+    TokenType.LESS_EQUAL: ("_le", "<=", "bool"),
+}
+
+
+class Program:
+    def __init__(self, source: str, tokens: list[Token]):
+        self.source = source
+        self.tokens = tokens
+        self.code: CodeType | None = None
+
+
+class Transpiler(Visitor):
+    # Translates a program into the source of one Python function. Expression
+    # visits return (code, kind), where kind is "float", "str" or "bool" when
+    # the value's type is known statically and None otherwise; operations on
+    # operands of a known type skip the runtime checks and become plain Python
+    # operators.
+    #
+    # Lox globals become Python globals named v_<name>. Top-level code runs
+    # straight through, so whether a name is defined at each use is known
+    # while translating: uses of names that aren't are translated to a call
+    # that raises the usual "Undefined variable" error.
+    #
+    # Runtime errors are raised with the operator or name token of the
+    # offending node, so they report the same lines as the Interpreter does.
+
+    def __init__(self, namespace: dict[str, Any], names: dict[str, str]):
+        self.namespace = namespace
+        self.names = names
+        self.defined: set[str] = set()
+        # names assigned that were defined by an earlier program in the same
+        # namespace; they have to be declared global too, or := binds a local
+        self.assigned: set[str] = set()
+        self.tokens: list[Token] = []
+        self.lines: list[str] = []
+        self.line: int | None = None
+        self.declared: str | None = None
+        self.depth = 0
+        self.deepest = 0
+        self.flatten = False
+        self.temporaries = 0
+
+    def transpile(self, statements: Iterable[Stmt]) -> Program:
+        body: list[str] = []
+        for statement in statements:
+            self.lines = []
+            self.line = None
+            self.deepest = 0
+            self.flatten = False
+            statement.accept(self)
+            if self.deepest > max_depth:
+                self.lines = []
+                self.flatten = True
+                statement.accept(self)
+
+            if self.line is not None:
+                self.lines[-1] += f"  # line {self.line}"
+            body.extend(self.lines)
+            if self.declared is not None:
+                self.defined.add(self.declared)
+                self.declared = None
+
+        source = ["def _lox_program(_t):"]
+        if self.defined or self.assigned:
+            names = sorted(self.defined | self.assigned)
+            source.append(f"    global {', '.join(names)}")
+        source.extend(f"    {line}" for line in body)
+        source.append("    pass")
+        return Program("\n".join(source) + "\n", self.tokens)
+
+    def name(self, lexeme: str) -> str:
+        if lexeme not in self.names:
+            # Python NFKC-normalizes the identifiers it compiles, which would
+            # make v_ﬁ and v_fi one global, so a non-ASCII lexeme gets a
+            # numbered name; an ASCII one can't start with an underscore
+            if lexeme.isascii():
+                name = f"v_{lexeme}"
+            else:
+                name = f"v__{len(self.names)}"
+            self.names[lexeme] = name
+        return self.names[lexeme]
+
+    def is_defined(self, name: str) -> bool:
+        return name in self.defined or name in self.namespace
+
+    def seen(self, token: Token):
+        # the statement's line is that of the first token translated in it
+        if self.line is None:
+            self.line = token.line
+
+    def token(self, token: Token) -> str:
+        self.tokens.append(token)
+        return f"_t[{len(self.tokens) - 1}]"
+
+    def value(self, code: str, kind: str | None) -> tuple[str, str | None]:
+        # in a flattened statement every intermediate result gets its own
+        # temporary, which keeps Python's evaluation order the same as Lox's
+        if not self.flatten:
+            return code, kind
+        self.temporaries += 1
+        temporary = f"_e{self.temporaries}"
+        self.lines.append(f"{temporary} = {code}")
+        return temporary, kind
+
+    def enter(self):
+        self.depth += 1
+        if self.depth > self.deepest:
+            self.deepest = self.depth
+
+    def visit_binary_expr(self, expr: Binary):
+        self.enter()
+        left, left_kind = expr.left.accept(self)
+        self.seen(expr.operator)
+        right, right_kind = expr.right.accept(self)
+        self.depth -= 1
+        op = expr.operator.type
+
+        if op == TokenType.EQUAL_EQUAL:
+            return self.value(f"({left} == {right})", "bool")
+        if op == TokenType.BANG_EQUAL:
+            return self.value(f"({left} != {right})", "bool")
+
+        if op == TokenType.PLUS:
+            if left_kind == right_kind and left_kind in ("float", "str"):
+                return self.value(f"({left} + {right})", left_kind)
+            kind = None
+            if "float" in (left_kind, right_kind):
+                kind = "float"
+            elif "str" in (left_kind, right_kind):
+                kind = "str"
+            operator = self.token(expr.operator)
+            return self.value(f"_plus({left}, {right}, {operator})", kind)
+
+        if op in binary_operators:
+            helper, inline, kind = binary_operators[op]
+            if left_kind == "float" and right_kind == "float":
+                return self.value(f"({left} {inline} {right})", kind)
+            operator = self.token(expr.operator)
+            return self.value(f"{helper}({left}, {right}, {operator})", kind)
+
+        raise LoxRuntimeError(expr.operator, f"Unknown operator {expr.operator}")
+
+    def visit_grouping_expr(self, expr: Grouping):
+        return expr.expression.accept(self)
+
+    def visit_literal_expr(self, expr: Literal):
+        value = expr.value
+        if value is None or isinstance(value, bool):
+            return repr(value), "bool" if isinstance(value, bool) else None
+        if isinstance(value, float):
+            if math.isfinite(value):
+                return f"({value!r})", "float"
+            return f"float({str(value)!r})", "float"
+        return repr(value), "str"
+
+    def visit_unary_expr(self, expr: Unary):
+        self.enter()
+        self.seen(expr.operator)
+        right, right_kind = expr.right.accept(self)
+        self.depth -= 1
+
+        if expr.operator.type == TokenType.MINUS:
+            if right_kind == "float":
+                return self.value(f"(-{right})", "float")
+            operator = self.token(expr.operator)
+            return self.value(f"_neg({right}, {operator})", "float")
+
+        if right_kind == "bool":
+            return self.value(f"(not {right})", "bool")
+        return self.value(f"(not _truthy({right}))", "bool")
+
+    def visit_variable_expr(self, expr: Variable):
+        self.seen(expr.name)
+        name = self.name(expr.name.lexeme)
+        if self.is_defined(name):
+            return name, None
+        return self.value(f"_undefined({self.token(expr.name)})", None)
+
+    def visit_assign_expr(self, expr: Assign):
+        self.seen(expr.name)
+        self.enter()
+        value, kind = expr.value.accept(self)
+        self.depth -= 1
+        name = self.name(expr.name.lexeme)
+        if self.is_defined(name):
+            self.assigned.add(name)
+            return self.value(f"({name} := {value})", kind)
+        token = self.token(expr.name)
+        return self.value(f"_assign_undefined({value}, {token})", kind)
+
+    def visit_expression_stmt(self, stmt: Expression):
+        code, _ = stmt.expression.accept(self)
+        self.lines.append(code)
+
+    def visit_print_stmt(self, stmt: Print):
+        code, _ = stmt.expression.accept(self)
+        self.lines.append(f"_print(_str({code}))")
+
+    def visit_var_stmt(self, stmt: Var):
+        self.seen(stmt.name)
+        code = "None"
+        if stmt.initializer is not None:
+            code, _ = stmt.initializer.accept(self)
+        name = self.name(stmt.name.lexeme)
+        self.lines.append(f"{name} = {code}")
+        # the name is defined once the whole statement has been translated
+        self.declared = name
+
+
+class PythonBackend:
+    # Runs programs by translating them to Python and executing that, so
+    # CPython's own bytecode loop does the work. Globals persist across
+    # interpret calls in one namespace, like the Interpreter's environment.
+
+    def __init__(
+        self,
+        dump: bool = False,
+        batch_size: int = 1024,
+        output: Output | None = None,
+    ):
+        self.output = Output() if output is None else output
+        self.had_runtime_error = False
+        self.namespace: dict[str, Any] = dict(helpers)
+        self.namespace["_print"] = self.output.write_line
+        self.names: dict[str, str] = {}
+        self.dump = dump
+        self.batch_size = batch_size
+        # statements of a stream that have been parsed but not yet run
+        self.pending: list[Stmt] = []
+
+    def transpile(self, statements: Iterable[Stmt]) -> Program:
+        return Transpiler(self.namespace, self.names).transpile(statements)
+
+    def compile(self, statements: Iterable[Stmt]) -> Program:
+        program = self.transpile(statements)
+        program.code = compile(program.source, "<lox>", "exec")
+        return program
+
+    def interpret(self, statements: Iterable[Stmt]):
+        try:
+            if isinstance(statements, list):
+                self.run(self.compile(statements))
+            else:
+                # a stream of statements: translate and run them a batch at a
+                # time rather than paying for compile() on every statement.
+                # The front end calls run_pending before it reports an error,
+                # so what was parsed ahead of the error still runs first.
+                self.pending = []
+                for statement in statements:
+                    self.pending.append(statement)
+                    if len(self.pending) == self.batch_size:
+                        self.run_pending()
+                self.run_pending()
+        except LoxRuntimeError as e:
+            self.output.write_line(str(e))
+            self.had_runtime_error = True
+        finally:
+            self.output.flush()
+
+    def run_pending(self):
+        batch, self.pending = self.pending, []
+        if batch:
+            self.run(self.compile(batch))
+
+    def interpret_compiled(self, program: Program):
+        try:
+            self.run(program)
+        except LoxRuntimeError as e:
+            self.output.write_line(str(e))
+            self.had_runtime_error = True
+        finally:
+            self.output.flush()
+
+    def run(self, program: Program):
+        if self.dump:
+            print(program.source, file=sys.stderr)
+        exec(program.code, self.namespace)
+        self.namespace["_lox_program"](program.tokens)
@@ -3,24 +3,7 @@ from stmt import *
 from abc import ABC, abstractmethod
 class Visitor(ABC):
 	def visit(self, val: Expr|Stmt):
-		if isinstance(val, Binary):
-			return self.visit_binary_expr(val)
-		if isinstance(val, Grouping):
-			return self.visit_grouping_expr(val)
-		if isinstance(val, Literal):
-			return self.visit_literal_expr(val)
-		if isinstance(val, Unary):
-			return self.visit_unary_expr(val)
-		if isinstance(val, Variable):
-			return self.visit_variable_expr(val)
-		if isinstance(val, Assign):
-			return self.visit_assign_expr(val)
-		if isinstance(val, Expression):
-			return self.visit_expression_stmt(val)
-		if isinstance(val, Print):
-			return self.visit_print_stmt(val)
-		if isinstance(val, Var):
-			return self.visit_var_stmt(val)
+		return val.accept(self)
 
 	@abstractmethod
 	def visit_binary_expr(self, expr: Binary):
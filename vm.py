@@ -0,0 +1,203 @@
+from typing import Iterable
+
+from bytecode import Chunk, OpCode
+from compiler import Compiler
+from environment import Environment
+from error import LoxRuntimeError
+from output import Output
+from runtime import (
+    check_number_operands,
+    concat,
+    is_equal,
+    is_truthy,
+    plus_operands_error,
+    stringify,
+    strings,
+)
+from stmt import Stmt
+
+CONSTANT = OpCode.CONSTANT.value
+NIL = OpCode.NIL.value
+TRUE = OpCode.TRUE.value
+FALSE = OpCode.FALSE.value
+POP = OpCode.POP.value
+GET_GLOBAL = OpCode.GET_GLOBAL.value
+DEFINE_GLOBAL = OpCode.DEFINE_GLOBAL.value
+SET_GLOBAL = OpCode.SET_GLOBAL.value
+EQUAL = OpCode.EQUAL.value
+NOT_EQUAL = OpCode.NOT_EQUAL.value
+GREATER = OpCode.GREATER.value
+GREATER_EQUAL = OpCode.GREATER_EQUAL.value
+LESS = OpCode.LESS.value
+LESS_EQUAL = OpCode.LESS_EQUAL.value
+ADD = OpCode.ADD.value
+SUBTRACT = OpCode.SUBTRACT.value
+MULTIPLY = OpCode.MULTIPLY.value
+DIVIDE = OpCode.DIVIDE.value
+NOT = OpCode.NOT.value
+NEGATE = OpCode.NEGATE.value
+PRINT = OpCode.PRINT.value
+RETURN = OpCode.RETURN.value
+
+
+class VM:
+    def __init__(self, output: Output | None = None):
+        self.globals = Environment()
+        self.compiler = Compiler()
+        self.output = Output() if output is None else output
+        self.had_runtime_error = False
+
+    def interpret(self, statements: Iterable[Stmt]):
+        try:
+            if isinstance(statements, list):
+                self.run(self.compiler.compile(statements))
+            else:
+                # a stream of statements: run each one as soon as it arrives
+                for statement in statements:
+                    self.run(self.compiler.compile([statement]))
+        except LoxRuntimeError as e:
+            self.output.write_line(str(e))
+            self.had_runtime_error = True
+        finally:
+            self.output.flush()
+
+    def compile(self, statements: list[Stmt]) -> Chunk:
+        return self.compiler.compile(statements)
+
+    def interpret_compiled(self, chunk: Chunk):
+        try:
+            self.run(chunk)
+        except LoxRuntimeError as e:
+            self.output.write_line(str(e))
+            self.had_runtime_error = True
+        finally:
+            self.output.flush()
+
+    def run(self, chunk: Chunk):
+        code = chunk.code
+        constants = chunk.constants
+        values = self.globals.values
+        write_line = self.output.write_line
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        ip = 0
+
+        # opcodes are tested roughly in order of how often they run
+        while True:
+            op = code[ip]
+
+            if op == CONSTANT:
+                push(constants[code[ip + 1]])
+                ip += 2
+            elif op == GET_GLOBAL:
+                name = constants[code[ip + 1]]
+                try:
+                    push(values[name.lexeme])
+                except KeyError:
+                    self.globals.get(name)
+                ip += 2
+            elif op == ADD:
+                b = pop()
+                a = pop()
+                if type(a) is float and type(b) is float:
+                    push(a + b)
+                elif type(a) in strings and type(b) in strings:
+                    push(concat(a, b))
+                else:
+                    raise plus_operands_error(constants[code[ip + 1]], a, b)
+                ip += 2
+            elif op == SUBTRACT:
+                b = pop()
+                a = pop()
+                if type(a) is not float or type(b) is not float:
+                    check_number_operands(constants[code[ip + 1]], a, b)
+                push(a - b)
+                ip += 2
+            elif op == MULTIPLY:
+                b = pop()
+                a = pop()
+                if type(a) is not float or type(b) is not float:
+                    check_number_operands(constants[code[ip + 1]], a, b)
+                push(a * b)
+                ip += 2
+            elif op == DIVIDE:
+                b = pop()
+                a = pop()
+                if type(a) is not float or type(b) is not float:
+                    check_number_operands(constants[code[ip + 1]], a, b)
+                push(a / b)
+                ip += 2
+            elif op == PRINT:
+                write_line(stringify(pop()))
+                ip += 1
+            elif op == DEFINE_GLOBAL:
+                values[constants[code[ip + 1]]] = pop()
+                ip += 2
+            elif op == SET_GLOBAL:
+                name = constants[code[ip + 1]]
+                if name.lexeme not in values:
+                    self.globals.assign(name, stack[-1])
+                values[name.lexeme] = stack[-1]
+                ip += 2
+            elif op == POP:
+                pop()
+                ip += 1
+            elif op == NEGATE:
+                a = stack[-1]
+                if type(a) is not float:
+                    check_number_operands(constants[code[ip + 1]], a)
+                stack[-1] = -a
+                ip += 2
+            elif op == NOT:
+                stack[-1] = not is_truthy(stack[-1])
+                ip += 1
+            elif op == NIL:
+                push(None)
+                ip += 1
+            elif op == TRUE:
+                push(True)
+                ip += 1
+            elif op == FALSE:
+                push(False)
+                ip += 1
+            elif op == EQUAL:
+                b = pop()
+                stack[-1] = is_equal(stack[-1], b)
+                ip += 1
+            elif op == NOT_EQUAL:
+                b = pop()
+                stack[-1] = not is_equal(stack[-1], b)
+                ip += 1
+            elif op == GREATER:
+                b = pop()
+                a = pop()
+                if type(a) is not float or type(b) is not float:
+                    check_number_operands(constants[code[ip + 1]], a, b)
+                push(a > b)
+                ip += 2
+            elif op == GREATER_EQUAL:
+                b = pop()
+                a = pop()
+                if type(a) is not float or type(b) is not float:
+                    check_number_operands(constants[code[ip + 1]], a, b)
+                push(a >= b)
+                ip += 2
+            elif op == LESS:
+                b = pop()
+                a = pop()
+                if type(a) is not float or type(b) is not float:
+                    check_number_operands(constants[code[ip + 1]], a, b)
+                push(a < b)
+                ip += 2
+            elif op == LESS_EQUAL:
+                b = pop()
+                a = pop()
+                if type(a) is not float or type(b) is not float:
+                    check_number_operands(constants[code[ip + 1]], a, b)
+                push(a <= b)
+                ip += 2
+            elif op == RETURN:
+                return
+            else:
+                raise RuntimeError(f"Unknown opcode {op}")